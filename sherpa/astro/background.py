@@ -17,13 +17,29 @@
 #  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 #
 
-from sherpa.models.model import CompositeModel, ArithmeticModel
+from sherpa.models.model import CompositeModel, ArithmeticModel, \
+    shared_calc
 from sherpa.utils.err import DataErr
 
 __all__ = ('BackgroundSumModel',)
 
 
 class BackgroundSumModel(CompositeModel, ArithmeticModel):
+    """Sum the background models of a PHA dataset.
+
+    Each background model is scaled to match the source dataset (by
+    the ratio of the BACKSCAL, AREASCAL, and EXPOSURE values), and the
+    results are summed so that they can be passed through the source
+    response with a single fold. A model used for several backgrounds
+    is only evaluated once, with the scale factors combined.
+
+    Parameters
+    ----------
+    srcdata : sherpa.astro.data.DataPHA instance
+        The source dataset.
+    bkgmodels : dict
+        The background models, indexed by the background identifier.
+    """
 
     def __init__(self, srcdata, bkgmodels):
         self.srcdata = srcdata
@@ -33,14 +49,40 @@ class BackgroundSumModel(CompositeModel, ArithmeticModel):
         name = '%g * (' % scale_factor + ' + '.join(bkgnames) + ')'
         CompositeModel.__init__(self, name, self.bkgmodels.values())
 
-    def calc(self, p, *args, **kwargs):
-        def eval_bkg_model(key, bkg):
+    def _get_scales(self):
+        """The scale factor for each model, in the order of parts."""
+
+        scales = [None] * len(self.parts)
+        for key in self.srcdata.background_ids:
             bmodel = self.bkgmodels.get(key)
             if bmodel is None:
                 raise DataErr('bkgmodel', key)
-            # FIXME: we're not using p here (and therefore assuming that the
-            # parameter values have already been updated to match the contents
-            # of p)
-            return bmodel(*args, **kwargs)
 
-        return self.srcdata.sum_background_data(eval_bkg_model)            
+            idx = [ii for ii, part in enumerate(self.parts)
+                   if part is bmodel][0]
+
+            scale = self.srcdata.sum_background_data(
+                lambda k, bkg: 1.0 if k == key else 0.0)
+            if scales[idx] is None:
+                scales[idx] = scale
+            else:
+                scales[idx] = scales[idx] + scale
+
+        return scales
+
+    def calc(self, p, *args, **kwargs):
+        vals = None
+        start = 0
+        for part, scale in zip(self.parts, self._get_scales()):
+            npars = len(part.pars)
+            if scale is not None:
+                mvals = scale * shared_calc(part, p[start:start + npars],
+                                            *args, **kwargs)
+                vals = mvals if vals is None else vals + mvals
+
+            start += npars
+
+        if vals is None:
+            raise DataErr('nobkg', self.srcdata.name)
+
+        return vals
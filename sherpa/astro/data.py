@@ -22,22 +22,25 @@
 Classes for storing, inspecting, and manipulating astronomical data sets
 """
 
+import copy
 import os.path
 import logging
 import warnings
 import numpy
 import hashlib
 
-from sherpa.data import Data1DInt, Data2D, Data, Data2DInt, Data1D, IntegratedDataSpace2D
+from sherpa.data import Data1DInt, Data2D, Data, Data2DInt, Data1D, \
+    IntegratedDataSpace2D, DataSpace2D, Filter
 from sherpa.models.regrid import EvaluationSpace1D
 from sherpa.utils.err import DataErr, ImportErr
 from sherpa.utils import SherpaFloat, pad_bounding_box, interpolate, \
-    create_expr, parse_expr, bool_cast, rebin, filter_bins
+    create_expr, parse_expr, bool_cast, rebin, filter_bins, sao_fcmp, eps
 
 # There are currently (Sep 2015) no tests that exercise the code that
 # uses the compile_energy_grid or Region symbols.
-from sherpa.astro.utils import arf_fold, rmf_fold, filter_resp, \
+from sherpa.astro.utils import arf_fold, \
     compile_energy_grid, do_group, expand_grouped_mask
+from sherpa.astro.utils.response import ResponseFilterCache
 
 regstatus = False
 try:
@@ -49,15 +52,20 @@ except ImportError:
     pass
 
 warning = logging.getLogger(__name__).warning
+info = logging.getLogger(__name__).info
 
+# The dynamic grouping schemes are taken from the group module (from
+# the CIAO tools package) when it is installed, otherwise the versions
+# in sherpa.astro.utils.grouping are used.
 groupstatus = False
 try:
     import group as pygroup
     groupstatus = True
 except:
     groupstatus = False
-    warning('the group module (from the CIAO tools package) is not ' +
-            'installed.\nDynamic grouping functions will not be available.')
+    from sherpa.astro.utils import grouping as pygroup
+    info('the group module (from the CIAO tools package) is not ' +
+         'installed.\nDynamic grouping will use sherpa.astro.utils.grouping.')
 
 
 __all__ = ('DataARF', 'DataRMF', 'DataPHA', 'DataIMG', 'DataIMGInt', 'DataRosatRMF')
@@ -88,6 +96,39 @@ def my_arf_fold(a, b):
     return arf_fold(a, b)
 
 
+def _rmf_to_arf_mask(rmf, arf, bin_mask):
+    """Which ARF energy bins start within the noticed RMF bins?
+
+    This is used when the ARF has a finer energy grid than the RMF.
+    The comparison matches `sherpa.utils.filter_bins`, so the limits
+    are inclusive, with a tolerance of `sherpa.utils.eps`.
+    """
+    lo = rmf.energ_lo[bin_mask]
+    hi = rmf.energ_hi[bin_mask]
+    elo = arf.energ_lo
+    arf_mask = numpy.zeros(len(elo), dtype=bool)
+    if lo.size == 0:
+        return arf_mask
+
+    # For an increasing grid, only the bins either side of the one
+    # containing the ARF energy can match (the tolerance is small
+    # compared to the bin widths).
+    if (numpy.diff(lo) > 0).all():
+        pos = numpy.searchsorted(lo, elo, side='right') - 1
+        for delta in (-1, 0, 1):
+            idx = numpy.clip(pos + delta, 0, lo.size - 1)
+            arf_mask |= (sao_fcmp(lo[idx], elo, eps) <= 0) & \
+                (sao_fcmp(hi[idx], elo, eps) >= 0)
+
+        return arf_mask
+
+    grid = (elo, arf.energ_hi)
+    for rlo, rhi in zip(lo, hi):
+        arf_mask |= filter_bins((rlo,), (rhi,), grid)
+
+    return arf_mask
+
+
 def _notice_resp(chans, arf, rmf):
     bin_mask = None
 
@@ -103,14 +144,7 @@ def _notice_resp(chans, arf, rmf):
         elif len(rmf.energ_lo) < len(arf.energ_lo):
             arf_mask = None
             if bin_mask is not None:
-                arf_mask = numpy.zeros(len(arf.energ_lo), dtype=bool)
-                for ii, val in enumerate(bin_mask):
-                    if val:
-                        los = (rmf.energ_lo[ii],)
-                        his = (rmf.energ_hi[ii],)
-                        grid = (arf.energ_lo, arf.energ_hi)
-                        idx = filter_bins(los, his, grid).nonzero()[0]
-                        arf_mask[idx] = True
+                arf_mask = _rmf_to_arf_mask(rmf, arf, bin_mask)
             arf.notice(arf_mask)
 
     else:
@@ -120,6 +154,109 @@ def _notice_resp(chans, arf, rmf):
             arf.notice(bin_mask)
 
 
+class _EnergyIndex(object):
+    """A lookup table between channels and the energy bins of a PHA.
+
+    Parameters
+    ----------
+    elo, ehi : array
+        The low and high edges of each channel (or group), which may
+        be in increasing or decreasing order.
+
+    Notes
+    -----
+    The conversion of values which fall between bins, or when the
+    bins are not monotonic, is handled by `_energy_to_channel_scalar`,
+    which is the original per-value algorithm.
+    """
+
+    def __init__(self, elo, ehi):
+        self.elo = elo
+        self.ehi = ehi
+        self.mid = (elo + ehi) / 2.0
+        self.mid.setflags(write=False)
+        self.nbins = len(elo)
+        self.descending = elo[0] > elo[-1] and ehi[0] > ehi[-1]
+
+        if self.descending:
+            lo = elo[::-1]
+            hi = ehi[::-1]
+        else:
+            lo = elo
+            hi = ehi
+
+        self.sorted = bool((numpy.diff(lo) > 0).all() and
+                           (lo <= hi).all() and
+                           (hi[:-1] <= lo[1:]).all())
+        self.lo = lo
+        self.hi = hi
+        self.lo_min = elo.min()
+        self.hi_max = ehi.max()
+
+    def to_channel(self, val):
+        """Convert the energies to channel numbers (starting at 1)."""
+
+        val = numpy.asarray(val)
+        if not self.sorted:
+            return _energy_to_channel_scalar(self.elo, self.ehi, val)
+
+        v = val.ravel()
+        below = ~(v >= self.lo_min)
+        above = v >= self.hi_max
+        nbins = self.nbins
+
+        idx = numpy.searchsorted(self.lo, v, side='right') - 1
+        inside = numpy.clip(idx, 0, nbins - 1)
+        inside = (idx >= 0) & (v < self.hi[inside])
+        if self.descending:
+            res = nbins - idx
+            res[below] = nbins
+            res[above] = 1
+        else:
+            res = idx + 1
+            res[below] = 1
+            res[above] = nbins
+
+        res = res.astype(SherpaFloat)
+        gaps = ~(below | above | inside)
+        if gaps.any():
+            res[gaps] = _energy_to_channel_scalar(self.elo, self.ehi,
+                                                  v[gaps])
+
+        if val.shape == ():
+            return res[0]
+
+        return res.reshape(val.shape)
+
+
+def _energy_to_channel_scalar(elo, ehi, val):
+    """Convert energies to channels, one value at a time."""
+    res = []
+    for v in val.flat:
+        if tuple(numpy.flatnonzero(elo <= v)) == ():
+            if elo[0] > elo[-1] and ehi[0] > ehi[-1]:
+                res.append(SherpaFloat(len(elo)))
+            else:
+                res.append(SherpaFloat(1))
+        elif tuple(numpy.flatnonzero(ehi > v)) == ():
+            if elo[0] > elo[-1] and ehi[0] > ehi[-1]:
+                res.append(SherpaFloat(1))
+            else:
+                res.append(SherpaFloat(len(ehi)))
+        elif tuple(numpy.flatnonzero((elo <= v) & (ehi > v)) + 1) != ():
+            res.append(SherpaFloat(
+                numpy.flatnonzero((elo <= v) & (ehi > v)) + 1))
+        elif (elo <= v).argmin() == (ehi > v).argmax():
+            res.append(SherpaFloat((elo <= v).argmin()))
+        else:
+            raise DataErr("energytochannel", v)
+
+    if val.shape == ():
+        return res[0]
+
+    return numpy.asarray(res, SherpaFloat)
+
+
 class DataOgipResponse(Data1DInt):
     """
     Parent class for OGIP responses, in particular ARF and RMF. This class implements some common validation code that
@@ -130,6 +267,13 @@ class DataOgipResponse(Data1DInt):
     """
     _ui_name = "OGIP Response"
 
+    # The response that the view was created from (see get_view), so
+    # that the shared data is kept alive while the view is used.
+    _base = None
+
+    # The warnings created when the response was validated.
+    _messages = ()
+
     # FIXME For a future time when we'll review this code in a deeper way: we
     # could have better separation of concerns if the initializers of `DataARF`
     # and `DataRMF` did not rely on the `Data` initializer, and if the
@@ -141,6 +285,11 @@ class DataOgipResponse(Data1DInt):
     # The shift to creating a warning message instead of raising an
     # error has made this messier.
     #
+    def _warn(self, wmsg):
+        """Display the warning and record it in the _messages field."""
+        self._messages = self._messages + (wmsg,)
+        warnings.warn(wmsg)
+
     def _validate_energy_ranges(self, label, elo, ehi, ethresh):
         """Check the lo/hi values are > 0, handling common error case.
 
@@ -201,7 +350,7 @@ class DataOgipResponse(Data1DInt):
             #               'has at least one bin with ENERG_HI < ENERG_LO')
             wmsg = "The {} '{}' ".format(rtype, label) + \
                    'has at least one bin with ENERG_HI < ENERG_LO'
-            warnings.warn(wmsg)
+            self._warn(wmsg)
 
         # if elo is monotonically increasing, all elements will be True
         #                         decreasing,                      False
@@ -215,7 +364,7 @@ class DataOgipResponse(Data1DInt):
             #               'has a non-monotonic ENERG_LO array')
             wmsg = "The {} '{}' ".format(rtype, label) + \
                    'has a non-monotonic ENERG_LO array'
-            warnings.warn(wmsg)
+            self._warn(wmsg)
 
         if nincreasing == 0:
             startidx = -1
@@ -241,20 +390,38 @@ class DataOgipResponse(Data1DInt):
                 wmsg = "The minimum ENERG_LO in the " + \
                        "{} '{}' was 0 and has been ".format(rtype, label) + \
                        "replaced by {}".format(ethresh)
-                warnings.warn(wmsg)
+                self._warn(wmsg)
 
             elif e0 < 0.0:
                 # raise DataErr('ogip-error', rtype, label,
                 #               'has an ENERG_LO value < 0')
                 wmsg = "The {} '{}' ".format(rtype, label) + \
                        'has an ENERG_LO value < 0'
-                warnings.warn(wmsg)
+                self._warn(wmsg)
 
         return elo, ehi
 
     def _get_data_space(self, filter=False):
         return EvaluationSpace1D(self._lo, self._hi)
 
+    def get_view(self):
+        """Return a copy of the response which can be filtered separately.
+
+        The copy shares the response data, which must not be changed,
+        with this response but has its own filter and header.
+
+        Returns
+        -------
+        view : an instance of the same class as the response
+        """
+        view = copy.copy(self)
+        view._base = self if self._base is None else self._base
+        view.header = copy.copy(self.header)
+        view._data_space = view._init_data_space(Filter(), self.energ_lo,
+                                                 self.energ_hi)
+        view.notice()
+        return view
+
 
 class DataARF(DataOgipResponse):
     """ARF data set.
@@ -333,6 +500,11 @@ class DataARF(DataOgipResponse):
             ss = self._fields
         return ss
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_base', None)
+        return state
+
     def __setstate__(self, state):
         if 'header' not in state:
             self.header = None
@@ -343,11 +515,20 @@ class DataARF(DataOgipResponse):
             self.__dict__['_rsp'] = state.get('specresp', None)
 
     def apply_arf(self, src, *args, **kwargs):
-        "Fold the source array src through the ARF and return the result"
+        """Fold the source array src through the ARF and return the result
+
+        The ``specresp`` keyword argument can be used to fold through
+        a different effective-area array (with the same filter as the
+        ARF) rather than the ARF values.
+        """
+
+        rsp = kwargs.get('specresp', None)
+        if rsp is None:
+            rsp = self._rsp
 
         # an external function must be called so all ARFs go through
         # a single entry point in order for caching to 'work'
-        model = my_arf_fold(src, self._rsp)
+        model = my_arf_fold(src, rsp)
 
         # Rebin the high-res source model folded through ARF down to the size
         # the PHA or RMF expects.
@@ -424,6 +605,14 @@ class DataRMF(DataOgipResponse):
     _fields = ("name", "detchans", "energ_lo", "energ_hi", "n_grp", "f_chan", "n_chan", "matrix", "offset", "e_min",
                "e_max", "ethresh")
 
+    # The sparse form of the current (filtered) matrix, created when
+    # the RMF is first applied.
+    _sparse = None
+
+    # The filtered matrices for recently-used channel selections,
+    # which is shared with the views created by get_view.
+    _filters = None
+
     def __init__(self, name, detchans, energ_lo, energ_hi, n_grp, f_chan,
                  n_chan, matrix, offset=1, e_min=None, e_max=None,
                  header=None, ethresh=None):
@@ -466,6 +655,13 @@ class DataRMF(DataOgipResponse):
             self._fields = old
         return ss
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_sparse', None)
+        state.pop('_filters', None)
+        state.pop('_base', None)
+        return state
+
     def __setstate__(self, state):
         if 'header' not in state:
             self.header = None
@@ -494,21 +690,69 @@ class DataRMF(DataOgipResponse):
         return self._validate_energy_ranges(name, energy_lo, energy_hi, ethresh)
 
     def apply_rmf(self, src, *args, **kwargs):
-        "Fold the source array src through the RMF and return the result"
+        """Fold the source array src through the RMF and return the result.
+
+        The source can be a 1D array or, to fold several spectra in one
+        pass, a 2D array with one spectrum per row.
+        """
+
+        src = numpy.asarray(src)
 
         # Rebin the high-res source model from the PHA down to the size
         # the RMF expects.
         if args != ():
             (rmf, pha) = args
             if pha != () and len(pha[0]) > len(rmf[0]):
-                src = rebin(src, pha[0], pha[1], rmf[0], rmf[1])
+                if src.ndim == 2:
+                    src = numpy.asarray([rebin(row, pha[0], pha[1],
+                                               rmf[0], rmf[1])
+                                         for row in src])
+                else:
+                    src = rebin(src, pha[0], pha[1], rmf[0], rmf[1])
 
-        if len(src) != len(self._lo):
+        if src.shape[-1] != len(self._lo):
             raise TypeError("Mismatched filter between ARF and RMF " +
                             "or PHA and RMF")
 
-        return rmf_fold(src, self._grp, self._fch, self._nch, self._rsp,
-                        self.detchans, self.offset)
+        return self.get_sparse().fold(src)
+
+    def get_sparse(self):
+        """Return the sparse form of the current (filtered) matrix.
+
+        The conversion is done the first time the RMF is applied, and
+        repeated only when the matrix is changed (e.g. by `notice`).
+
+        Returns
+        -------
+        rsp : sherpa.astro.utils.response.SparseResponse instance
+        """
+        rsp = self._sparse
+        if rsp is None or not rsp.is_from(self):
+            rsp = self._get_filters().get_sparse(self)
+            self._sparse = rsp
+
+        return rsp
+
+    def _get_filters(self):
+        if self._filters is None:
+            self._filters = ResponseFilterCache(self)
+        return self._filters
+
+    def get_view(self):
+        """Return a copy of the RMF which can be filtered separately.
+
+        The copy shares the matrix data, and the cache of filtered
+        matrices, with this RMF, so that filtering the copy with a
+        previously-used set of channels is cheap.
+
+        Returns
+        -------
+        rmf : DataRMF instance
+        """
+        view = DataOgipResponse.get_view(self)
+        view._filters = self._get_filters()
+        view.bin_mask = None
+        return view
 
     def notice(self, noticed_chans=None):
         bin_mask = None
@@ -520,12 +764,11 @@ class DataRMF(DataOgipResponse):
         self._hi = self.energ_hi
         if noticed_chans is not None:
             (self._grp, self._fch, self._nch, self._rsp,
-             bin_mask) = filter_resp(noticed_chans, self.n_grp, self.f_chan,
-                                     self.n_chan, self.matrix, self.offset)
+             bin_mask) = self._get_filters().filter(self, noticed_chans)
             self._lo = self.energ_lo[bin_mask]
             self._hi = self.energ_hi[bin_mask]
         if bin_mask is not None:
-            self.bin_mask = bin_mask[:]
+            self.bin_mask = bin_mask.copy()
         return bin_mask
 
     def get_indep(self, filter=False):
@@ -600,6 +843,15 @@ class DataPHA(Data1D):
     provide any necessary data manipulation to handle cases such as:
     background subtraction, filtering, and grouping.
 
+    The grouped and filtered values are cached until one of the
+    attributes - such as `counts`, `grouping`, or the filter mask - is
+    set, and they are returned as read-only arrays. Changes made to an
+    array in place are not noticed, so the attribute must be set again
+    afterwards, for example::
+
+        pha.counts[0] = 10
+        pha.counts = pha.counts
+
     The handling of the AREASCAl value - whether it is a scalar or
     array - is currently in flux. It is a value that is stored with the
     PHA file, and the OGIP PHA standard ([1]_) describes the observed
@@ -762,6 +1014,28 @@ class DataPHA(Data1D):
                'exposure', 'backscal', 'areascal', 'grouped', 'subtracted', 'units', 'rate', 'plot_fac', 'response_ids',
                'background_ids')
 
+    # The energy lookup tables created by _get_energy_index, indexed
+    # by (response_id, group).
+    _energy_index = None
+
+    # The derived (grouped, filtered, and background-subtracted) arrays
+    # stored by _get_cached. Setting any of the _cache_fields attributes
+    # increments _cache_version, which invalidates the stored arrays.
+    # Arrays changed in place are not noticed, so they must be set
+    # again (e.g. pha.counts = pha.counts) after they are changed.
+    _array_cache = None
+    _cache_version = 0
+    _cache_fields = frozenset(['channel', 'counts', 'staterror', 'syserror',
+                               'grouping', 'quality', 'quality_filter',
+                               'exposure', 'backscal', 'areascal',
+                               '_grouped', '_subtracted', '_background_ids'])
+
+    # Setting any of the _ebins_fields attributes increments
+    # _ebins_version, which invalidates the energy lookup tables.
+    _ebins_version = 0
+    _ebins_fields = frozenset(['channel', 'bin_lo', 'bin_hi', 'grouping',
+                               'quality_filter', '_grouped'])
+
     def __init__(self, name, channel, counts, staterror=None, syserror=None,
                  bin_lo=None, bin_hi=None, grouping=None, quality=None,
                  exposure=None, backscal=None, areascal=None, header=None):
@@ -800,12 +1074,71 @@ class DataPHA(Data1D):
             self._fields = old
         return ss
 
+    def __setattr__(self, name, val):
+        if name in self._cache_fields:
+            object.__setattr__(self, '_cache_version',
+                               self._cache_version + 1)
+        if name in self._ebins_fields:
+            object.__setattr__(self, '_ebins_version',
+                               self._ebins_version + 1)
+        Data1D.__setattr__(self, name, val)
+
     def __getstate__(self):
         state = self.__dict__.copy()
         del state['_to_channel']
         del state['_from_channel']
+        state.pop('_energy_index', None)
+        state.pop('_array_cache', None)
         return state
 
+    def _get_cache_key(self):
+        """The state that the cached arrays depend on."""
+        filt = self._data_space.filter
+        key = [self._cache_version, filt, filt.version]
+        for bkg_id in self.background_ids:
+            bkg = self.get_background(bkg_id)
+            key.extend([bkg, bkg._cache_version])
+        return key
+
+    def _get_cached(self, name, func):
+        """Return the value of func(), using the cached value if valid.
+
+        Parameters
+        ----------
+        name : hashable
+            The label for the value.
+        func : callable
+            Calculate the value; it is called with no arguments.
+
+        Notes
+        -----
+        The cache is cleared when the data, grouping, quality,
+        filter, scaling values, or backgrounds are changed by setting
+        the attribute, but not when the arrays are changed in place
+        (set the attribute again after changing it). The cached
+        arrays are marked read only, unless they are one of the
+        arrays stored in the data set.
+        """
+        key = self._get_cache_key()
+        cache = self._array_cache
+        if cache is None or cache[0] != key or len(cache[1]) > 16:
+            cache = (key, {})
+            self._array_cache = cache
+
+        try:
+            return cache[1][name]
+        except KeyError:
+            pass
+
+        value = func()
+        if isinstance(value, numpy.ndarray) and \
+           all(value is not getattr(self, field, None)
+               for field in self._cache_fields):
+            value.setflags(write=False)
+
+        cache[1][name] = value
+        return value
+
     def __setstate__(self, state):
         self._background_ids = state['_background_ids']
         self._backgrounds = state['_backgrounds']
@@ -948,7 +1281,59 @@ class DataPHA(Data1D):
     # is automatically followed by grouping.  Grouping the data
     # twice is an error.
     def _get_ebins(self, response_id=None, group=True):
+        index = self._get_energy_index(response_id, group)
+        return (index.elo, index.ehi)
+
+    def _energy_index_key(self, response_id, group):
+        """The objects the energy bins are calculated from.
+
+        Returns the values, which are compared by equality, and the
+        objects, which are compared by identity. Changes to the
+        channel, bin, grouping, and quality filter arrays of the data
+        set are tracked by _ebins_version, so the arrays must be set
+        again if they are changed in place.
+        """
+        arf, rmf = self.get_response(response_id)
+        objs = [arf, rmf]
+        if rmf is not None:
+            objs.extend([rmf.e_min, rmf.e_max])
+        if arf is not None:
+            objs.extend([arf.energ_lo, arf.energ_hi])
+        return (self.grouped and group, self._ebins_version), objs
+
+    def _get_energy_index(self, response_id=None, group=True):
+        """Return the lookup table between channels and energies.
+
+        The table is cached, and is only re-created when the grouping,
+        quality filter, or response for the data set changes.
+        """
         group = bool_cast(group)
+        key = self._energy_index_key(response_id, group)
+        name = (self._fix_response_id(response_id), group)
+        cache = self._energy_index
+        if cache is None:
+            cache = {}
+            self._energy_index = cache
+
+        stored = cache.get(name)
+        if stored is not None and stored[0][0] == key[0] and \
+           len(stored[0][1]) == len(key[1]) and \
+           all(a is b for a, b in zip(stored[0][1], key[1])):
+            return stored[1]
+
+        elo, ehi = self._calc_ebins(response_id, group)
+        elo = numpy.asarray(elo)
+        ehi = numpy.asarray(ehi)
+        if self.grouped and group:
+            # The grouped arrays are only referenced by the cache
+            elo.setflags(write=False)
+            ehi.setflags(write=False)
+
+        index = _EnergyIndex(elo, ehi)
+        cache[name] = (key, index)
+        return index
+
+    def _calc_ebins(self, response_id=None, group=True):
         arf, rmf = self.get_response(response_id)
         if (self.bin_lo is not None) and (self.bin_hi is not None):
             elo = self.bin_lo
@@ -1037,41 +1422,15 @@ class DataPHA(Data1D):
         return (lo, hi)
 
     def _channel_to_energy(self, val, group=True, response_id=None):
-        elo, ehi = self._get_ebins(response_id=response_id, group=group)
+        mid = self._get_energy_index(response_id, group).mid
         val = numpy.asarray(val).astype(numpy.int_) - 1
         try:
-            return (elo[val] + ehi[val]) / 2.0
+            return mid[val]
         except IndexError:
             raise DataErr('invalidchannel', val)
 
     def _energy_to_channel(self, val):
-        elo, ehi = self._get_ebins()
-
-        val = numpy.asarray(val)
-        res = []
-        for v in val.flat:
-            if tuple(numpy.flatnonzero(elo <= v)) == ():
-                if elo[0] > elo[-1] and ehi[0] > ehi[-1]:
-                    res.append(SherpaFloat(len(elo)))
-                else:
-                    res.append(SherpaFloat(1))
-            elif tuple(numpy.flatnonzero(ehi > v)) == ():
-                if elo[0] > elo[-1] and ehi[0] > ehi[-1]:
-                    res.append(SherpaFloat(1))
-                else:
-                    res.append(SherpaFloat(len(ehi)))
-            elif tuple(numpy.flatnonzero((elo <= v) & (ehi > v)) + 1) != ():
-                res.append(SherpaFloat(
-                    numpy.flatnonzero((elo <= v) & (ehi > v)) + 1))
-            elif (elo <= v).argmin() == (ehi > v).argmax():
-                res.append(SherpaFloat((elo <= v).argmin()))
-            else:
-                raise DataErr("energytochannel", v)
-
-        if val.shape == ():
-            return res[0]
-
-        return numpy.asarray(res, SherpaFloat)
+        return self._get_energy_index().to_channel(val)
 
     _hc = 12.39841874  # nist.gov in [keV-Angstrom]
 
@@ -1089,11 +1448,7 @@ class DataPHA(Data1D):
     def _wavelength_to_channel(self, val):
         tiny = numpy.finfo(numpy.float32).tiny
         vals = numpy.asarray(val)
-        if vals.shape == ():
-            if vals == 0.0:
-                vals = tiny
-        else:
-            vals[vals == 0.0] = tiny
+        vals = numpy.where(vals == 0.0, tiny, vals)
         vals = self._hc / vals
         return self._energy_to_channel(vals)
 
@@ -1190,10 +1545,16 @@ class DataPHA(Data1D):
         7.8504301607718007e-06
 
         """
-        backscal = self.backscal
-        if backscal is not None:
-            backscal = self._check_scale(backscal, group, filter)
-        return backscal
+        group = bool_cast(group)
+        filter = bool_cast(filter)
+        return self._get_cached(('backscal', group, filter),
+                                lambda: self._get_scale(self.backscal,
+                                                        group, filter))
+
+    def _get_scale(self, scale, group, filter):
+        if scale is not None:
+            scale = self._check_scale(scale, group, filter)
+        return scale
 
     def get_areascal(self, group=True, filter=False):
         """Return the fractional area factor of the PHA data set.
@@ -1234,10 +1595,11 @@ class DataPHA(Data1D):
         1.0
 
         """
-        areascal = self.areascal
-        if areascal is not None:
-            areascal = self._check_scale(areascal, group, filter)
-        return areascal
+        group = bool_cast(group)
+        filter = bool_cast(filter)
+        return self._get_cached(('areascal', group, filter),
+                                lambda: self._get_scale(self.areascal,
+                                                        group, filter))
 
     def apply_filter(self, data, groupfunc=numpy.sum):
         """
@@ -1360,15 +1722,6 @@ class DataPHA(Data1D):
 
         # warning('grouping flags have changed, noticing all bins')
 
-    # Have to move this check here; as formerly written, reference
-    # to pygroup functions happened *before* checking groupstatus,
-    # in _dynamic_group.  So we did not return the intended error
-    # message; rather, a NameError was raised stating that pygroup
-    # did not exist in global scope (not too clear to the user).
-    #
-    # The groupstatus check thus has to be done in *each* of the following
-    # group functions.
-
     # # Dynamic grouping functions now automatically impose the
     # # same grouping conditions on *all* associated background data sets.
     # # CIAO 4.5 bug fix, 05/01/2012
@@ -1410,8 +1763,6 @@ class DataPHA(Data1D):
         the quality value for these channels will be set to 2.
 
         """
-        if not groupstatus:
-            raise ImportErr('importfailed', 'group', 'dynamic grouping')
         self._dynamic_group(pygroup.grpNumBins, len(self.channel), num,
                             tabStops=tabStops)
         for bkg_id in self.background_ids:
@@ -1455,8 +1806,6 @@ class DataPHA(Data1D):
         for these channels will be set to 2.
 
         """
-        if not groupstatus:
-            raise ImportErr('importfailed', 'group', 'dynamic grouping')
         self._dynamic_group(pygroup.grpBinWidth, len(self.channel), val,
                             tabStops=tabStops)
         for bkg_id in self.background_ids:
@@ -1504,8 +1853,6 @@ class DataPHA(Data1D):
         quality value for these channels will be set to 2.
 
         """
-        if not groupstatus:
-            raise ImportErr('importfailed', 'group', 'dynamic grouping')
         self._dynamic_group(pygroup.grpNumCounts, self.counts, num,
                             maxLength=maxLength, tabStops=tabStops)
         for bkg_id in self.background_ids:
@@ -1560,8 +1907,6 @@ class DataPHA(Data1D):
         quality value for these channels will be set to 2.
 
         """
-        if not groupstatus:
-            raise ImportErr('importfailed', 'group', 'dynamic grouping')
         self._dynamic_group(pygroup.grpSnr, self.counts, snr,
                             maxLength=maxLength, tabStops=tabStops,
                             errorCol=errorCol)
@@ -1614,8 +1959,6 @@ class DataPHA(Data1D):
         quality value for these channels will be set to 2.
 
         """
-        if not groupstatus:
-            raise ImportErr('importfailed', 'group', 'dynamic grouping')
         self._dynamic_group(pygroup.grpAdaptive, self.counts, minimum,
                             maxLength=maxLength, tabStops=tabStops)
         for bkg_id in self.background_ids:
@@ -1675,8 +2018,6 @@ class DataPHA(Data1D):
         quality value for these channels will be set to 2.
 
         """
-        if not groupstatus:
-            raise ImportErr('importfailed', 'group', 'dynamic grouping')
         self._dynamic_group(pygroup.grpAdaptiveSnr, self.counts, minimum,
                             maxLength=maxLength, tabStops=tabStops,
                             errorCol=errorCol)
@@ -1744,8 +2085,12 @@ class DataPHA(Data1D):
         #     return self.counts
         # return self.counts - self.sum_background_data()
 
-        dep = self.counts
         filter = bool_cast(filter)
+        return self._get_cached(('dep', filter),
+                                lambda: self._calc_dep(filter))
+
+    def _calc_dep(self, filter):
+        dep = self.counts
 
         # The area scaling is not applied to the data, since it
         # should be being applied to the model via the *PHA
@@ -1833,9 +2178,13 @@ class DataPHA(Data1D):
         >>> dy = dset.get_staterror(staterrfunc=stat.calc_staterror)
 
         """
-        staterr = self.staterror
-
         filter = bool_cast(filter)
+        return self._get_cached(('staterror', filter, staterrfunc),
+                                lambda: self._calc_staterror(filter,
+                                                             staterrfunc))
+
+    def _calc_staterror(self, filter, staterrfunc):
+        staterr = self.staterror
         if filter:
             staterr = self.apply_filter(staterr, self._sum_sq)
         else:
@@ -1981,8 +2330,12 @@ class DataPHA(Data1D):
         -----
         There is no scaling by the AREASCAL setting.
         """
-        syserr = self.syserror
         filter = bool_cast(filter)
+        return self._get_cached(('syserror', filter),
+                                lambda: self._calc_syserror(filter))
+
+    def _calc_syserror(self, filter):
+        syserr = self.syserror
         if filter:
             syserr = self.apply_filter(syserr, self._sum_sq)
         else:
@@ -2402,8 +2755,98 @@ class DataPHA(Data1D):
         self.subtracted = False
 
 
+class ImageDataSpace(DataSpace2D):
+    """The pixel grid of an image, calculated when needed.
+
+    The coordinates of the pixels are not stored, but are created from
+    the shape of the image - and converted by the transforms - each
+    time they are requested. When the grid is filtered only the
+    selected pixels are created, so a large image with a small noticed
+    region never needs the full coordinate arrays.
+
+    Parameters
+    ----------
+    filter : Filter
+        The filter of the data set.
+    shape : tuple of int
+        The shape of the image (number of rows, number of columns).
+    transforms : sequence of sherpa.astro.io.wcs.WCS, optional
+        The transforms that are applied, in order, to the logical
+        coordinates.
+    """
+
+    def __init__(self, filter, shape, transforms=()):
+        self.filter = filter
+        self.shape = tuple(shape)
+        self.transforms = tuple(transforms)
+        self._cache = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_cache'] = None
+        return state
+
+    def _get_pixels(self, idx=None):
+        """The coordinates of all the pixels, or those in idx."""
+        nx = self.shape[1]
+        if idx is None:
+            x0 = numpy.arange(1, nx + 1, dtype=SherpaFloat)
+            x1 = numpy.arange(1, self.shape[0] + 1, dtype=SherpaFloat)
+            x0, x1 = numpy.meshgrid(x0, x1)
+            x0, x1 = x0.ravel(), x1.ravel()
+        else:
+            x1, x0 = numpy.divmod(idx, nx)
+            x0 = x0 + 1.0
+            x1 = x1 + 1.0
+
+        for tfm in self.transforms:
+            x0, x1 = tfm.apply(x0, x1)
+
+        return x0, x1
+
+    def get(self, filter=False):
+        filter = bool_cast(filter)
+        mask = self.filter.mask
+        if not filter or mask is True:
+            return self
+
+        if mask is False:
+            raise DataErr('notmask')
+
+        if mask.size != self.shape[0] * self.shape[1]:
+            raise DataErr('mismatch', 'mask', 'data array')
+
+        # The filtered grid is re-used until the mask is changed.
+        version = self.filter.version
+        if self._cache is None or self._cache[0] != version or \
+           self._cache[1] is not mask:
+            x0, x1 = self._get_pixels(numpy.flatnonzero(mask))
+            x0.setflags(write=False)
+            x1.setflags(write=False)
+            self._cache = (version, mask, DataSpace2D(self.filter, x0, x1))
+
+        return self._cache[2]
+
+    @property
+    def grid(self):
+        return self._get_pixels()
+
+    @property
+    def x0(self):
+        return self.grid[0]
+
+    @property
+    def x1(self):
+        return self.grid[1]
+
+
 class DataIMG(Data2D):
-    "Image data set, including functions for coordinate transformations"
+    """Image data set, including functions for coordinate transformations
+
+    If x0 and x1 are both None then the pixel coordinates are not
+    stored, but calculated from the shape of the image when needed
+    (see `ImageDataSpace`).
+    """
     _fields = Data2D._fields + ("sky", "eqpos", "coord", "header")
 
     def _get_coord(self):
@@ -2494,6 +2937,12 @@ class DataIMG(Data2D):
 
             self._region = None
 
+    def _init_data_space(self, filter, *data):
+        if len(data) == 2 and data[0] is None and data[1] is None:
+            self._check_shape()
+            return ImageDataSpace(filter, self.shape)
+        return Data2D._init_data_space(self, filter, *data)
+
     def _check_physical_transform(self):
         if self.sky is None:
             raise DataErr('nocoord', self.name, 'physical')
@@ -2625,8 +3074,24 @@ class DataIMG(Data2D):
         elif coord.startswith('image'):
             coord = 'logical'
 
-        func = getattr(self, 'get_' + coord)
-        self.indep = func()
+        if isinstance(self._data_space, ImageDataSpace):
+            # The transforms are applied to the logical coordinates.
+            if coord == 'physical':
+                self._check_physical_transform()
+                tfms = (self.sky,)
+            elif coord == 'world':
+                self._check_world_transform()
+                tfms = tuple(t for t in (self.sky, self.eqpos)
+                             if t is not None)
+            else:
+                tfms = ()
+
+            self._data_space = ImageDataSpace(self._data_space.filter,
+                                              self.shape, tfms)
+        else:
+            func = getattr(self, 'get_' + coord)
+            self.indep = func()
+
         self._set_coord(coord)
 
     def get_filter_expr(self):
@@ -211,7 +211,18 @@ The following functions are provided:
 
 Information about data sets which match a particular query are provided
 by the ``query_by_header_keyword``, ``query_by_obsid``, and ``query``
-functions.
+functions. The header keywords of each data set are indexed when it is
+loaded, so the first two do not need to search the headers.
+
+Fitting each data set separately
+--------------------------------
+
+The ``fit`` function fits all the data sets in the stack together,
+whereas ``fit_each`` fits each data set on its own, running the fits
+in parallel, and returns the results of each fit::
+
+    datastack.set_source([], ui.powlaw1d.pl__ID)
+    results = datastack.fit_each([])
 
 """
 
@@ -274,7 +285,7 @@ def set_stack_verbose(verbose=True):
         logger.setLevel(logging.WARNING)
 
 _always_wrapped = ('load_pha', 'load_arrays', 'load_ascii', 'load_data',
-                   'load_bkg')
+                   'load_bkg', 'load_multi_data')
 
 
 # Use this and subsequent loop to wrap every function in sherpa.astro.ui
@@ -356,7 +367,8 @@ for attr in dir(ui):
         setattr(_module, attr, public(_sherpa_ui_wrap(func)))
 
 for funcname in ['clear_stack', 'show_stack', 'get_stack_ids',
-                 'query', 'query_by_header_keyword', 'query_by_obsid']:
+                 'query', 'query_by_header_keyword', 'query_by_obsid',
+                 'fit_each']:
     setattr(_module, funcname, public(
         _datastack_wrap(getattr(DataStack, funcname))))
 
@@ -21,6 +21,8 @@ from __future__ import print_function
 
 import six
 import numpy
+from sherpa.utils import parallel_map
+from sherpa.utils.err import IdentifierErr
 from sherpa.utils.logging import config_logger
 from sherpa.astro import ui
 from .utils import load_error_msg, load_wrapper, model_wrapper, \
@@ -38,6 +40,16 @@ except:
 _all_dataset_ids = {}
 
 
+def _header_value(value):
+    """The form of a header value used for queries."""
+    if isinstance(value, bytes):
+        try:
+            return value.decode('utf-8')
+        except UnicodeDecodeError:
+            pass
+    return str(value)
+
+
 class DataStack(object):
 
     """Manipulate a stack of data in Sherpa.
@@ -56,6 +68,11 @@ class DataStack(object):
         self.datasets = []
         self.dataset_ids = {}           # Access datasets by ID
 
+        # The data sets which match each header keyword value, and the
+        # keywords which were indexed for each data set.
+        self._header_index = {}
+        self._header_keys = {}
+
     def __getitem__(self, item):
         """Overload datastack getitem ds[item(s)] to set self.filter_ids to a tuple
         corresponding to the specified items.
@@ -217,6 +234,56 @@ class DataStack(object):
         except:
             self._load_func(ui.load_pha, arg, use_errors)
 
+    def load_multi_data(self, filenames, numcores=None, **kwargs):
+        """Load multiple data sets, reading the files at the same time.
+
+        This uses ``sherpa.astro.ui.unpack_multi_data`` to read in the
+        files with a pool of threads, and then adds the data sets to
+        the stack in the order of the files. Files which can not be
+        read in are reported and skipped.
+
+        Parameters
+        ----------
+        filenames : str or iterable of str
+            A stack file, or the names of the files.
+        numcores : int or None, optional
+            The number of files to read in at the same time. When set
+            to None, the number of available CPUs is used.
+        kwargs
+            The keyword arguments supported by
+            ``sherpa.astro.ui.load_data``.
+
+        Returns
+        -------
+        ids : list of int or str
+            The identifiers of the data sets that were loaded.
+        """
+        if isinstance(filenames, six.string_types):
+            try:
+                filenames = stk.build(filenames)
+            except:
+                filenames = [filenames]
+
+        datasets = ui.unpack_multi_data(filenames, numcores=numcores,
+                                        **kwargs)
+
+        ids = []
+        for data in datasets:
+            if data is None:
+                continue
+
+            if type(data) is not list:
+                data = [data]
+
+            for dset in data:
+                dataid = self._get_dataid()
+                logger.info('Loading dataset id {0}'.format(dataid))
+                ui.set_data(dataid, dset)
+                self._add_dataset(dataid)
+                ids.append(dataid)
+
+        return ids
+
     def thaw(self, *pars):
         """Apply the thaw command to specified parameters for each dataset.
 
@@ -365,7 +432,8 @@ class DataStack(object):
            The keyword to search for (it is looked for in the ``header``
            attribute of each data set, using a case-sensitive search).
         value
-           The value of the keyword.
+           The value of the keyword. The comparison is made using
+           the string form of the value.
 
         Returns
         -------
@@ -377,6 +445,14 @@ class DataStack(object):
         --------
         query, query_by_obsid
 
+        Notes
+        -----
+        The header keywords are indexed when a data set is added to
+        the stack, and when the data for an identifier has been
+        replaced, so that the headers do not need to be searched for
+        each query. Changes made directly to the header of a data set
+        are not included.
+
         Examples
         --------
 
@@ -384,18 +460,22 @@ class DataStack(object):
         [1, 2]
 
         """
-        def func(dataset):
-            if hasattr(dataset, 'header'):
-                str_value = str(value)
-                try:  # Python 3
-                    header_value = str(dataset.header[keyword], "utf-8")
-                except TypeError:  # Python 2
-                    header_value = dataset.header[keyword]
-                if keyword in dataset.header.keys() and \
-                   header_value == str_value:
-                    return True
-            return False
-        return self.query(func)
+        datasets = self.filter_datasets()
+        for dataset in datasets:
+            # The data may have been deleted, in which case the stack's
+            # copy is used.
+            try:
+                data = ui.get_data(dataset['id'])
+            except IdentifierErr:
+                continue
+
+            if data is not dataset['data']:
+                self._index_dataset(dataset, data)
+
+        values = self._header_index.get(keyword, {})
+        matches = values.get(_header_value(value), ())
+        return [dataset['id'] for dataset in datasets
+                if dataset['id'] in matches]
 
     def query_by_obsid(self, value):
         """Return the data sets which match the OBS_ID value.
@@ -425,6 +505,63 @@ class DataStack(object):
         """
         return self.query_by_header_keyword('OBS_ID', value)
 
+    def fit_each(self, numcores=None, **kwargs):
+        """Fit each data set in the stack separately.
+
+        Unlike ``fit``, which fits all the data sets in the stack
+        together, each data set is fit on its own. The fits are run
+        in parallel, using separate processes, and the best-fit
+        parameter values are then copied back into the session.
+
+        Parameters
+        ----------
+        numcores : int or None, optional
+           The number of fits to run at the same time. When set to
+           None, the number of available CPUs is used.
+        kwargs
+           Any keyword arguments to be passed to
+           ``sherpa.astro.ui.fit``.
+
+        Returns
+        -------
+        results : list of sherpa.fit.FitResults
+           The results for each data set, in the order of the stack.
+
+        See Also
+        --------
+        fit
+
+        Notes
+        -----
+        Each fit only changes the parameters used by that data set.
+        Model components that are shared between data sets - that is,
+        those without the ``__ID`` template in their name - are fit
+        separately for each data set, and are left with the values
+        from the last data set in the stack.
+
+        Examples
+        --------
+
+        >>> set_source([], 'xsphabs.gal__ID * xspowerlaw.pl__ID')
+        >>> res = fit_each([])
+        >>> [r.statval for r in res]
+
+        """
+        ids = [dataset['id'] for dataset in self.filter_datasets()]
+        logger.info('Fitting each of the datasets with ids={0}'.format(ids))
+
+        def worker(id):
+            ui.fit(id, **kwargs)
+            return ui.get_fit_results()
+
+        results = parallel_map(worker, ids, numcores)
+
+        for res in results:
+            for name, val in zip(res.parnames, res.parvals):
+                ui.get_par(name).val = val
+
+        return results
+
     load_ascii = load_wrapper(ui.load_ascii)
     load_data = load_wrapper(ui.load_data)
     load_bkg = load_wrapper(ui.load_bkg)
@@ -515,6 +652,32 @@ class DataStack(object):
         _all_dataset_ids[dataid] = dataset
         self.dataset_ids[dataid] = dataset
         self.datasets.append(dataset)
+        self._index_dataset(dataset)
+
+    def _index_dataset(self, dataset, data=None):
+        """Add the header keywords of the data set to the index.
+
+        If data is given then it replaces the data for the data set.
+        """
+        dataid = dataset['id']
+        for keyword, value in self._header_keys.pop(dataid, {}).items():
+            self._header_index[keyword][value].discard(dataid)
+
+        if data is not None:
+            dataset['data'] = data
+
+        header = getattr(dataset['data'], 'header', None)
+        if not header:
+            return
+
+        keys = {}
+        for keyword in header.keys():
+            value = _header_value(header[keyword])
+            values = self._header_index.setdefault(keyword, {})
+            values.setdefault(value, set()).add(dataid)
+            keys[keyword] = value
+
+        self._header_keys[dataid] = keys
 
     def _load_func(self, func, *args, **kwargs):
         dataid = self._get_dataid()
@@ -23,10 +23,12 @@ import tempfile
 import logging
 
 import numpy as np
+import pytest
 
 from sherpa.utils.testing import SherpaTestCase, requires_fits, requires_stk
 from sherpa.astro import ui
 from sherpa.astro import datastack
+from sherpa.astro.data import DataPHA
 from acis_bkg_model import acis_bkg_model
 
 logger = logging.getLogger('sherpa')
@@ -696,6 +698,88 @@ class test_query(SherpaTestCase):
         assert f == [4]
 
 
+@requires_fits
+def test_load_multi_data():
+    datastack.clear_stack()
+    ui.clean()
+    datadir = os.path.join(os.path.dirname(__file__), 'data')
+    files = [os.path.join(datadir, name)
+             for name in ['acisf04938_000N002_r0043_pha3.fits',
+                          'not_a_file.fits',
+                          'acisf07867_000N001_r0002_pha3.fits']]
+    try:
+        ids = datastack.load_multi_data(tuple(files), numcores=2)
+        assert ids == [1, 2]
+        assert datastack.get_stack_ids() == [1, 2]
+        assert datastack.query_by_obsid(7867) == [2]
+
+        # the datasets use the same RMF data as load_pha
+        datastack.load_pha(files[2])
+        assert ui.get_rmf(3).matrix is ui.get_rmf(2).matrix
+
+    finally:
+        datastack.clear_stack()
+        ui.clean()
+
+
+def test_query_by_header_keyword_index():
+    datastack.clear_stack()
+    ui.clean()
+    x = np.arange(1, 6)
+    try:
+        datastack.load_arrays([[x, x], [x, x], [x, x]])
+        assert datastack.query_by_obsid(1) == []
+
+        # Replacing the data updates the index.
+        for id, obsid in [(1, 11), (2, b'12'), (3, '11')]:
+            hdr = {'OBS_ID': obsid, 'INSTRUME': 'ACIS'}
+            ui.set_data(id, DataPHA('p{}'.format(id), x, x, header=hdr))
+
+        assert datastack.query_by_header_keyword('INSTRUME', 'ACIS') == \
+            [1, 2, 3]
+        assert datastack.query_by_obsid(11) == [1, 3]
+        assert datastack.query_by_obsid('12') == [2]
+        assert datastack.query_by_obsid([2, 3], 11) == [3]
+        assert datastack.query_by_header_keyword('DETNAM', 'ACIS-7') == []
+
+        # The stack's copy of the data is used once it has been deleted.
+        ui.delete_data(2)
+        assert datastack.query_by_obsid('12') == [2]
+        assert datastack.query_by_header_keyword('INSTRUME', 'ACIS') == \
+            [1, 2, 3]
+
+    finally:
+        datastack.clear_stack()
+        ui.clean()
+
+
+@pytest.mark.parametrize("numcores", [1, 2])
+def test_fit_each(numcores):
+    datastack.clear_stack()
+    ui.clean()
+    x = np.arange(1, 11)
+    try:
+        datastack.load_arrays([[x, 2 * x + 1], [x, 3 * x]])
+        datastack.set_source([], 'polynom1d.p__ID')
+        datastack.thaw([], 'p.c1')
+
+        res = datastack.fit_each(numcores=numcores)
+        assert len(res) == 2
+        assert res[0].datasets == (1,)
+        assert res[1].datasets == (2,)
+        assert res[0].parnames == ('p1.c0', 'p1.c1')
+
+        # The best-fit values are copied back.
+        assert ui.get_model_component('p1').c0.val == \
+            pytest.approx(1, abs=1e-6)
+        assert ui.get_model_component('p1').c1.val == pytest.approx(2)
+        assert ui.get_model_component('p2').c1.val == pytest.approx(3)
+
+    finally:
+        datastack.clear_stack()
+        ui.clean()
+
+
 def test_default_instantiation():
     datastack.DataStack._default_instantiated = False
     ds = datastack.DataStack()
@@ -1,6 +1,6 @@
 from __future__ import print_function
 #
-#  Copyright (C) 2009, 2015, 2016  Smithsonian Astrophysical Observatory
+#  Copyright (C) 2009, 2015, 2016, 2018  Smithsonian Astrophysical Observatory
 #
 #
 #  This program is free software; you can redistribute it and/or modify
@@ -22,12 +22,24 @@ from six.moves import range as xrange
 import numpy
 import numpy.random
 import logging
-from sherpa.astro.utils import calc_energy_flux
-from sherpa.utils import parallel_map
+from sherpa.astro.utils import calc_energy_flux, calc_photon_flux, \
+    _flux_weights
+from sherpa.utils import parallel_map, SherpaFloat, _ncpus
 from sherpa.sim import NormalParameterSampleFromScaleMatrix, \
     NormalParameterSampleFromScaleVector
+from sherpa.sim.sample import clip_to_limits, within_ranges
 
-__all__ = ['calc_flux', 'sample_flux', 'calc_sample_flux']
+__all__ = ['calc_flux', 'sample_flux', 'calc_sample_flux',
+           'calc_model_quantiles']
+
+
+# The number of samples evaluated per batch.
+_chunksize = 10000
+
+# The flux methods that can use the pre-computed bin weights, along
+# with the arguments to send to _flux_weights.
+_flux_weight_args = {calc_energy_flux: {'eflux': True},
+                     calc_photon_flux: {}}
 
 
 class CalcFluxWorker(object):
@@ -45,39 +57,239 @@ class CalcFluxWorker(object):
         return [flux] + list(sample)
 
 
+class CalcFluxBatchWorker(object):
+    """Calculate the flux for a block of samples.
+
+    The source model is evaluated on the grid for each sample and
+    the rows are then integrated with a single matrix product.
+    """
+
+    def __init__(self, fit, src, axislist, idx, weights):
+        self.fit = fit
+        self.src = src
+        self.axislist = axislist
+        self.idx = idx
+        self.weights = weights
+
+    def __call__(self, samples):
+        vals = numpy.empty((len(samples), self.weights.size), SherpaFloat)
+        for ii, sample in enumerate(samples):
+            self.fit.model.thawedpars = sample
+            y = numpy.asarray(self.src(*self.axislist), SherpaFloat)
+            vals[ii] = y[self.idx]
+
+        return vals.dot(self.weights)
+
+
 def calc_flux(fit, data, src, samples, method=calc_energy_flux,
-              lo=None, hi=None, numcores=None):
+              lo=None, hi=None, numcores=None, chunksize=None):
+    """Calculate the flux for a set of parameter samples.
+
+    Parameters
+    ----------
+    fit : sherpa.fit.Fit instance
+       The fit object. The thawed parameters of its model are set
+       to each sample in turn and restored on exit.
+    data : sherpa.data.Data instance
+       The data set defining the grid.
+    src : sherpa.models.Model instance
+       The source expression (which should not include the
+       instrument response).
+    samples : 2D array
+       The parameter values, one row per sample.
+    method : func, optional
+       The flux routine, such as `sherpa.astro.utils.calc_energy_flux`
+       or `sherpa.astro.utils.calc_photon_flux`.
+    lo, hi : number or None, optional
+       The band over which to calculate the flux.
+    numcores : int or None, optional
+       The number of processes to use.
+    chunksize : int or None, optional
+       The maximum number of samples evaluated per batch.
+
+    Returns
+    -------
+    vals : 2D array
+       The flux for each sample in the first column, followed by
+       the sample values.
+
+    Notes
+    -----
+    When method is `calc_energy_flux` or `calc_photon_flux` the
+    grid and the bin weights for the band are calculated once, and
+    each batch of samples is integrated with a matrix product,
+    rather than calling the method for every sample.
+    """
+
+    samples = numpy.asarray(samples)
+    old_model_vals = fit.model.thawedpars
+    try:
+        if method not in _flux_weight_args or samples.shape[0] == 0:
+            worker = CalcFluxWorker(fit, method, data, src, lo, hi)
+            return numpy.asarray(parallel_map(worker, samples, numcores))
+
+        axislist, idx, weights = _flux_weights(data, lo, hi,
+                                               **_flux_weight_args[method])
+        worker = CalcFluxBatchWorker(fit, src, axislist, idx, weights)
+
+        if chunksize is None:
+            chunksize = _chunksize
+
+        nsamples = samples.shape[0]
+        ncores = int(numcores or _ncpus or 1)
+        fluxes = numpy.empty(nsamples, SherpaFloat)
+        for start in xrange(0, nsamples, chunksize):
+            end = min(start + chunksize, nsamples)
+            blocks = numpy.array_split(samples[start:end],
+                                       max(1, min(ncores, end - start)))
+            vals = parallel_map(worker, blocks, ncores)
+            fluxes[start:end] = numpy.concatenate(vals)
 
-    def evaluate(sample):
-        fit.model.thawedpars = sample
-        flux = method(data, src, lo, hi)
-        return [flux] + list(sample)
+    finally:
+        fit.model.thawedpars = old_model_vals
 
+    return numpy.column_stack((fluxes, samples))
+
+
+class _QuantileHistogram(object):
+    """Approximate per-bin quantiles of a stream of model evaluations.
+
+    Each column is binned onto ``nhist`` equal-width bins spanning
+    the range of the first batch, with an extra bin at each end to
+    count values outside this range. The memory use is therefore
+    independent of the number of rows that are added.
+    """
+
+    def __init__(self, nhist=1000):
+        self.nhist = int(nhist)
+        self.lo = None
+        self.width = None
+        self.counts = None
+        self.vmin = None
+        self.vmax = None
+        self.nrows = 0
+
+    def add(self, vals):
+        vals = numpy.asarray(vals, SherpaFloat)
+        ncols = vals.shape[1]
+        nhist = self.nhist
+        if self.counts is None:
+            self.lo = vals.min(axis=0)
+            width = (vals.max(axis=0) - self.lo) / nhist
+            width[width <= 0] = 1.0
+            self.width = width
+            self.counts = numpy.zeros((ncols, nhist + 2), dtype=numpy.int64)
+            self.vmin = self.lo.copy()
+            self.vmax = vals.max(axis=0)
+
+        pos = numpy.floor((vals - self.lo) / self.width)
+        # values at the upper edge belong to the last bin
+        pos[pos == nhist] = nhist - 1
+        pos = numpy.clip(pos, -1, nhist).astype(numpy.int64) + 1
+        pos += numpy.arange(ncols) * (nhist + 2)
+        self.counts += numpy.bincount(pos.ravel(),
+                                      minlength=ncols * (nhist + 2)
+                                      ).reshape(ncols, nhist + 2)
+
+        numpy.minimum(self.vmin, vals.min(axis=0), out=self.vmin)
+        numpy.maximum(self.vmax, vals.max(axis=0), out=self.vmax)
+        self.nrows += vals.shape[0]
+
+    def quantiles(self, quantiles):
+        cumul = numpy.cumsum(self.counts, axis=1)
+        rows = numpy.arange(cumul.shape[0])
+        out = []
+        for q in quantiles:
+            target = q / 100.0 * self.nrows
+            k = (cumul < target).sum(axis=1)
+            k = numpy.minimum(k, self.nhist + 1)
+            below = numpy.where(k > 0, cumul[rows, k - 1], 0)
+            frac = (target - below) / numpy.maximum(self.counts[rows, k], 1)
+            vals = self.lo + (k - 1 + frac) * self.width
+            vals = numpy.where(k == 0, self.vmin, vals)
+            vals = numpy.where(k == self.nhist + 1, self.vmax, vals)
+            out.append(numpy.clip(vals, self.vmin, self.vmax))
+
+        return numpy.asarray(out)
+
+
+def calc_model_quantiles(fit, data, model, samples,
+                         quantiles=(2.5, 50, 97.5), noise=None,
+                         nhist=1000, chunksize=None):
+    """Calculate quantiles of the model over a set of parameter samples.
+
+    This can be used to create posterior-predictive bands, such as
+    the median and 95% range of the predicted counts per channel,
+    without storing the model evaluation for every sample.
+
+    Parameters
+    ----------
+    fit : sherpa.fit.Fit instance
+       The fit object. The thawed parameters of its model are set
+       to each sample in turn and restored on exit.
+    data : sherpa.data.Data instance
+       The data set, used to evaluate the model with its
+       ``eval_model`` method.
+    model : sherpa.models.Model instance
+       The model expression to evaluate (e.g. including the
+       instrument response to get predicted counts).
+    samples : 2D array
+       The parameter values, one row per sample.
+    quantiles : sequence of number, optional
+       The quantiles to calculate, as percentages.
+    noise : func or None, optional
+       If set, a function, such as `sherpa.utils.poisson_noise`,
+       that is applied to each batch of model values (a 2D array)
+       to create random realisations of the data.
+    nhist : int, optional
+       The number of histogram bins used per model bin.
+    chunksize : int or None, optional
+       The maximum number of samples evaluated per batch.
+
+    Returns
+    -------
+    vals : 2D array
+       The quantiles, with shape ``(len(quantiles), nbins)``.
+
+    Notes
+    -----
+    The quantiles are estimated from histograms spanning the range
+    of the first batch of samples, so their resolution is the
+    range divided by ``nhist``. Values outside this range are only
+    tracked by their minimum and maximum.
+    """
+
+    samples = numpy.asarray(samples)
+    if chunksize is None:
+        chunksize = _chunksize
+
+    hist = _QuantileHistogram(nhist)
     old_model_vals = fit.model.thawedpars
     try:
-        fluxes = parallel_map(CalcFluxWorker(fit, method, data, src, lo, hi), samples, numcores)
+        for start in xrange(0, samples.shape[0], chunksize):
+            block = samples[start:start + chunksize]
+            vals = None
+            for ii, sample in enumerate(block):
+                fit.model.thawedpars = sample
+                y = numpy.asarray(data.eval_model(model), SherpaFloat)
+                if vals is None:
+                    vals = numpy.empty((len(block), y.size), SherpaFloat)
+                vals[ii] = y
+
+            if noise is not None:
+                vals = noise(vals)
+
+            hist.add(vals)
+
     finally:
         fit.model.thawedpars = old_model_vals
 
-    return numpy.asarray(fluxes)
+    return hist.quantiles(quantiles)
 
 
 def sample_flux(fit, data, src, method=calc_energy_flux, correlated=False,
                 num=1, lo=None, hi=None, numcores=None, samples=None):
 
-    #
-    # The following function should be modified to take advantage of numpy
-    #
-    def within_limits(mysamples, mymins, mymaxs):
-        num_par = mysamples.shape[1]
-        for row in mysamples:
-            for index in xrange(num_par):
-                if row[index] < mymins[index]:
-                    row[index] = mymins[index]
-                if row[index] > mymaxs[index]:
-                    row[index] = mymaxs[index]
-        return mysamples
-
     sampler = NormalParameterSampleFromScaleVector()
     if correlated:
         sampler = NormalParameterSampleFromScaleMatrix()
@@ -92,7 +304,7 @@ def sample_flux(fit, data, src, method=calc_energy_flux, correlated=False,
 
     hardmins = fit.model._get_thawed_par_hardmins()
     hardmaxs = fit.model._get_thawed_par_hardmaxes()
-    samples = within_limits(samples, hardmins, hardmaxs)
+    samples = clip_to_limits(samples, hardmins, hardmaxs)
 
     return calc_flux(fit, data, src, samples, method, lo, hi, numcores)
 
@@ -101,14 +313,8 @@ def calc_sample_flux(id, lo, hi, session, fit, data, samples, modelcomponent,
                      confidence):
 
     def simulated_pars_within_ranges(mysamples, mysoftmins, mysoftmaxs):
-        num = len(mysoftmins)
-        for ii in xrange(num):
-            ii1 = ii + 1
-            tmp = (mysamples[:, ii1] > mysoftmins[ii])
-            selpmasym = mysamples[tmp]
-            tmp = (selpmasym[:, ii1] < mysoftmaxs[ii])
-            mysamples = selpmasym[tmp]
-        return mysamples
+        # the first column is the flux
+        return within_ranges(mysamples, mysoftmins, mysoftmaxs, offset=1)
 
     def print_sample_result(title, arg):
 
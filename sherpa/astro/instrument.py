@@ -44,15 +44,18 @@ import numpy
 import os
 import sherpa
 from sherpa.utils.err import InstrumentErr, DataErr, PSFErr
-from sherpa.models.model import ArithmeticModel, CompositeModel, Model
+from sherpa.models.model import ArithmeticModel, CompositeModel, Model, \
+    shared_calc
 
 from sherpa.instrument import PSFModel as _PSFModel
-from sherpa.utils import NoNewAttributesAfterInit
+from sherpa.utils import NoNewAttributesAfterInit, SherpaFloat
 from sherpa.data import Data1D
 from sherpa.astro.data import DataARF, DataRMF, DataPHA, _notice_resp, \
     DataIMG
 from sherpa.utils import sao_fcmp, sum_intervals, sao_arange
 from sherpa.astro.utils import compile_energy_grid
+from sherpa.astro.utils.response import SparseResponse, \
+    interval_response, stack_responses
 
 WCS = None
 try:
@@ -66,8 +69,9 @@ __all__ = ('RMFModel', 'ARFModel', 'RSPModel',
            'RMFModelPHA', 'RMFModelNoPHA',
            'ARFModelPHA', 'ARFModelNoPHA',
            'RSPModelPHA', 'RSPModelNoPHA',
-           'MultiResponseSumModel', 'PileupRMFModel', 'RMF1D', 'ARF1D',
-           'Response1D', 'MultipleResponse1D', 'PileupResponse1D',
+           'MultiResponseSumModel', 'MultiResponseSet', 'PileupRMFModel',
+           'RMF1D', 'ARF1D', 'Response1D', 'MultipleResponse1D',
+           'PileupResponse1D',
            'PSFModel')
 
 
@@ -313,9 +317,7 @@ class RMFModelPHA(RMFModel):
         rmf = self._rmf  # original
 
         # Create a view of original RMF
-        self.rmf = DataRMF(rmf.name, rmf.detchans, rmf.energ_lo, rmf.energ_hi,
-                           rmf.n_grp, rmf.f_chan, rmf.n_chan, rmf.matrix,
-                           rmf.offset, rmf.e_min, rmf.e_max, rmf.header)
+        self.rmf = rmf.get_view()
 
         # Filter the view for current fitting session
         _notice_resp(self.pha.get_noticed_channels(), None, self.rmf)
@@ -338,7 +340,7 @@ class RMFModelPHA(RMFModel):
     def calc(self, p, x, xhi=None, *args, **kwargs):
         # x is noticed/full channels here
 
-        src = self.model.calc(p, self.xlo, self.xhi)
+        src = shared_calc(self.model, p, self.xlo, self.xhi)
         out = self.rmf.apply_rmf(src, *self.rmfargs)
 
         return apply_areascal(out, self.pha,
@@ -361,7 +363,7 @@ class RMFModelNoPHA(RMFModel):
         # x is noticed/full channels here
 
         # Always evaluates source model in keV!
-        src = self.model.calc(p, self.xlo, self.xhi)
+        src = shared_calc(self.model, p, self.xlo, self.xhi)
         return self.rmf.apply_rmf(src)
 
 
@@ -413,8 +415,7 @@ class ARFModelPHA(ARFModel):
         pha = self.pha
 
         # Create a view of original ARF
-        self.arf = DataARF(arf.name, arf.energ_lo, arf.energ_hi, arf.specresp,
-                           arf.bin_lo, arf.bin_hi, arf.exposure, arf.header)
+        self.arf = arf.get_view()
 
         # Filter the view for current fitting session
         if numpy.iterable(pha.mask):
@@ -440,7 +441,7 @@ class ARFModelPHA(ARFModel):
     def calc(self, p, x, xhi=None, *args, **kwargs):
         # x could be channels or x, xhi could be energy|wave
 
-        src = self.model.calc(p, self.xlo, self.xhi)
+        src = shared_calc(self.model, p, self.xlo, self.xhi)
         src = self.arf.apply_arf(src, *self.arfargs)
 
         return apply_areascal(src, self.pha,
@@ -468,10 +469,108 @@ class ARFModelNoPHA(ARFModel):
         # else:
 
         # Always evaluates source model in keV!
-        src = self.model.calc(p, self.xlo, self.xhi)
+        src = shared_calc(self.model, p, self.xlo, self.xhi)
         return self.arf.apply_arf(src)
 
 
+class ARFBasisFold(object):
+    """Fold an ARF written as a linear combination of basis vectors.
+
+    The calibration-uncertainty samplers (``PragBayes`` and
+    ``FullBayes``) write the effective area as::
+
+        specresp = base + sum_k coeffs[k] * basis[k]
+
+    Since the fold of a source array through the ARF and RMF is linear
+    in the effective area, the folded model is the same combination of
+    the folds of ``base`` and each ``basis`` vector. These folds are
+    cached, for a given source array, so that a new set of
+    coefficients only requires a weighted sum of the cached folds
+    rather than a full fold through the RMF.
+
+    Parameters
+    ----------
+    base : array
+       The effective area when all the coefficients are zero.
+    basis : 2D array
+       The deviation vectors, with shape (ncomp, nenergy).
+
+    Attributes
+    ----------
+    active : bool
+       The cached folds are only used (and, if necessary, re-calculated)
+       when ``active`` is set. This lets the caller restrict the cache
+       to the evaluations made with a fixed set of model parameters.
+
+    """
+
+    def __init__(self, base, basis):
+        self.base = numpy.asarray(base, dtype=SherpaFloat)
+        self.basis = numpy.atleast_2d(numpy.asarray(basis, dtype=SherpaFloat))
+        self.coeffs = numpy.zeros(self.basis.shape[0], dtype=SherpaFloat)
+        self.specresp = None
+        self.active = False
+        self._src = None
+        self._folds = None
+
+    def set_coeffs(self, coeffs, specresp):
+        """Record the coefficients used to create the ARF.
+
+        Parameters
+        ----------
+        coeffs : array or None
+           The coefficients for each basis vector. If None then the
+           ARF is not a combination of the basis vectors and the
+           cached folds are not used.
+        specresp : array
+           The effective-area array that was created with these
+           coefficients (i.e. the array stored in the ARF). The folds
+           are only used while the ARF contains this array.
+
+        """
+        if coeffs is None:
+            self.specresp = None
+            return
+
+        self.coeffs = numpy.asarray(coeffs, dtype=SherpaFloat)
+        self.specresp = specresp
+
+    def applies(self, arf):
+        """Can the cached folds be used for this ARF?
+
+        The ARF must contain the array recorded by `set_coeffs` and
+        must not be filtered.
+        """
+        return self.active and self.specresp is not None and \
+            arf.specresp is self.specresp and \
+            arf.get_dep() is self.specresp
+
+    def fold(self, src, fold):
+        """Return the folded model for the current coefficients.
+
+        Parameters
+        ----------
+        src : array
+           The source model, evaluated on the ARF grid.
+        fold : callable
+           Called with the source array and an effective-area array
+           and returns the folded model.
+
+        Returns
+        -------
+        model : array
+           The folded model.
+
+        """
+        if self._src is None or not numpy.array_equal(src, self._src):
+            folds = [fold(src, self.base)]
+            folds.extend(fold(src, vec) for vec in self.basis)
+            self._folds = numpy.asarray(folds)
+            self._src = numpy.array(src, copy=True)
+
+        return self._folds[0] + numpy.dot(self.coeffs, self._folds[1:])
+
+
 class RSPModelPHA(RSPModel):
     """RMF + ARF convolution model with associated PHA.
 
@@ -479,8 +578,27 @@ class RSPModelPHA(RSPModel):
     -----
     Scaling by the AREASCAL setting (scalar or array) is included in
     this model.
+
+    When the ``arf_basis`` attribute is set to an `ARFBasisFold`
+    object then the folded model is calculated from the cached folds
+    of the basis vectors, rather than the ARF, when applicable.
+
+    When the ARF and RMF use the same energy grid, `startup` creates a
+    combined response - the RMF matrix multiplied by the effective
+    area - so that each evaluation is a single fold. It is only used
+    while the filtered ARF still holds the effective-area array that
+    it was built from, so changing the ARF (e.g. with `set_arf` or
+    by replacing ``specresp``) falls back to folding through the ARF
+    and then the RMF. Changing the values of the effective-area array
+    in place during a fit is not detected.
     """
 
+    arf_basis = None
+
+    # The (effective area, sparse RMF, combined response) set up by
+    # startup, or None.
+    _combined = None
+
     def __init__(self, arf, rmf, pha, model):
         self.pha = pha
         self._arf = arf
@@ -527,13 +645,10 @@ class RSPModelPHA(RSPModel):
         rmf = self._rmf
 
         # Create a view of original RMF
-        self.rmf = DataRMF(rmf.name, rmf.detchans, rmf.energ_lo, rmf.energ_hi,
-                           rmf.n_grp, rmf.f_chan, rmf.n_chan, rmf.matrix,
-                           rmf.offset, rmf.e_min, rmf.e_max, rmf.header)
+        self.rmf = rmf.get_view()
 
         # Create a view of original ARF
-        self.arf = DataARF(arf.name, arf.energ_lo, arf.energ_hi, arf.specresp,
-                           arf.bin_lo, arf.bin_hi, arf.exposure, arf.header)
+        self.arf = arf.get_view()
 
         # Filter the view for current fitting session
         _notice_resp(self.pha.get_noticed_channels(), self.arf, self.rmf)
@@ -545,15 +660,43 @@ class RSPModelPHA(RSPModel):
         if self.pha.units == 'wavelength':
             self.xlo, self.xhi = self.lo, self.hi
 
+        self._combined = self._combine_response()
+
         RSPModel.startup(self)
 
     def teardown(self):
         self.arf = self._arf  # restore originals
         self.rmf = self._rmf
+        self._combined = None
 
         self.filter()
         RSPModel.teardown(self)
 
+    def _combine_response(self):
+        """Multiply the RMF by the ARF, if they use the same grid."""
+        if self.arfargs != () or self.rmfargs != ():
+            return None
+
+        specresp = self.arf.get_dep()
+        sparse = self.rmf.get_sparse()
+        if specresp is None or len(specresp) != sparse.nenergy:
+            return None
+
+        return (specresp, sparse, sparse.scale(specresp))
+
+    def _get_combined(self):
+        """Return the combined response if it is still valid, or None."""
+        combined = self._combined
+        if combined is None:
+            return None
+
+        specresp, sparse, rsp = combined
+        if self.arf.get_dep() is not specresp or \
+           self.rmf.get_sparse() is not sparse:
+            return None
+
+        return rsp
+
     def calc(self, p, x, xhi=None, *args, **kwargs):
         # x could be channels or x, xhi could be energy|wave
 
@@ -565,19 +708,32 @@ class RSPModelPHA(RSPModel):
             xhi = self.rmf._hi_unfiltered
         else:
             xhi = self.xhi
-        src = self.model.calc(p, xlo, xhi)
+        src = shared_calc(self.model, p, xlo, xhi)
         bin_mask = self.rmf.bin_mask
         if bin_mask is not None and \
            (len(bin_mask) == len(xlo) and len(bin_mask) == len(xhi)):
             src = src[bin_mask]
-        src = self.arf.apply_arf(src, *self.arfargs)
-        src = self.rmf.apply_rmf(src, *self.rmfargs)
+
+        basis = self.arf_basis
+        combined = self._get_combined()
+        if basis is not None and basis.applies(self.arf):
+            src = basis.fold(src, self._fold)
+        elif combined is not None:
+            src = combined.fold(src)
+        else:
+            src = self.arf.apply_arf(src, *self.arfargs)
+            src = self.rmf.apply_rmf(src, *self.rmfargs)
 
         # Assume any issues with the binning (between AREASCAL
         # and src) is related to the RMF rather than the ARF.
         return apply_areascal(src, self.pha,
                               "RMF: {}".format(self.rmf.name))
 
+    def _fold(self, src, specresp):
+        """Fold src through the RMF using the given effective area."""
+        src = self.arf.apply_arf(src, *self.arfargs, specresp=specresp)
+        return self.rmf.apply_rmf(src, *self.rmfargs)
+
 
 class RSPModelNoPHA(RSPModel):
     """RMF + ARF convolution model without associated PHA data set.
@@ -595,7 +751,7 @@ class RSPModelNoPHA(RSPModel):
         # x could be channels or x, xhi could be energy|wave
 
         # Always evaluates source model in keV!
-        src = self.model.calc(p, self.xlo, self.xhi)
+        src = shared_calc(self.model, p, self.xlo, self.xhi)
         src = self.arf.apply_arf(src, *self.arfargs)
         return self.rmf.apply_rmf(src, *self.rmfargs)
 
@@ -804,9 +960,247 @@ class ResponseNestedModel(Model):
         return rmf.apply_rmf(*args, **kwargs)
 
 
+def _response_grid(arf, rmf):
+    """The noticed energy grid of a response."""
+    if arf is not None:
+        return arf.get_indep()
+    return rmf.get_indep()
+
+
+def _response_key(arf, rmf):
+    """The arrays which define the noticed response (compared by identity)."""
+    key = ()
+    if arf is not None:
+        key += (arf._rsp, arf._lo, arf._hi)
+    if rmf is not None:
+        key += (rmf._grp, rmf._fch, rmf._nch, rmf._rsp, rmf._lo, rmf._hi)
+    return key
+
+
+class _MultiResponseOperator(object):
+    """The sparse operators for a set of responses.
+
+    The source model is evaluated on the union (elo, ehi) of the
+    noticed energy grids. The ``weights`` operator sums this over the
+    energy bins of each response and applies the ARF, and the
+    ``response`` operator applies the RMFs, placing the output of each
+    response (order) of each dataset in its own block of rows.
+    """
+
+    def __init__(self, elo, ehi, weights, response, blocks):
+        self.elo = elo
+        self.ehi = ehi
+        self.lo = DataPHA._hc / ehi
+        self.hi = DataPHA._hc / elo
+        self.weights = weights
+        self.response = response
+        # (start, norders, nchan) for each dataset
+        self.blocks = blocks
+
+    @classmethod
+    def create(cls, responses):
+        """Create the operator, or return None if it can not be used.
+
+        The responses are given as a list, per dataset, of the (arf,
+        rmf) pairs.
+        """
+        grids = [_response_grid(arf, rmf)
+                 for pairs in responses for arf, rmf in pairs]
+        if len(grids) == 0:
+            return None
+
+        elo, ehi, table = compile_energy_grid(grids)
+
+        weights = []
+        for (arf, rmf), (lo_idx, hi_idx) in \
+                izip([pair for pairs in responses for pair in pairs], table):
+            specresp = None if arf is None else arf.get_dep()
+            weights.append((lo_idx, hi_idx, specresp))
+
+        lo_idx = numpy.concatenate([w[0] for w in weights])
+        hi_idx = numpy.concatenate([w[1] for w in weights])
+        if any(w[2] is None for w in weights):
+            scale = numpy.concatenate([numpy.ones(len(w[0]))
+                                       if w[2] is None else w[2]
+                                       for w in weights])
+        else:
+            scale = numpy.concatenate([w[2] for w in weights])
+
+        try:
+            weights = interval_response(lo_idx, hi_idx, elo.size, scale)
+        except ValueError:
+            return None
+
+        rsps = []
+        offsets = []
+        blocks = []
+        start = 0
+        for pairs in responses:
+            nchans = []
+            for arf, rmf in pairs:
+                nbins = len(_response_grid(arf, rmf)[0])
+                if rmf is None:
+                    indptr = numpy.arange(nbins + 1)
+                    rsp = SparseResponse(indptr, indptr[:-1],
+                                         numpy.ones(nbins), nbins)
+                else:
+                    rsp = rmf.get_sparse()
+                    if rsp.nenergy != nbins:
+                        return None
+
+                rsps.append(rsp)
+                nchans.append(rsp.nchan)
+
+            if len(set(nchans)) != 1:
+                return None
+
+            nchan = nchans[0]
+            offsets.extend(start + nchan * numpy.arange(len(pairs)))
+            blocks.append((start, len(pairs), nchan))
+            start += nchan * len(pairs)
+
+        response = stack_responses(rsps, offsets, start)
+        return cls(elo, ehi, weights, response, blocks)
+
+
+class MultiResponseSet(NoNewAttributesAfterInit):
+    """Fold a source through all the responses of several PHA datasets.
+
+    The source model is evaluated once, on the union of the noticed
+    energy grids of all the responses (e.g. the grating orders) of all
+    the datasets (e.g. the rows of a PHA2 file), and the predicted
+    counts for every response are calculated with a single interval
+    sum and a single fold. When several datasets share the set, as in
+    a simultaneous fit, the source is only evaluated once for each set
+    of parameter values.
+
+    Parameters
+    ----------
+    phas : sequence of DataPHA instances
+        The datasets. Each must have at least one response.
+
+    See Also
+    --------
+    MultiResponseSumModel, MultipleResponse1D
+
+    Examples
+    --------
+
+    Create the models for the PHA datasets in phas, which can then
+    be fit together:
+
+    >>> rset = MultiResponseSet(phas)
+    >>> models = rset(src)
+
+    """
+
+    def __init__(self, phas):
+        self.phas = list(phas)
+        for pha in self.phas:
+            if len(pha.response_ids) == 0:
+                raise DataErr('norsp', pha.name)
+
+        self._key = None
+        self._operator = None
+        self._evaluation = None
+        NoNewAttributesAfterInit.__init__(self)
+
+    def __call__(self, model, session=None):
+        """Return the model expression for each dataset."""
+
+        if isinstance(model, string_types):
+            if session is None:
+                model = sherpa.astro.ui._session._eval_model_expression(model)
+            else:
+                model = session._eval_model_expression(model)
+
+        models = []
+        for pha in self.phas:
+            pha.notice_response(False)
+            mdl = MultiResponseSumModel(model, pha, responses=self)
+            if pha.exposure:
+                mdl = pha.exposure * mdl
+            models.append(mdl)
+
+        return models
+
+    def _get_operator(self):
+        """Return the operator for the current response filters."""
+        responses = [[pha.get_response(id) for id in pha.response_ids]
+                     for pha in self.phas]
+        key = [_response_key(arf, rmf)
+               for pairs in responses for arf, rmf in pairs]
+        if self._key is not None and len(key) == len(self._key) and \
+           all(len(a) == len(b) and all(x is y for x, y in izip(a, b))
+               for a, b in izip(key, self._key)):
+            return self._operator
+
+        self._evaluation = None
+        self._operator = _MultiResponseOperator.create(responses)
+        self._key = key
+        return self._operator
+
+    def calc_orders(self, source, pha):
+        """Return the predicted counts of each response of the dataset.
+
+        Parameters
+        ----------
+        source : sherpa.models.model.Model instance
+            The source model, which is evaluated on the union grid.
+        pha : DataPHA instance
+            The dataset, which must be one of the datasets in the set.
+
+        Returns
+        -------
+        orders : array or None
+            The counts, with shape (number of responses, number of
+            channels). None is returned if the responses can not be
+            combined (e.g. the ARF and RMF grids do not match).
+        """
+        row = [idx for idx, d in enumerate(self.phas) if d is pha]
+        if len(row) == 0:
+            raise DataErr('bad', 'data set', pha.name)
+
+        op = self._get_operator()
+        if op is None:
+            return None
+
+        xlo, xhi = op.elo, op.ehi
+        if pha.units == 'wavelength':
+            xlo, xhi = op.lo, op.hi
+
+        pars = tuple(par.val for par in source.pars)
+        evaluation = self._evaluation
+        if len(self.phas) > 1 and evaluation is not None and \
+           evaluation[0] is source and evaluation[1] is xlo and \
+           evaluation[2] == pars:
+            counts = evaluation[3]
+        else:
+            counts = op.response.fold(op.weights.fold(source(xlo, xhi)))
+            self._evaluation = (source, xlo, pars, counts)
+
+        start, norders, nchan = op.blocks[row[0]]
+        return counts[start:start + norders * nchan].reshape(norders, nchan)
+
+
 class MultiResponseSumModel(CompositeModel, ArithmeticModel):
+    """Sum the source model folded through each response of a dataset.
 
-    def __init__(self, source, pha):
+    Parameters
+    ----------
+    source : sherpa.models.model.Model instance
+        The source model.
+    pha : DataPHA instance
+        The dataset, whose responses (e.g. grating orders) are used.
+    responses : MultiResponseSet instance or None, optional
+        The set used to evaluate the model, which can be shared with
+        other datasets. If None then a set is created for pha.
+    """
+
+    def __init__(self, source, pha, responses=None):
+        if responses is None:
+            responses = MultiResponseSet([pha])
+        self.responses = responses
         self.channel = pha.channel
         self.mask = numpy.ones(len(pha.channel), dtype=bool)
         self.pha = pha
@@ -918,8 +1312,12 @@ class MultiResponseSumModel(CompositeModel, ArithmeticModel):
                 user_grid = True
                 self._startup_user_grid(x, xhi)
 
+            orders = self.responses.calc_orders(self.source, pha)
+            if orders is not None:
+                self.orders = list(orders)
+
             # Slow
-            if self.table is None:
+            elif self.table is None:
                 # again, fit() never comes in here b/c it calls startup()
                 src = self.source
                 vals = []
@@ -1031,7 +1429,7 @@ class PileupRMFModel(CompositeModel, ArithmeticModel):
     def _calc(self, p, xlo, xhi):
         # Evaluate source model on RMF energy/wave grid OR
         # model.calc --> pileup_model
-        src = self.model.calc(p, xlo, xhi)
+        src = shared_calc(self.model, p, xlo, xhi)
 
         # rmf_fold
         return self.rmf.apply_rmf(src)
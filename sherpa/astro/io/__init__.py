@@ -37,6 +37,7 @@ References
 
 """
 
+import six
 from six.moves import zip as izip
 from six.moves.configparser import ConfigParser
 
@@ -51,6 +52,7 @@ from sherpa.utils import SherpaFloat
 from sherpa.data import Data2D, Data1D, BaseData, Data2DInt
 from sherpa.astro.data import DataIMG, DataIMGInt, DataARF, DataRMF, DataPHA, DataRosatRMF
 from sherpa import get_config
+from sherpa.astro.io import registry, rmfcache
 
 import importlib
 
@@ -83,6 +85,21 @@ else:
     if ogip_emin <= 0.0:
         raise ValueError(emsg)
 
+# The directory used to cache the RMF data (see sherpa.astro.io.rmfcache).
+if config.has_option('ogip', 'rmf_cache_dir'):
+    rmf_cache_dir = config.get('ogip', 'rmf_cache_dir').strip()
+    if rmf_cache_dir.upper() not in ('', 'NONE'):
+        try:
+            rmfcache.set_cache_dir(rmf_cache_dir)
+        except OSError as exc:
+            logging.getLogger(__name__).warning(
+                "Unable to use the RMF cache directory %s: %s",
+                rmf_cache_dir, exc)
+
+# Are responses shared between data sets (see sherpa.astro.io.registry)?
+if config.has_option('ogip', 'share_responses'):
+    registry.set_enabled(config.getboolean('ogip', 'share_responses'))
+
 if io_opt.startswith('pycrates') or io_opt.startswith('crates'):
     io_opt = 'crates_backend'
 
@@ -104,7 +121,8 @@ info    = logging.getLogger(__name__).info
 
 __all__ = ('read_table', 'read_image', 'read_arf', 'read_rmf', 'read_arrays',
            'read_pha', 'write_image', 'write_pha', 'write_table',
-           'pack_table', 'pack_image', 'pack_pha', 'read_table_blocks')
+           'pack_table', 'pack_image', 'pack_pha', 'read_table_blocks',
+           'read_events')
 
 
 def _is_subclass(t1, t2):
@@ -289,7 +307,7 @@ def read_ascii(filename, ncols=2, colkeys=None, dstype=Data1D, **kwargs):
     return dstype(name, *cols)
 
 
-def read_image(arg, coord='logical', dstype=DataIMG):
+def read_image(arg, coord='logical', dstype=DataIMG, lazy=False):
     """Create an image dataset from a file.
 
     Parameters
@@ -304,6 +322,12 @@ def read_image(arg, coord='logical', dstype=DataIMG):
     dstype : optional
         The data type to create (it is expected to follow the
         `sherpa.data.BaseData` interface).
+    lazy : bool, optional
+        If set, and dstype is `sherpa.astro.data.DataIMG`, then the
+        pixel coordinates are not stored but are calculated when
+        needed, so that only the noticed pixels are created when
+        fitting. The pixel values are memory mapped, rather than
+        read in, when supported by the I/O backend.
 
     Returns
     -------
@@ -331,6 +355,13 @@ def read_image(arg, coord='logical', dstype=DataIMG):
     data, filename = backend.get_image_data(arg)
     axlens = data['y'].shape
 
+    if lazy and issubclass(dstype, DataIMG) and \
+       not issubclass(dstype, DataIMGInt):
+        data['y'] = data['y'].ravel()
+        data['coord'] = coord
+        data['shape'] = axlens
+        return dstype(filename, None, None, **data)
+
     x0 = numpy.arange(axlens[1], dtype=SherpaFloat) + 1.
     x1 = numpy.arange(axlens[0], dtype=SherpaFloat) + 1.
     x0, x1 = reshape_2d_arrays(x0, x1)
@@ -367,7 +398,23 @@ def read_arf(arg):
     -------
     data : sherpa.astro.data.DataARF
 
+    Notes
+    -----
+    When arg is the name of a file the ARF is shared with the other
+    data sets that use the same file (see `sherpa.astro.io.registry`),
+    so the arrays are read only: changing them in place, such as
+    ``arf.specresp *= 0.9``, raises a ValueError. The arrays can be
+    replaced instead (``arf.specresp = arf.specresp * 0.9``), which
+    only changes this ARF, or the sharing can be turned off with the
+    ``share_responses`` setting in the ``[ogip]`` section of the
+    Sherpa configuration file or by calling
+    ``sherpa.astro.io.registry.set_enabled(False)``.
+
     """
+    return registry.get(arg, _read_arf, ('arf', ogip_emin, backend.__name__))
+
+
+def _read_arf(arg):
     data, filename = backend.get_arf_data(arg)
 
     # It is unlikely that the backend will set this, but allow
@@ -393,8 +440,33 @@ def read_rmf(arg):
     -------
     data : sherpa.astro.data.DataRMF
 
+    Notes
+    -----
+    When arg is the name of a file the RMF is shared with the other
+    data sets that use the same file (see `sherpa.astro.io.registry`),
+    so the arrays are read only: changing them in place, such as
+    ``rmf.matrix *= 0.9``, raises a ValueError. The arrays can be
+    replaced instead (``rmf.matrix = rmf.matrix * 0.9``), which only
+    changes this RMF, or the sharing can be turned off with the
+    ``share_responses`` setting in the ``[ogip]`` section of the
+    Sherpa configuration file or by calling
+    ``sherpa.astro.io.registry.set_enabled(False)``.
+
     """
-    data, filename = backend.get_rmf_data(arg)
+    return registry.get(arg, _read_rmf, ('rmf', ogip_emin, backend.__name__))
+
+
+def _read_rmf(arg):
+    data = None
+    cached = isinstance(arg, six.string_types)
+    if cached:
+        data = rmfcache.load(arg)
+        filename = arg
+
+    if data is None:
+        data, filename = backend.get_rmf_data(arg)
+        if cached:
+            rmfcache.save(arg, data)
 
     # It is unlikely that the backend will set this, but allow
     # it to override the config setting.
@@ -603,6 +675,235 @@ def read_pha(arg, use_errors=False, use_background=False):
     return phasets
 
 
+def _event_mask(cols, filters):
+    """Which events pass the filters (None means all of them)?"""
+
+    mask = None
+    for name, (lo, hi) in filters:
+        vals = cols[name]
+        if lo is not None:
+            sel = vals >= lo
+            mask = sel if mask is None else mask & sel
+        if hi is not None:
+            sel = vals < hi
+            mask = sel if mask is None else mask & sel
+
+    return mask
+
+
+def _event_limits(info, name):
+    """The TLMIN and TLMAX values of the column."""
+
+    col = info['columns'][name]
+    if col['lmin'] is None or col['lmax'] is None:
+        raise IOErr('nokeyword', info['filename'],
+                    'TLMIN/TLMAX for column {}'.format(name))
+
+    return col['lmin'], col['lmax']
+
+
+def _event_exposure(header, time):
+    """The exposure time, scaled by the fraction of the observation
+    selected by the time filter."""
+
+    exposure = header.get('EXPOSURE')
+    if exposure is None or time is None:
+        return exposure
+
+    tstart = header.get('TSTART')
+    tstop = header.get('TSTOP')
+    if tstart is None or tstop is None or tstop <= tstart:
+        return exposure
+
+    lo = tstart if time[0] is None else max(time[0], tstart)
+    hi = tstop if time[1] is None else min(time[1], tstop)
+    return exposure * max(hi - lo, 0) / (tstop - tstart)
+
+
+def _event_wcs(name, wcstype, crval, crpix, cdelt):
+    """Create a transform, if the WCS module is available."""
+
+    try:
+        from sherpa.astro.io.wcs import WCS
+    except ImportError:
+        return None
+
+    crval, crpix, cdelt = [numpy.asarray(val, dtype=SherpaFloat)
+                           for val in (crval, crpix, cdelt)]
+    return WCS(name, wcstype, crval, crpix, cdelt)
+
+
+def _event_eqpos(info, xcol, ycol):
+    """The physical to world transform of the sky columns."""
+
+    xinfo = info['columns'][xcol]
+    yinfo = info['columns'][ycol]
+    keys = ['crvl', 'crpx', 'cdlt']
+    if any(xinfo[key] is None or yinfo[key] is None for key in keys):
+        return None
+
+    return _event_wcs('world', 'WCS',
+                      *[[xinfo[key], yinfo[key]] for key in keys])
+
+
+def read_events(arg, dstype=DataPHA, channel='pi', coords=('x', 'y'),
+                binsize=1, bounds=None, time=None, energy=None,
+                timecol='time', energycol='energy', coord='logical',
+                blockname='EVENTS', chunksize=1000000):
+    """Create a PHA or image dataset by binning an event list.
+
+    The events are read in a block of rows at a time, so that the
+    whole table does not need to be held in memory.
+
+    .. versionadded:: 4.12.0
+
+    Parameters
+    ----------
+    arg
+        The name of the file or a representation of the file
+        (the type depends on the I/O backend).
+    dstype : optional
+        The data type to create: `sherpa.astro.data.DataPHA`, which
+        bins the events by channel, or `sherpa.astro.data.DataIMG`,
+        which bins them by position.
+    channel : str, optional
+        The column to use for the channel number of a PHA dataset.
+        The channel range is taken from the TLMIN and TLMAX values
+        of the column.
+    coords : pair of str, optional
+        The columns to use for the image axes.
+    binsize : number, optional
+        The pixel size of the image, in the units of the `coords`
+        columns.
+    bounds : pair of (lo, hi) ranges, optional
+        The range of the two image axes. If not set then the TLMIN
+        and TLMAX values of the columns are used.
+    time, energy : (lo, hi) pair, optional
+        Only include events whose time or energy falls in the range
+        lo <= value < hi, in the units used by the column. Either
+        limit can be None.
+    timecol, energycol : str, optional
+        The columns used by the `time` and `energy` filters.
+    coord : {'logical', 'physical', 'world'}, optional
+        The coordinate system to use for the image.
+    blockname : str, optional
+        The name of the block containing the events; if there is no
+        block with this name then the first table is used.
+    chunksize : int, optional
+        The maximum number of rows to process at a time.
+
+    Returns
+    -------
+    data : sherpa.astro.data.DataPHA or sherpa.astro.data.DataIMG
+
+    See Also
+    --------
+    read_image, read_pha
+
+    Notes
+    -----
+    Events outside the channel range, or the image bounds, are
+    ignored. The exposure time is taken from the EXPOSURE keyword;
+    when a time filter is used it is scaled by the fraction of the
+    observation (TSTART to TSTOP) that was selected, which ignores
+    any gaps in the good time intervals.
+
+    Examples
+    --------
+
+    Create a spectrum from the PI values of events with an energy
+    between 500 and 7000 eV:
+
+    >>> pha = read_events('evt2.fits', energy=(500, 7000))
+
+    Create an image, with a bin size of 2, of a region of the sky:
+
+    >>> img = read_events('evt2.fits', dstype=DataIMG, binsize=2,
+    ...                   bounds=[(3800, 4300), (3900, 4400)])
+
+    """
+    if issubclass(dstype, DataIMG) and not issubclass(dstype, DataIMGInt):
+        xcol, ycol = coords
+        bincols = [xcol, ycol]
+    elif issubclass(dstype, DataPHA):
+        bincols = [channel]
+    else:
+        raise IOErr('bad', 'data type', dstype.__name__)
+
+    filters = []
+    if time is not None:
+        filters.append((timecol, tuple(time)))
+    if energy is not None:
+        filters.append((energycol, tuple(energy)))
+
+    colkeys = bincols + [name for name, _ in filters
+                         if name not in bincols]
+
+    events = backend.iter_event_data(arg, colkeys, blockname=blockname,
+                                     chunksize=int(chunksize))
+    try:
+        info = next(events)
+        if len(bincols) == 1:
+            lo, hi = _event_limits(info, channel)
+            lo = int(lo)
+            shape = (int(hi) - lo + 1, )
+        else:
+            if bounds is None:
+                bounds = [_event_limits(info, name) for name in bincols]
+
+            (xlo, xhi), (ylo, yhi) = bounds
+            shape = (int(numpy.ceil((yhi - ylo) / binsize)),
+                     int(numpy.ceil((xhi - xlo) / binsize)))
+
+        nbins = numpy.prod(shape)
+        counts = numpy.zeros(nbins, dtype=numpy.int64)
+        for vals in events:
+            cols = dict(zip(colkeys, vals))
+            mask = _event_mask(cols, filters)
+            if len(bincols) == 1:
+                idx = cols[channel].astype(numpy.int64) - lo
+                keep = (idx >= 0) & (idx < nbins)
+            else:
+                ix = numpy.floor((cols[xcol] - xlo) / binsize)
+                iy = numpy.floor((cols[ycol] - ylo) / binsize)
+                keep = (ix >= 0) & (ix < shape[1]) & \
+                    (iy >= 0) & (iy < shape[0])
+                idx = iy * shape[1] + ix
+
+            if mask is not None:
+                keep &= mask
+
+            # Only count over the range of bins used by this chunk,
+            # rather than creating an array of nbins elements.
+            idx = idx[keep].astype(numpy.int64)
+            if idx.size > 0:
+                start = idx.min()
+                counts[start:idx.max() + 1] += numpy.bincount(idx - start)
+
+    finally:
+        events.close()
+
+    filename = info['filename']
+    header = info['header']
+    exposure = _event_exposure(header, time)
+    counts = counts.astype(SherpaFloat)
+
+    if len(bincols) == 1:
+        chans = numpy.arange(lo, lo + shape[0], dtype=SherpaFloat)
+        return dstype(filename, chans, counts, exposure=exposure,
+                      header=header)
+
+    x0 = numpy.arange(shape[1], dtype=SherpaFloat) + 1.
+    x1 = numpy.arange(shape[0], dtype=SherpaFloat) + 1.
+    x0, x1 = reshape_2d_arrays(x0, x1)
+
+    sky = _event_wcs('physical', 'LINEAR', [xlo, ylo], [0.5, 0.5],
+                     [binsize, binsize])
+    return dstype(filename, x0, x1, counts, shape=shape, sky=sky,
+                  eqpos=_event_eqpos(info, xcol, ycol), coord=coord,
+                  header=header)
+
+
 def _pack_table(dataset):
     names = dataset._fields
     cols = [(name, getattr(dataset, name)) for name in names]
@@ -44,7 +44,7 @@ except:
 
 __all__ = ('get_table_data', 'get_image_data', 'get_arf_data', 'get_rmf_data',
            'get_pha_data', 'set_table_data', 'set_image_data', 'set_pha_data',
-           'get_column_data', 'get_ascii_data')
+           'get_column_data', 'get_ascii_data', 'iter_event_data')
 
 
 def open_crate_dataset(filename, crateType=pycrates.CrateDataset, mode='r'):
@@ -698,6 +698,70 @@ def get_image_data(arg, make_copy=True, fix_type=True):
     return data, filename
 
 
+def iter_event_data(arg, colkeys, blockname='EVENTS', chunksize=1000000):
+    """
+    iter_event_data( filename , colkeys [, blockname='EVENTS' [,
+                     chunksize=1000000 ]])
+
+    iter_event_data( TABLECrate , colkeys [, blockname='EVENTS' [,
+                     chunksize=1000000 ]])
+
+    The first value is a dictionary describing the table, and then
+    the column values are returned a block of rows at a time. Crates
+    reads in the whole column, so this does not reduce the memory
+    use, and the column WCS values are not returned.
+    """
+    filename = ''
+    close_dataset = False
+    if type(arg) == str:
+        arg = get_filename_from_dmsyntax(arg)
+        tbl = open_crate(arg)
+        if not isinstance(tbl, pycrates.TABLECrate):
+            close_crate_dataset(tbl.get_dataset())
+            raise IOErr('badfile', arg, 'TABLECrate obj')
+
+        filename = tbl.get_filename()
+        close_dataset = True
+
+    elif isinstance(arg, pycrates.TABLECrate):
+        tbl = arg
+        filename = arg.get_filename()
+
+    else:
+        raise IOErr('badfile', arg, 'TABLECrate obj')
+
+    try:
+        tbl = _get_crate_by_blockname(tbl.get_dataset(), blockname) or tbl
+        cnames = list(pycrates.get_col_names(tbl, vectors=False, rawonly=True))
+
+        cols = {}
+        vals = []
+        for name in colkeys:
+            if not tbl.column_exists(name):
+                raise IOErr('reqcol', name, cnames)
+
+            col = tbl.get_column(name)
+            cols[name] = {'lmin': None, 'lmax': None, 'crvl': None,
+                          'crpx': None, 'cdlt': None}
+            for key in ['lmin', 'lmax']:
+                getter = getattr(col, 'get_t' + key, None)
+                if getter is not None:
+                    cols[name][key] = getter()
+
+            vals.append(numpy.asarray(col.values))
+
+        nrows = tbl.get_nrows()
+        yield {'filename': filename, 'header': _get_meta_data(tbl),
+               'nrows': nrows, 'columns': cols}
+
+        for start in range(0, nrows, chunksize):
+            yield [numpy.array(val[start:start + chunksize]) for val in vals]
+
+    finally:
+        if close_dataset:
+            close_crate_dataset(tbl.get_dataset())
+
+
 def get_arf_data(arg, make_copy=True):
     """
     get_arf_data( filename [, make_copy=True ])
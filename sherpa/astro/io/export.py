@@ -0,0 +1,309 @@
+#
+#  Copyright (C) 2019  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+"""Write a table to a file a block of rows at a time.
+
+The `TableWriter` class is used to write out tables which are too
+large to create in memory, such as the model values for thousands
+of data sets (see `sherpa.astro.ui.utils.Session.save_multi_results`).
+The rows are written out as they are added, and the table can be
+written as a FITS binary table, a NumPy ``.npz`` archive, or an
+ASCII file.
+
+The FITS output is created directly, rather than with the I/O backend,
+so that the data does not have to be held in memory: the number of
+rows is written to the header once the table has been completed.
+"""
+
+import os
+import tempfile
+
+import six
+
+import numpy
+
+from sherpa.io import format_rows
+from sherpa.utils.err import IOErr
+
+__all__ = ('TableWriter', )
+
+
+_fits_block = 2880
+
+
+def _fits_card(key, value):
+    """Create a FITS header card (fixed format)."""
+    if isinstance(value, bool):
+        card = '{:8s}= {:>20s}'.format(key, 'T' if value else 'F')
+    elif isinstance(value, six.integer_types):
+        card = '{:8s}= {:20d}'.format(key, value)
+    else:
+        value = "'{:8s}'".format(str(value).replace("'", "''"))
+        card = '{:8s}= {:20s}'.format(key, value)
+
+    if len(card) > 80:
+        raise ValueError("FITS keyword {} is too long".format(key))
+
+    return card.ljust(80)
+
+
+def _fits_header(cards):
+    """Create a FITS header, padded to a whole number of blocks."""
+    hdr = ''.join(cards) + 'END'.ljust(80)
+    nblocks = -(-len(hdr) // _fits_block)
+    return hdr.ljust(nblocks * _fits_block).encode('ascii')
+
+
+def _fits_format(dtype):
+    """The TFORM value for a column."""
+    if dtype.kind == 'S':
+        return '{}A'.format(dtype.itemsize)
+
+    try:
+        return {'f8': 'D', 'f4': 'E', 'i8': 'K', 'i4': 'J',
+                'i2': 'I', 'u1': 'B'}[dtype.kind + str(dtype.itemsize)]
+    except KeyError:
+        raise IOErr('bad', 'column type', dtype)
+
+
+class TableWriter(object):
+    """Write a table to a file, a block of rows at a time.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file.
+    names : sequence of str
+        The column names.
+    dtypes : sequence of numpy dtypes
+        The type of each column. Strings must have a fixed size
+        (e.g. ``'S10'``), and boolean columns are written as FITS
+        logical (``'T'`` or ``'F'``) values.
+    format : {'fits', 'npz', 'ascii'}, optional
+        The output format.
+    clobber : bool, optional
+        Can an existing file be overwritten?
+    sep, comment, linebreak, numformat : str, optional
+        The column separator, the comment character used for the
+        column names, the line ending, and the format for numeric
+        values, used for ASCII output.
+
+    Notes
+    -----
+    Once all the rows have been added with `write` the file must be
+    closed with `close`, or the object used as a context manager. The
+    ``npz`` output stores the rows in a temporary file, in the same
+    directory as the output, until the file is closed.
+
+    Examples
+    --------
+
+    >>> with TableWriter('out.fits', ['ID', 'Y'], ['i8', 'f8']) as tbl:
+    ...     for i in range(10):
+    ...         tbl.write([numpy.full(5, i), numpy.random.rand(5)])
+
+    """
+
+    def __init__(self, filename, names, dtypes, format='fits',
+                 clobber=False, sep=' ', comment='#', linebreak='\n',
+                 numformat='%g'):
+        if format not in ('fits', 'npz', 'ascii'):
+            raise IOErr('bad', 'format', format)
+
+        if os.path.exists(filename) and not clobber:
+            raise IOErr('filefound', filename)
+
+        names = [str(name) for name in names]
+        if len(names) != len(dtypes):
+            raise IOErr('toomanycols', str(len(names)), str(len(dtypes)))
+
+        byteorder = '>' if format == 'fits' else '='
+        fields = []
+        logical = []
+        for name, dtype in zip(names, dtypes):
+            dtype = numpy.dtype(dtype)
+            if dtype.kind == 'U':
+                dtype = numpy.dtype('S{}'.format(dtype.itemsize // 4))
+            elif dtype.kind == 'b' and format == 'fits':
+                # FITS logical values are stored as the characters T and F
+                logical.append(name)
+                dtype = numpy.dtype('S1')
+            elif dtype.kind in 'fiub':
+                dtype = dtype.newbyteorder(byteorder)
+            fields.append((name, dtype))
+
+        self.filename = filename
+        self.format = format
+        self.names = names
+        self.dtype = numpy.dtype(fields)
+        self.nrows = 0
+
+        self._logical = logical
+
+        self._sep = sep
+        self._linebreak = linebreak
+        self._formats = ['%s' if dtype.kind == 'S' else numformat
+                         for _, dtype in fields]
+
+        if format == 'npz':
+            fd, self._spool = tempfile.mkstemp(
+                dir=os.path.dirname(os.path.abspath(filename)),
+                suffix='.tmp')
+            self._fh = os.fdopen(fd, 'wb')
+            return
+
+        self._spool = None
+        if format == 'ascii':
+            self._fh = open(filename, 'w')
+            self._fh.write(comment + sep.join(names) + linebreak)
+            return
+
+        self._fh = open(filename, 'wb')
+        self._fh.write(_fits_header([_fits_card('SIMPLE', True),
+                                     _fits_card('BITPIX', 8),
+                                     _fits_card('NAXIS', 0),
+                                     _fits_card('EXTEND', True)]))
+
+        self._start = self._fh.tell()
+        self._fh.write(self._table_header())
+
+    def _table_header(self):
+        cards = [_fits_card('XTENSION', 'BINTABLE'),
+                 _fits_card('BITPIX', 8),
+                 _fits_card('NAXIS', 2),
+                 _fits_card('NAXIS1', self.dtype.itemsize),
+                 _fits_card('NAXIS2', self.nrows),
+                 _fits_card('PCOUNT', 0),
+                 _fits_card('GCOUNT', 1),
+                 _fits_card('TFIELDS', len(self.names))]
+        for i, name in enumerate(self.names):
+            cards.append(_fits_card('TTYPE{}'.format(i + 1), name))
+            tform = 'L' if name in self._logical else \
+                _fits_format(self.dtype[i])
+            cards.append(_fits_card('TFORM{}'.format(i + 1), tform))
+
+        cards.append(_fits_card('EXTNAME', 'TABLE'))
+        return _fits_header(cards)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, columns):
+        """Add rows to the table.
+
+        Parameters
+        ----------
+        columns : sequence of arrays
+            The values for each column, which must have the same
+            length (a scalar is used for every row).
+        """
+        if len(columns) != len(self.names):
+            raise IOErr('toomanycols', str(len(self.names)),
+                        str(len(columns)))
+
+        columns = [numpy.asarray(col) for col in columns]
+        sizes = set(col.size for col in columns if col.ndim > 0)
+        if len(sizes) > 1:
+            raise IOErr('arraysnoteq')
+
+        nrows = sizes.pop() if sizes else 1
+        rows = numpy.empty(nrows, dtype=self.dtype)
+        for name, col in zip(self.names, columns):
+            if name in self._logical:
+                col = numpy.where(col, b'T', b'F')
+            rows[name] = col
+
+        if self.format == 'ascii':
+            self._write_ascii(rows)
+        else:
+            rows.tofile(self._fh)
+
+        self.nrows += nrows
+
+    def _write_ascii(self, rows):
+        if len(rows) == 0:
+            return
+
+        cols = []
+        for name in self.names:
+            col = rows[name]
+            if col.dtype.kind == 'S':
+                col = numpy.char.decode(col, 'ascii')
+            cols.append(col.astype(object))
+
+        self._fh.write(format_rows(numpy.column_stack(cols),
+                                   format=self._formats, sep=self._sep,
+                                   linebreak=self._linebreak))
+
+    def close(self):
+        """Finish writing out the table."""
+        if self._fh is None:
+            return
+
+        try:
+            if self.format == 'fits':
+                nbytes = self.nrows * self.dtype.itemsize
+                pad = -nbytes % _fits_block
+                self._fh.write(b'\0' * pad)
+                self._fh.seek(self._start)
+                self._fh.write(self._table_header())
+
+            elif self.format == 'npz':
+                self._fh.close()
+                self._write_npz()
+
+        finally:
+            self._fh.close()
+            self._fh = None
+            if self._spool is not None:
+                os.remove(self._spool)
+                self._spool = None
+
+    def _write_npz(self):
+        if self.nrows == 0:
+            rows = numpy.zeros(0, dtype=self.dtype)
+        else:
+            rows = numpy.memmap(self._spool, dtype=self.dtype, mode='r',
+                                shape=(self.nrows, ))
+
+        try:
+            with open(self.filename, 'wb') as fh:
+                numpy.savez(fh, **dict((name, rows[name])
+                                       for name in self.names))
+        finally:
+            del rows
+
+    def abort(self):
+        """Stop writing the table and remove the file."""
+        if self._fh is None:
+            return
+
+        self._fh.close()
+        self._fh = None
+        if self._spool is not None:
+            os.remove(self._spool)
+            self._spool = None
+        elif os.path.exists(self.filename):
+            os.remove(self.filename)
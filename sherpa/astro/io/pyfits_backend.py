@@ -38,17 +38,15 @@ References
 
 import numpy
 
-from astropy.io import fits
-from astropy.io.fits.column import _VLF
-
 from numpy.compat import basestring
 
 import os
 
-from six.moves import xrange, zip as izip
+from six.moves import zip as izip
 
 from sherpa.utils.err import IOErr
 from sherpa.utils import SherpaInt, SherpaUInt, SherpaFloat
+from sherpa.utils.lazy import lazy_import
 import sherpa.utils
 from sherpa.io import get_ascii_data, write_arrays
 from sherpa.astro.io.meta import Meta
@@ -57,6 +55,9 @@ import logging
 warning = logging.getLogger(__name__).warning
 error = logging.getLogger(__name__).error
 
+# AstroPy is only loaded when a file is read or written.
+fits = lazy_import('astropy.io.fits')
+
 transformstatus = False
 try:
     from sherpa.astro.io.wcs import WCS
@@ -67,7 +68,7 @@ except:
 
 __all__ = ('get_table_data', 'get_image_data', 'get_arf_data', 'get_rmf_data',
            'get_pha_data', 'set_table_data', 'set_image_data', 'set_pha_data',
-           'get_column_data', 'get_ascii_data')
+           'get_column_data', 'get_ascii_data', 'iter_event_data')
 
 
 def _has_hdu(hdulist, id):
@@ -147,7 +148,7 @@ def _try_col(hdu, name, dtype=SherpaFloat, fix_type=False):
 
     col = hdu.data.field(name)
 
-    if isinstance(col, _VLF):
+    if isinstance(col, fits.column._VLF):
         col = numpy.concatenate([numpy.asarray(row) for row in col])
     else:
         col = numpy.asarray(col).ravel()
@@ -164,7 +165,7 @@ def _try_tbl_col(hdu, name, dtype=SherpaFloat, fix_type=False):
 
     col = hdu.data.field(name)
 
-    if isinstance(col, _VLF):
+    if isinstance(col, fits.column._VLF):
         col = numpy.concatenate([numpy.asarray(row) for row in col])
     else:
         col = numpy.asarray(col)
@@ -181,7 +182,7 @@ def _try_vec(hdu, name, size=2, dtype=SherpaFloat, fix_type=False):
 
     col = hdu.data.field(name)
 
-    if isinstance(col, _VLF):
+    if isinstance(col, fits.column._VLF):
         col = numpy.concatenate([numpy.asarray(row) for row in col])
     else:
         col = numpy.asarray(col)
@@ -567,6 +568,58 @@ def get_image_data(arg, make_copy=False):
     return data, filename
 
 
+def _find_event_table(tbl, filename, blockname):
+    """Return the block called blockname, or the first binary table."""
+
+    name = str(blockname).strip().lower()
+    for hdu in tbl:
+        if isinstance(hdu, fits.BinTableHDU) and hdu.name.lower() == name:
+            return hdu
+
+    return _find_binary_table(tbl, filename)
+
+
+def iter_event_data(arg, colkeys, blockname='EVENTS', chunksize=1000000):
+    """Read in columns from an event list a block of rows at a time.
+
+    The first value returned is a dictionary describing the table,
+    with the keys 'filename', 'header', 'nrows', and 'columns' (the
+    TLMIN, TLMAX, TCRVL, TCRPX, and TCDLT values of each column,
+    which are None when not set). The remaining values are lists of
+    the column values for each block of rows. The file is memory
+    mapped, so only the columns that are used are read from disk.
+    """
+
+    tbl, filename = _get_file_contents(arg, exptype="BinTableHDU")
+    try:
+        hdu = _find_event_table(tbl, filename, blockname)
+        cnames = [name.upper() for name in hdu.columns.names]
+
+        cols = {}
+        for name in colkeys:
+            try:
+                idx = cnames.index(name.strip().upper()) + 1
+            except ValueError:
+                raise IOErr('reqcol', name, cnames)
+
+            cols[name] = dict((key, _try_key(hdu, 'T{}{}'.format(key.upper(),
+                                                                  idx)))
+                              for key in ['lmin', 'lmax', 'crvl', 'crpx',
+                                          'cdlt'])
+
+        data = hdu.data
+        nrows = 0 if data is None else len(data)
+        yield {'filename': filename, 'header': _get_meta_data(hdu),
+               'nrows': nrows, 'columns': cols}
+
+        for start in range(0, nrows, chunksize):
+            rows = data[start:start + chunksize]
+            yield [numpy.array(rows.field(name)) for name in colkeys]
+
+    finally:
+        tbl.close()
+
+
 def _is_ogip_type(hdus, bltype, bltype2=None):
     """Return True if hdus[1] exists and has
     the given type (as determined by the HDUCLAS1 or HDUCLAS2
@@ -619,6 +672,31 @@ def get_arf_data(arg, make_copy=False):
     return data, filename
 
 
+def _select_leading(arr, nused):
+    """Concatenate the first nused[i] elements of each row of arr.
+
+    Rows with more than the number of columns are truncated.
+    """
+    arr = numpy.asarray(arr)
+    nrows = arr.shape[0]
+    arr = arr.reshape(nrows, -1)
+    nused = numpy.asarray(nused, dtype=numpy.int64)
+    mask = numpy.arange(arr.shape[1]) < nused[:, numpy.newaxis]
+    return arr[mask]
+
+
+def _group_total(n_grp, n_chan):
+    """The number of channels in each row of the RMF."""
+    n_chan = numpy.asarray(n_chan, dtype=numpy.int64)
+    if n_chan.ndim == 1:
+        return n_chan
+
+    n_chan = n_chan.reshape(n_chan.shape[0], -1)
+    ngroups = numpy.asarray(n_grp, dtype=numpy.int64)[:, numpy.newaxis]
+    used = numpy.arange(n_chan.shape[1]) < ngroups
+    return (n_chan * used).sum(axis=1)
+
+
 def get_rmf_data(arg, make_copy=False):
     """arg is a filename or a HDUList object.
 
@@ -715,7 +793,7 @@ def get_rmf_data(arg, make_copy=False):
     good = (data['n_grp'] > 0)
     data['matrix'] = data['matrix'][good]
 
-    if isinstance(data['matrix'], _VLF):
+    if isinstance(data['matrix'], fits.column._VLF):
         data['matrix'] = numpy.concatenate([numpy.asarray(row) for
                                             row in data['matrix']])
 
@@ -726,29 +804,14 @@ def get_rmf_data(arg, make_copy=False):
         # b) a rectangular matrix is given, but a row can contain
         #    unused data (outside the f_chan range)
         #
-        # Case a can be handled easily, but it's probably not worth
-        # having a special case for this.
+        # In both cases the groups are stored one after the other
+        # from the start of the row, so only the first sum(n_chan)
+        # elements of each row are used.
         #
-        matrix = data['matrix']
         n_grp = data['n_grp'][good]
-        f_chan = data['f_chan'][good]
         n_chan = data['n_chan'][good]
-
-        rowdata = []
-        for mrow, ng, ncs in zip(matrix, n_grp, n_chan):
-            # Need a RMF which ng>1 to test this with.
-            if ng == 1:
-                ncs = [ncs]
-            start = 0
-            for nc in ncs:
-                # n_chan can be an unsigned integer. Adding a Python
-                # integer to a NumPy unsigned integer appears to return
-                # a float.
-                end = start + numpy.int(nc)
-                rowdata.append(mrow[start:end])
-                start = end
-
-        data['matrix'] = numpy.concatenate(rowdata)
+        nused = _group_total(n_grp, n_chan)
+        data['matrix'] = _select_leading(data['matrix'], nused)
 
     data['matrix'] = data['matrix'].astype(SherpaFloat)
 
@@ -756,18 +819,13 @@ def get_rmf_data(arg, make_copy=False):
     # according to group
     #
     if data['f_chan'].ndim > 1 and data['n_chan'].ndim > 1:
-        f_chan = []
-        n_chan = []
-        for grp, fch, nch, in izip(data['n_grp'], data['f_chan'],
-                                   data['n_chan']):
-            for i in xrange(grp):
-                f_chan.append(fch[i])
-                n_chan.append(nch[i])
-
         # This automatically filters out rows where N_GRP is 0.
         #
-        data['f_chan'] = numpy.asarray(f_chan, SherpaUInt)
-        data['n_chan'] = numpy.asarray(n_chan, SherpaUInt)
+        n_grp = data['n_grp']
+        data['f_chan'] = numpy.asarray(_select_leading(data['f_chan'], n_grp),
+                                       SherpaUInt)
+        data['n_chan'] = numpy.asarray(_select_leading(data['n_chan'], n_grp),
+                                       SherpaUInt)
     else:
         if len(data['n_grp']) == len(data['f_chan']):
             # filter out groups with zeroes.
@@ -0,0 +1,175 @@
+#
+#  Copyright (C) 2018  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+"""A registry of the responses read in by `sherpa.astro.io`.
+
+Many spectra can use the same ARF or RMF file. Rather than read in,
+and store, a copy of the response for each spectrum, `read_arf` and
+`read_rmf` return a view (see
+`sherpa.astro.data.DataOgipResponse.get_view`) of a single response
+that is shared by all the data sets. Each view has its own filter, so
+the data sets can be noticed separately, but the response arrays are
+shared and so are marked as read only. This means that changing them in
+place - e.g. ``arf.specresp *= 0.9`` - raises a ValueError; replacing
+the array - ``arf.specresp = arf.specresp * 0.9`` - only changes that
+response. Sharing is controlled by the ``share_responses`` setting in
+the ``[ogip]`` section of the Sherpa configuration file, and can be
+changed with `set_enabled`: when it is turned off each file is read in
+separately and the arrays can be changed.
+
+Files are identified by the SHA1 hash of their contents, so copies of
+a file are also shared. The hash is only re-calculated when the size
+or modification time of the file changes. An entry is removed once
+there are no views of it left, and the warnings created when the
+response was validated are repeated each time it is used. The registry
+can be used from multiple threads, and several files can be read in at
+the same time.
+"""
+
+import hashlib
+import os
+import threading
+import warnings
+import weakref
+
+import six
+
+import numpy
+
+__all__ = ('get', 'clear', 'get_enabled', 'set_enabled')
+
+_enabled = True
+
+# The hash of each file, indexed by the path, size, and modification
+# time.
+_digests = {}
+
+# The shared responses.
+_entries = weakref.WeakValueDictionary()
+
+# Protects the dictionaries; it is not held while a file is read in.
+_lock = threading.Lock()
+
+_blocksize = 1024 * 1024
+
+
+def get_enabled():
+    """Are responses shared between data sets?"""
+    return _enabled
+
+
+def set_enabled(flag=True):
+    """Should responses be shared between data sets?
+
+    Parameters
+    ----------
+    flag : bool, optional
+        When False each call to `get` reads in the file.
+    """
+    global _enabled
+    _enabled = bool(flag)
+
+
+def clear():
+    """Remove all the entries from the registry.
+
+    Data sets which use a response from the registry are not changed.
+    """
+    with _lock:
+        _digests.clear()
+        _entries.clear()
+
+
+def _get_digest(filename):
+    """The SHA1 hash of the contents of the file."""
+    path = os.path.abspath(filename)
+    st = os.stat(path)
+    key = (path, st.st_size, st.st_mtime)
+    with _lock:
+        digest = _digests.get(key)
+    if digest is not None:
+        return digest
+
+    sha = hashlib.sha1()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(_blocksize), b''):
+            sha.update(block)
+
+    digest = sha.hexdigest()
+    with _lock:
+        _digests[key] = digest
+    return digest
+
+
+def _freeze(response):
+    """Mark the arrays of the response as read only."""
+    for name in response._fields:
+        val = getattr(response, name, None)
+        if isinstance(val, numpy.ndarray):
+            val.setflags(write=False)
+
+
+def get(filename, read_func, key=()):
+    """Return a view of the response stored in the file.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file. If it is not the name of a file, such
+        as an object created by the I/O backend, then it is read in
+        directly.
+    read_func
+        The function used to read in the file: it expects one
+        argument, the file to read in, and returns a DataARF or
+        DataRMF object. The warnings it records in the ``_messages``
+        field of the response are repeated when the response is
+        re-used.
+    key : tuple, optional
+        Any other values, such as settings used by read_func, which
+        change the response created from the file.
+
+    Returns
+    -------
+    response : a DataARF or DataRMF object
+    """
+    if not _enabled or not isinstance(filename, six.string_types) or \
+       not os.path.isfile(filename):
+        return read_func(filename)
+
+    ekey = (_get_digest(filename),) + tuple(key)
+    with _lock:
+        base = _entries.get(ekey)
+
+    if base is None:
+        # The warnings are displayed as the file is read in. If
+        # another thread has read in the file at the same time then
+        # its version is used.
+        base = read_func(filename)
+        _freeze(base)
+        with _lock:
+            base = _entries.setdefault(ekey, base)
+
+    else:
+        for msg in base._messages:
+            warnings.warn(msg)
+
+    view = base.get_view()
+
+    view.name = filename
+    return view
@@ -0,0 +1,236 @@
+#
+#  Copyright (C) 2018  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+"""An on-disk cache of the RMF data read by the I/O backends.
+
+Reading a large RMF requires the MATRIX column to be flattened. The
+results can be stored in a directory, set with `set_cache_dir` or the
+``rmf_cache_dir`` setting in the ``[ogip]`` section of the Sherpa
+configuration file, so that later reads of the same file just need to
+map the arrays into memory. An entry is identified by the path, size,
+and modification time of the file, so it is not used once the file
+has been changed. The cache is used by `sherpa.astro.io.read_rmf`,
+so it is shared by all the I/O backends.
+
+Each entry is a directory containing the arrays, as ``.npy`` files, and
+a JSON file with the remaining values (such as the header keywords).
+Nothing is unpickled when an entry is read. Header values which are not
+numbers or strings, such as the COMMENT and HISTORY cards, are stored as
+strings; other data which can not be stored this way is not cached.
+
+Problems with the cache - such as a directory which can not be written
+to - are reported as warnings, and the file is read as normal.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import six
+
+import numpy
+
+from sherpa.astro.io.meta import Meta
+
+__all__ = ('get_cache_dir', 'set_cache_dir', 'clear_cache', 'load', 'save')
+
+warning = logging.getLogger(__name__).warning
+
+# Change this if the format of the cached data changes.
+_format_version = 2
+
+_meta_name = 'meta.json'
+
+_cache_dir = None
+
+
+def get_cache_dir():
+    """The directory used to store RMF data (None if not set)."""
+    return _cache_dir
+
+
+def set_cache_dir(path):
+    """Set the directory used to store RMF data.
+
+    Parameters
+    ----------
+    path : str or None
+        The directory, which is created if it does not exist. Use
+        None to stop using the cache.
+    """
+    global _cache_dir
+    if path is None:
+        _cache_dir = None
+        return
+
+    path = os.path.abspath(os.path.expanduser(str(path)))
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    _cache_dir = path
+
+
+def clear_cache():
+    """Remove all the entries from the cache directory."""
+    if _cache_dir is None:
+        return
+
+    for name in os.listdir(_cache_dir):
+        if name.startswith('rmf-'):
+            shutil.rmtree(os.path.join(_cache_dir, name),
+                          ignore_errors=True)
+
+
+def _entry_dir(filename):
+    """The directory for the file, or None if it can not be cached."""
+    if _cache_dir is None or not os.path.isfile(filename):
+        return None
+
+    path = os.path.abspath(filename)
+    st = os.stat(path)
+    label = '{}:{}:{}:{!r}'.format(_format_version, path, st.st_size,
+                                   st.st_mtime)
+    key = hashlib.sha1(label.encode('utf-8')).hexdigest()
+    return os.path.join(_cache_dir, 'rmf-' + key)
+
+
+def _encode(val, header=False):
+    """Convert a value to a form that can be written out as JSON.
+
+    NumPy scalars, dictionaries, and Meta objects are tagged so that
+    `_decode` can restore them. Unsupported header values are
+    converted to strings.
+    """
+    if val is None or isinstance(val, (bool, float, six.string_types) +
+                                 six.integer_types):
+        return val
+
+    if isinstance(val, numpy.generic) and val.dtype.kind in 'biuf':
+        return {'dtype': val.dtype.str, 'value': val.item()}
+
+    if isinstance(val, dict):
+        return {'items': dict((str(k), _encode(v)) for k, v in val.items())}
+
+    if isinstance(val, Meta):
+        return {'meta': dict((str(k), _encode(val[k], header=True))
+                             for k in val.keys())}
+
+    if header:
+        return str(val)
+
+    raise TypeError("unable to store a value of type {}".format(
+        type(val).__name__))
+
+
+def _decode(val):
+    """Restore a value converted by `_encode`."""
+    if not isinstance(val, dict):
+        return val
+
+    if 'dtype' in val:
+        return numpy.dtype(str(val['dtype'])).type(val['value'])
+
+    if 'meta' in val:
+        meta = Meta()
+        for k, v in val['meta'].items():
+            meta[str(k)] = _decode(v)
+        return meta
+
+    return dict((str(k), _decode(v)) for k, v in val['items'].items())
+
+
+def load(filename):
+    """Return the cached data for the file.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the RMF file.
+
+    Returns
+    -------
+    data : dict or None
+        The data returned by the backend get_rmf_data call, with the
+        arrays mapped from the cache (changes to them are not written
+        back), or None if the file is not in the cache.
+    """
+    try:
+        dirname = _entry_dir(filename)
+        if dirname is None or not os.path.isdir(dirname):
+            return None
+
+        with open(os.path.join(dirname, _meta_name), 'r') as fh:
+            meta = json.load(fh)
+
+        data = _decode(meta['values'])
+        for name in meta['arrays']:
+            fname = os.path.join(dirname, str(name) + '.npy')
+            data[str(name)] = numpy.asarray(numpy.load(fname, mmap_mode='c',
+                                                       allow_pickle=False))
+
+    except Exception as exc:
+        warning("unable to read the RMF cache for '%s': %s", filename, exc)
+        return None
+
+    return data
+
+
+def save(filename, data):
+    """Store the data for the file in the cache.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the RMF file.
+    data : dict
+        The data returned by the backend get_rmf_data call.
+    """
+    try:
+        dirname = _entry_dir(filename)
+        if dirname is None or os.path.isdir(dirname):
+            return
+
+        arrays = [name for name, val in data.items()
+                  if isinstance(val, numpy.ndarray) and val.dtype != object]
+        values = _encode(dict((name, val) for name, val in data.items()
+                              if name not in arrays))
+
+        tmpdir = tempfile.mkdtemp(prefix='tmp-', dir=_cache_dir)
+        try:
+            for name in arrays:
+                numpy.save(os.path.join(tmpdir, name + '.npy'), data[name],
+                           allow_pickle=False)
+
+            with open(os.path.join(tmpdir, _meta_name), 'w') as fh:
+                json.dump({'arrays': arrays, 'values': values}, fh)
+
+            # Another process may have created the entry already.
+            try:
+                os.rename(tmpdir, dirname)
+            except OSError:
+                if not os.path.isdir(dirname):
+                    raise
+
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    except Exception as exc:
+        warning("unable to write the RMF cache for '%s': %s", filename, exc)
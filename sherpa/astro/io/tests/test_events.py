@@ -0,0 +1,176 @@
+#
+#  Copyright (C) 2019  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+import pytest
+
+from sherpa.astro.data import DataIMG, DataPHA
+from sherpa.utils.err import IOErr
+from sherpa.utils.testing import requires_fits
+
+
+NEVENTS = 5000
+
+
+@pytest.fixture
+def events(tmpdir):
+    """Create an event list, using AstroPy, and return the values."""
+
+    fits = pytest.importorskip('astropy.io.fits')
+
+    rng = np.random.RandomState(2837)
+    vals = {'TIME': rng.uniform(100, 200, NEVENTS),
+            'PI': rng.randint(1, 21, NEVENTS),
+            'ENERGY': rng.uniform(0, 10000, NEVENTS),
+            'X': rng.uniform(0.5, 20.5, NEVENTS),
+            'Y': rng.uniform(0.5, 10.5, NEVENTS)}
+
+    cols = [fits.Column(name, fmt, array=vals[name])
+            for name, fmt in [('TIME', 'D'), ('PI', 'J'), ('ENERGY', 'E'),
+                              ('X', 'E'), ('Y', 'E')]]
+    hdu = fits.BinTableHDU.from_columns(cols, name='EVENTS')
+    hdr = hdu.header
+    hdr['TLMIN2'] = 1
+    hdr['TLMAX2'] = 20
+    for idx, hi in [(4, 20.5), (5, 10.5)]:
+        hdr['TLMIN{}'.format(idx)] = 0.5
+        hdr['TLMAX{}'.format(idx)] = hi
+        hdr['TCRVL{}'.format(idx)] = 10.0 * idx
+        hdr['TCRPX{}'.format(idx)] = 5.0
+        hdr['TCDLT{}'.format(idx)] = 1e-4
+
+    hdr['EXPOSURE'] = 90.0
+    hdr['TSTART'] = 100.0
+    hdr['TSTOP'] = 200.0
+
+    fname = str(tmpdir.join('evt.fits'))
+    fits.HDUList([fits.PrimaryHDU(), hdu]).writeto(fname)
+    return fname, vals
+
+
+@requires_fits
+@pytest.mark.parametrize("chunksize", [NEVENTS, 999])
+def test_read_events_pha(events, chunksize):
+    from sherpa.astro.io import read_events
+
+    fname, vals = events
+    pha = read_events(fname, chunksize=chunksize)
+    assert isinstance(pha, DataPHA)
+    assert_array_equal(pha.channel, np.arange(1, 21))
+    assert_array_equal(pha.counts,
+                       np.bincount(vals['PI'], minlength=21)[1:])
+    assert pha.exposure == pytest.approx(90)
+
+
+@requires_fits
+def test_read_events_filter(events):
+    from sherpa.astro.io import read_events
+
+    fname, vals = events
+    pha = read_events(fname, time=(150, None), energy=(1000, 5000),
+                      chunksize=333)
+
+    sel = (vals['TIME'] >= 150) & (vals['ENERGY'] >= 1000) & \
+        (vals['ENERGY'] < 5000)
+    assert_array_equal(pha.counts,
+                       np.bincount(vals['PI'][sel], minlength=21)[1:])
+
+    # half the observation has been selected
+    assert pha.exposure == pytest.approx(45)
+
+
+@requires_fits
+def test_read_events_image(events):
+    from sherpa.astro.io import read_events
+
+    fname, vals = events
+    img = read_events(fname, dstype=DataIMG, binsize=2, chunksize=777)
+    assert isinstance(img, DataIMG)
+    assert img.shape == (5, 10)
+
+    expected, _, _ = np.histogram2d(vals['Y'], vals['X'],
+                                    bins=[np.arange(0.5, 11, 2),
+                                          np.arange(0.5, 21, 2)])
+    assert_array_equal(img.y.reshape(img.shape), expected)
+
+    img.set_coord('physical')
+    assert_allclose(img.get_x0()[:3], [1.5, 3.5, 5.5])
+    assert_allclose(img.get_x1()[::10], [1.5, 3.5, 5.5, 7.5, 9.5])
+
+
+@requires_fits
+def test_read_events_image_bounds(events):
+    from sherpa.astro import io
+
+    fname, vals = events
+    img = io.read_events(fname, dstype=DataIMG, bounds=[(2, 6), (3, 5)],
+                         energy=(None, 5000))
+    assert img.shape == (2, 4)
+
+    sel = (vals['X'] >= 2) & (vals['X'] < 6) & (vals['Y'] >= 3) & \
+        (vals['Y'] < 5) & (vals['ENERGY'] < 5000)
+    assert img.y.sum() == sel.sum()
+
+    if io.backend.__name__.endswith('pyfits_backend'):
+        assert_allclose(img.eqpos.crval, [40, 50])
+        assert_allclose(img.eqpos.crpix, [5, 5])
+
+
+@requires_fits
+def test_read_events_errors(events):
+    from sherpa.astro.data import Data1D
+    from sherpa.astro.io import read_events
+
+    fname, _ = events
+    with pytest.raises(IOErr):
+        read_events(fname, dstype=Data1D)
+
+    with pytest.raises(IOErr) as exc:
+        read_events(fname, channel='pha')
+    assert "Required column 'pha' not found" in str(exc.value)
+
+    # The TIME column has no TLMIN/TLMAX values.
+    with pytest.raises(IOErr):
+        read_events(fname, channel='time')
+
+
+@requires_fits
+def test_load_events_fit(events):
+    """The binned spectrum can be used with a response."""
+
+    from sherpa.astro.instrument import create_delta_rmf
+    from sherpa.astro.ui.utils import Session
+    from sherpa.models.basic import Const1D
+
+    fname, vals = events
+    session = Session()
+    session.load_events(2, fname)
+
+    egrid = np.linspace(0.5, 10.5, 21)
+    rmf = create_delta_rmf(egrid[:-1], egrid[1:], e_min=egrid[:-1],
+                           e_max=egrid[1:])
+    session.set_rmf(2, rmf)
+    mdl = Const1D('mdl')
+    session.set_source(2, mdl)
+    session.set_stat('cash')
+    session.fit(2)
+
+    # The best-fit is the mean count rate per keV.
+    assert mdl.c0.val == pytest.approx(NEVENTS / 10 / 90, rel=1e-3)
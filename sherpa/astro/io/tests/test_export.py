@@ -0,0 +1,128 @@
+#
+#  Copyright (C) 2019  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+import os
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+import pytest
+
+from sherpa.astro.io.export import TableWriter
+from sherpa.utils.err import IOErr
+
+
+NAMES = ['ID', 'NAME', 'Y']
+DTYPES = ['i8', 'S5', 'f8']
+
+
+def write_table(filename, format, **kwargs):
+    """Write out three blocks of rows, including an empty one."""
+    with TableWriter(filename, NAMES, DTYPES, format=format,
+                     **kwargs) as tbl:
+        tbl.write([1, 'a', np.arange(3) * 0.5])
+        tbl.write([2, 'bcd', np.zeros(0)])
+        tbl.write([np.asarray([3, 4]), ['ef', 'g'], [-1.0, 1e10]])
+
+    return tbl
+
+
+def test_write_fits(tmpdir):
+    fits = pytest.importorskip('astropy.io.fits')
+
+    fname = str(tmpdir.join('out.fits'))
+    tbl = write_table(fname, 'fits')
+    assert tbl.nrows == 5
+    assert os.path.getsize(fname) % 2880 == 0
+
+    with fits.open(fname) as hdus:
+        assert len(hdus) == 2
+        assert hdus[1].name == 'TABLE'
+        data = hdus[1].data
+        assert_array_equal(data['ID'], [1, 1, 1, 3, 4])
+        assert list(data['NAME']) == ['a', 'a', 'a', 'ef', 'g']
+        assert_allclose(data['Y'], [0, 0.5, 1, -1, 1e10])
+
+
+def test_write_fits_bool(tmpdir):
+    """Boolean columns are written as FITS logical values."""
+    fits = pytest.importorskip('astropy.io.fits')
+
+    fname = str(tmpdir.join('out.fits'))
+    with TableWriter(fname, ['ID', 'FLAG'], ['i4', bool]) as tbl:
+        tbl.write([np.arange(3), [True, False, True]])
+        tbl.write([3, False])
+
+    with open(fname, 'rb') as fh:
+        raw = fh.read()
+    assert b"TFORM2  = 'L       '" in raw
+
+    with fits.open(fname) as hdus:
+        data = hdus[1].data
+        assert_array_equal(data['ID'], [0, 1, 2, 3])
+        assert data['FLAG'].dtype == np.bool_
+        assert_array_equal(data['FLAG'], [True, False, True, False])
+
+
+def test_write_npz(tmpdir):
+    fname = str(tmpdir.join('out.npz'))
+    write_table(fname, 'npz')
+
+    out = np.load(fname)
+    assert sorted(out.files) == sorted(NAMES)
+    assert_array_equal(out['ID'], [1, 1, 1, 3, 4])
+    assert list(out['NAME']) == [b'a', b'a', b'a', b'ef', b'g']
+    assert_allclose(out['Y'], [0, 0.5, 1, -1, 1e10])
+
+    # The temporary file has been removed.
+    assert os.listdir(str(tmpdir)) == ['out.npz']
+
+
+def test_write_ascii(tmpdir):
+    fname = str(tmpdir.join('out.dat'))
+    write_table(fname, 'ascii', sep=',')
+
+    with open(fname) as fh:
+        lines = fh.read().split('\n')
+
+    assert lines == ['#ID,NAME,Y', '1,a,0', '1,a,0.5', '1,a,1',
+                     '3,ef,-1', '4,g,1e+10', '']
+
+
+def test_clobber(tmpdir):
+    fname = str(tmpdir.join('out.npz'))
+    write_table(fname, 'npz')
+    with pytest.raises(IOErr):
+        write_table(fname, 'npz')
+
+    write_table(fname, 'npz', clobber=True)
+
+
+def test_invalid_format(tmpdir):
+    with pytest.raises(IOErr):
+        TableWriter(str(tmpdir.join('out')), NAMES, DTYPES, format='hdf5')
+
+
+def test_abort_removes_file(tmpdir):
+    fname = str(tmpdir.join('out.fits'))
+    with pytest.raises(IOErr):
+        with TableWriter(fname, NAMES, DTYPES) as tbl:
+            tbl.write([1, 'a', [1, 2]])
+            tbl.write([[1, 2], 'a', [1, 2, 3]])
+
+    assert not os.path.exists(fname)
@@ -17,6 +17,14 @@
 #  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 #
 
+import json
+import os
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+import pytest
+
 from sherpa.utils.testing import SherpaTestCase, requires_data, \
     requires_fits, requires_xspec
 from sherpa.astro import ui
@@ -54,3 +62,215 @@ class test_89_issues(SherpaTestCase):
         ui.load_pha(pha)
         with NamedTemporaryFile() as f:
             ui.save_data(1, f.name, ascii=False, clobber=True)
+
+
+def make_rmf_file(filename):
+    """Write out a RMF with multiple groups per row.
+
+    Returns the expected f_chan, n_chan, and flattened matrix.
+    """
+
+    from astropy.io import fits
+
+    nrows = 5
+    ngrp = np.array([1, 2, 0, 3, 1], dtype=np.int16)
+    fchan = np.array([[1, 0, 0], [2, 6, 0], [0, 0, 0], [1, 4, 8],
+                      [3, 0, 0]], dtype=np.int16)
+    nchan = np.array([[2, 0, 0], [3, 2, 0], [0, 0, 0], [1, 2, 3],
+                      [4, 0, 0]], dtype=np.int16)
+    matrix = np.arange(nrows * 8, dtype=np.float32).reshape(nrows, 8) + 1
+
+    expected_matrix = []
+    expected_fchan = []
+    expected_nchan = []
+    for row, ng in enumerate(ngrp):
+        start = 0
+        for grp in range(ng):
+            nc = nchan[row, grp]
+            expected_matrix.extend(matrix[row, start:start + nc])
+            expected_fchan.append(fchan[row, grp])
+            expected_nchan.append(nc)
+            start += nc
+
+    egrid = np.linspace(0.1, 0.6, nrows + 1)
+    cols = [fits.Column(name='ENERG_LO', format='E', array=egrid[:-1]),
+            fits.Column(name='ENERG_HI', format='E', array=egrid[1:]),
+            fits.Column(name='N_GRP', format='I', array=ngrp),
+            fits.Column(name='F_CHAN', format='3I', array=fchan),
+            fits.Column(name='N_CHAN', format='3I', array=nchan),
+            fits.Column(name='MATRIX', format='8E', array=matrix)]
+    hdu = fits.BinTableHDU.from_columns(cols, name='MATRIX')
+    hdu.header['HDUCLASS'] = 'OGIP'
+    hdu.header['HDUCLAS1'] = 'RESPONSE'
+    hdu.header['HDUCLAS2'] = 'RSP_MATRIX'
+    hdu.header['DETCHANS'] = 10
+    hdu.header['TLMIN4'] = 1
+    hdu.header['COMMENT'] = 'A test response'
+
+    chans = np.arange(1, 11, dtype=np.int16)
+    ebounds = fits.BinTableHDU.from_columns(
+        [fits.Column(name='CHANNEL', format='I', array=chans),
+         fits.Column(name='E_MIN', format='E', array=chans * 0.1),
+         fits.Column(name='E_MAX', format='E', array=chans * 0.1 + 0.1)],
+        name='EBOUNDS')
+
+    fits.HDUList([fits.PrimaryHDU(), hdu, ebounds]).writeto(filename)
+    return (np.asarray(expected_fchan), np.asarray(expected_nchan),
+            np.asarray(expected_matrix))
+
+
+@requires_fits
+def test_read_rmf_multiple_groups(tmpdir):
+    """Check the MATRIX column is flattened correctly."""
+
+    from sherpa.astro import io
+    from sherpa.astro.io import registry, rmfcache
+
+    filename = str(tmpdir.join('test.rmf'))
+    fchan, nchan, matrix = make_rmf_file(filename)
+
+    rmf = io.read_rmf(filename)
+    assert_array_equal(rmf.f_chan, fchan)
+    assert_array_equal(rmf.n_chan, nchan)
+    assert_array_equal(rmf.matrix, matrix)
+    assert_array_equal(rmf.n_grp, [1, 2, 0, 3, 1])
+
+    # Now with the cache (which is only used when the file is read
+    # in, so the registry is turned off).
+    old = rmfcache.get_cache_dir()
+    registry.set_enabled(False)
+    try:
+        rmfcache.set_cache_dir(str(tmpdir.join('cache')))
+        rmf1 = io.read_rmf(filename)
+        entries = os.listdir(rmfcache.get_cache_dir())
+        assert len(entries) == 1
+
+        # the non-array values are stored as JSON, not pickled
+        entry = os.path.join(rmfcache.get_cache_dir(), entries[0])
+        assert 'meta.json' in os.listdir(entry)
+        with open(os.path.join(entry, 'meta.json')) as fh:
+            meta = json.load(fh)
+        assert 'matrix' in meta['arrays']
+
+        rmf2 = io.read_rmf(filename)
+        assert rmf2.name == filename
+        assert rmf2.detchans == 10
+        assert type(rmf2.detchans) == type(rmf1.detchans)
+        assert rmf2.offset == 1
+        assert rmf2.header['HDUCLAS2'] == 'RSP_MATRIX'
+        assert rmf2.header['COMMENT'] == 'A test response'
+        for name in ['energ_lo', 'energ_hi', 'n_grp', 'f_chan', 'n_chan',
+                     'matrix', 'e_min', 'e_max']:
+            assert_array_equal(getattr(rmf2, name), getattr(rmf1, name))
+
+        rmfcache.clear_cache()
+        assert os.listdir(rmfcache.get_cache_dir()) == []
+
+    finally:
+        rmfcache.set_cache_dir(old)
+        registry.set_enabled(True)
+
+
+@requires_fits
+def test_read_rmf_registry(tmpdir):
+    """Reading the same RMF file again shares the data."""
+
+    import shutil
+    from sherpa.astro import io
+    from sherpa.astro.io import registry
+
+    filename = str(tmpdir.join('test.rmf'))
+    make_rmf_file(filename)
+
+    rmf1 = io.read_rmf(filename)
+    rmf2 = io.read_rmf(filename)
+    assert rmf1 is not rmf2
+    assert rmf1.matrix is rmf2.matrix
+    assert rmf1.f_chan is rmf2.f_chan
+    assert not rmf1.matrix.flags.writeable
+
+    # The filters are separate
+    rmf1.notice(np.arange(1, 4))
+    assert rmf1.get_indep()[0].size < 5
+    assert rmf2.get_indep()[0].size == 5
+
+    # The shared arrays can not be changed in place, but replacing
+    # them only changes that RMF.
+    with pytest.raises(ValueError):
+        rmf2.matrix *= 2
+
+    orig = rmf1.matrix.copy()
+    dep = rmf2.get_dep()
+    rmf2.matrix = rmf2.matrix * 2
+    rmf2.notice()
+    assert_array_equal(rmf1.matrix, orig)
+    assert_array_equal(rmf2.matrix, orig * 2)
+    assert_array_equal(rmf2.get_dep(), 2 * dep)
+
+    # The data is shared by the contents of the file, not the name
+    copyname = str(tmpdir.join('copy.rmf'))
+    shutil.copy(filename, copyname)
+    rmf3 = io.read_rmf(copyname)
+    assert rmf3.name == copyname
+    assert rmf3.matrix is rmf1.matrix
+
+    registry.set_enabled(False)
+    try:
+        rmf4 = io.read_rmf(filename)
+    finally:
+        registry.set_enabled(True)
+
+    assert rmf4.matrix is not rmf1.matrix
+    assert_array_equal(rmf4.matrix, rmf1.matrix)
+
+
+@requires_fits
+def test_read_arf_registry_warnings(tmpdir):
+    """The validation warnings are repeated when the ARF is re-used."""
+
+    from astropy.io import fits
+    from sherpa.astro import io
+
+    filename = str(tmpdir.join('test.arf'))
+    elo = np.arange(0, 5) * 0.1
+    hdu = fits.BinTableHDU.from_columns(
+        [fits.Column(name='ENERG_LO', format='E', array=elo),
+         fits.Column(name='ENERG_HI', format='E', array=elo + 0.1),
+         fits.Column(name='SPECRESP', format='E', array=np.ones(5))],
+        name='SPECRESP')
+    hdu.header['HDUCLASS'] = 'OGIP'
+    hdu.header['HDUCLAS1'] = 'RESPONSE'
+    hdu.header['HDUCLAS2'] = 'SPECRESP'
+    fits.HDUList([fits.PrimaryHDU(), hdu]).writeto(filename)
+
+    msg = 'The minimum ENERG_LO in the ARF'
+    with pytest.warns(UserWarning, match=msg):
+        arf1 = io.read_arf(filename)
+
+    assert len(arf1._messages) == 1
+    assert arf1._messages[0].startswith(msg)
+
+    with pytest.warns(UserWarning, match=msg):
+        arf2 = io.read_arf(filename)
+
+    assert arf2._messages == arf1._messages
+    assert arf2.specresp is arf1.specresp
+
+
+@requires_fits
+def test_read_image_lazy(tmpdir):
+    """The lazy image matches the normal one."""
+
+    from astropy.io import fits
+    from sherpa.astro import io
+
+    filename = str(tmpdir.join('test.img'))
+    fits.PrimaryHDU(np.arange(12.0).reshape(3, 4)).writeto(filename)
+
+    img = io.read_image(filename)
+    lazy = io.read_image(filename, lazy=True)
+    assert lazy.shape == (3, 4)
+    assert_array_equal(lazy.get_dep(), img.get_dep())
+    assert_array_equal(lazy.get_x0(), img.get_x0())
+    assert_array_equal(lazy.get_x1(), img.get_x1())
+    assert_array_equal(lazy.get_img(), img.get_img())
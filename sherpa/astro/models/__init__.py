@@ -23,7 +23,7 @@ from __future__ import absolute_import
 import numpy
 from sherpa.models.parameter import Parameter, tinyval
 from sherpa.models.model import ArithmeticModel, RegriddableModel2D, RegriddableModel1D, modelCacher1d
-from sherpa.astro.utils import apply_pileup
+from sherpa.astro.utils.pileup import PileupKernel
 from sherpa.utils.err import ModelErr
 from sherpa.utils import _guess_ampl_scale, bool_cast, get_fwhm, \
     get_peak, get_position, guess_amplitude, guess_amplitude2d, \
@@ -1126,6 +1126,9 @@ class JDPileup(RegriddableModel1D):
 
     """
 
+    # The PileupKernel for the current response.
+    _kernel = None
+
     def __init__(self, name='jdpileup'):
         self.alpha = Parameter(name, 'alpha', 0.5, 0, 1, 0, 1)
         self.g0 = Parameter(name, 'g0', 1, tinyval, 1, tinyval, 1, frozen=True)
@@ -1174,9 +1177,18 @@ class JDPileup(RegriddableModel1D):
         (alpha, g0, psf_frac, num_regions, frame_time, fracexpo,
          max_num_terms) = p
 
-        out = apply_pileup(arf_source, exposure_time, int(max_num_terms),
-                           min_energy, max_energy, specresp, fracexpo,
-                           frame_time, alpha, g0, num_regions, psf_frac, model)
+        # The parts of the calculation that do not depend on the model
+        # parameters are only re-calculated when the response changes.
+        nbins = len(arf_source)
+        kernel = self._kernel
+        if kernel is None or \
+           not kernel.is_for(exposure_time, min_energy, max_energy,
+                             specresp, fracexpo, frame_time, nbins):
+            kernel = PileupKernel(exposure_time, min_energy, max_energy,
+                                  specresp, fracexpo, frame_time, nbins)
+            self._kernel = kernel
+
+        out = kernel.calc(model, alpha, g0, num_regions, psf_frac, max_num_terms)
         self._results = out[1:]
         return out[0]
 
@@ -20,7 +20,9 @@
 
 import numpy as np
 from sherpa.sim.mh import MetropolisMH, dmvnorm
-from sherpa.astro.sim.pragbayes import PragBayes, PCA1DAdd, ARFSIMFactory
+from sherpa.astro.sim.pragbayes import PragBayes, PCA1DAdd, ARFSIMFactory, \
+    find_rsp_models
+from sherpa.astro.instrument import ARFBasisFold
 
 
 __all__ = ('FullBayes',)
@@ -31,8 +33,11 @@ class FullBayes(PragBayes):
     def __init__(self, fcn, sigma, mu, dof, fit, *args):
         PragBayes.__init__(self, fcn, sigma, mu, dof, fit, *args)
         self.arf_dicts = [{'current': arf.specresp.copy(),
-                           'old_rr': None }
+                           'current_rr': None,
+                           'old_rr': None,
+                           'fold': None }
                           for arf in self.arfs]
+        self._rsps = []
 
     def init(self, log=False, inv=False, defaultprior=True, priorshape=False,
              priors=(), originalscale=True, scale=1, sigma_m=False, p_M=.5,
@@ -52,9 +57,43 @@ class FullBayes(PragBayes):
         self.accept_arfs = [0]
         self.p_M_arf = p_M_arf
         self.rrsig = sigma_arf
+        self._attach_folds()
         return MetropolisMH.init(self, log, inv, defaultprior, priorshape,
                                  priors, originalscale, scale, sigma_m, p_M)
 
+    def _attach_folds(self):
+        # The ARF updates are evaluated at the best-fit parameters, so
+        # the folds of the PCA components through the response can be
+        # calculated once and re-used for every new set of deviates.
+        rsps = find_rsp_models(self._fit.model, self.arfs)
+        for specresp, arf_dict in zip(self.backup_arfs, self.arf_dicts):
+            arf_dict['fold'] = ARFBasisFold(np.add(specresp, self.simarf.bias),
+                                            self.simarf.basis)
+
+        for idx, rsp in rsps:
+            rsp.arf_basis = self.arf_dicts[idx]['fold']
+
+        self._rsps = [rsp for idx, rsp in rsps]
+
+    def _calc_arf_stat(self, arf_dict):
+        # Calculate the statistic at the best-fit location, using the
+        # cached folds of the ARF components if possible.
+        fold = arf_dict['fold']
+        if fold is None:
+            return self.calc_fit_stat(self._mu)
+
+        fold.active = True
+        try:
+            return self.calc_fit_stat(self._mu)
+        finally:
+            fold.active = False
+
+    def _set_arf(self, arf, specresp, rr, arf_dict):
+        arf.specresp = specresp
+        fold = arf_dict['fold']
+        if fold is not None:
+            fold.set_coeffs(rr, specresp)
+
     def _update_arf(self, arf, specresp, current_params, current_stat,
                     arf_dict):
 
@@ -69,11 +108,13 @@ class FullBayes(PragBayes):
             # Assume the ARF is accepted by default
             # Update the ARFs with new deviates
 
-            arf.specresp = self.simarf.add_deviations(specresp, old_rr,
-                                                      self.rrsig)
+            self._set_arf(arf,
+                          self.simarf.add_deviations(specresp, old_rr,
+                                                     self.rrsig),
+                          self.simarf.rrout, arf_dict)
             new_rr = self.simarf.rrout
 
-            stat_temp = self.calc_fit_stat(self._mu)
+            stat_temp = self._calc_arf_stat(arf_dict)
 
             mu0  = np.repeat(0, ncomp)
             sig0 = np.diag(np.repeat(1, ncomp))
@@ -85,7 +126,8 @@ class FullBayes(PragBayes):
             uu = np.random.uniform(0, 1, 1)
             if accept_pr > uu:
                 arf_dict['old_rr'] = new_rr
-                arf_dict['current'] = arf.specresp.copy()
+                arf_dict['current'] = arf.specresp
+                arf_dict['current_rr'] = new_rr
                 self.accept_arf()
 
                 # When ARF is updated, set scale to None to signal a fit
@@ -93,23 +135,27 @@ class FullBayes(PragBayes):
 
             else:
                 # Restore to previous ARF
-                arf.specresp = arf_dict['current']
+                self._set_arf(arf, arf_dict['current'],
+                              arf_dict['current_rr'], arf_dict)
                 self.reject_arf()
 
         else:
             # Assume the ARF is accepted by default
             # Update the ARFs with new deviates
 
-            arf.specresp = self.simarf.add_deviations(specresp)
+            self._set_arf(arf, self.simarf.add_deviations(specresp),
+                          self.simarf.rrout, arf_dict)
+            new_rr = self.simarf.rrout
 
-            stat_temp = self.calc_fit_stat(self._mu)
+            stat_temp = self._calc_arf_stat(arf_dict)
             accept_pr = 0
             accept_pr += stat_temp - current_stat
             accept_pr = np.exp(accept_pr)
 
             uu = np.random.uniform(0, 1, 1)
             if accept_pr > uu:
-                arf_dict['current'] = arf.specresp.copy()
+                arf_dict['current'] = arf.specresp
+                arf_dict['current_rr'] = new_rr
                 self.accept_arf()
 
                 # When ARF is updated, set scale to None to signal a fit
@@ -117,7 +163,8 @@ class FullBayes(PragBayes):
 
             else:
                 # Restore to previous ARF
-                arf.specresp = arf_dict['current']
+                self._set_arf(arf, arf_dict['current'],
+                              arf_dict['current_rr'], arf_dict)
                 self.reject_arf()
 
     def accept_arf(self):
@@ -137,3 +184,9 @@ class FullBayes(PragBayes):
                                                self.arf_dicts):
                 self._update_arf(arf, specresp, current_params,
                                  current_stat, arf_dict)
+
+    def tear_down(self):
+        for rsp in self._rsps:
+            rsp.arf_basis = None
+        self._rsps = []
+        PragBayes.tear_down(self)
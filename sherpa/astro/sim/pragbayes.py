@@ -24,6 +24,8 @@ import numpy as np
 from sherpa.fit import Fit
 from sherpa.estmethods import Covariance
 from sherpa.sim.mh import MetropolisMH, rmvt, CovarError, Walk, LimitError
+from sherpa.models.model import CompositeModel
+from sherpa.astro.instrument import RSPModelPHA
 read_table_blocks = None
 try:
     from sherpa.astro.io import read_table_blocks
@@ -78,6 +80,18 @@ class PCA1DAdd(object):
         self.eigenvec  = eigenvec
         self.ncomp     = len(self.component)
         self.rrout     = None
+        self._basis    = None
+
+    @property
+    def basis(self):
+        """The deviation vectors (eigenvectors scaled by eigenvalues).
+
+        The deviations added to the ARF are ``dot(rrout, basis)``. The
+        array, which has shape (ncomp, nenergy), is calculated once.
+        """
+        if self._basis is None:
+            self._basis = self.eigenvec * self.eigenval[:, np.newaxis]
+        return self._basis
 
     def add_deviations(self, specresp, rrin=None, rrsig=None):
         # copy the old ARF (use new memory for deviations)
@@ -88,10 +102,7 @@ class PCA1DAdd(object):
             rrout = rrin + rrsig * rrout
         self.rrout = rrout
 
-        tmp = self.eigenvec * \
-            self.eigenval[:, np.newaxis] * \
-            rrout[:, np.newaxis]
-        return np.add(new_arf, tmp.sum(axis=0), new_arf)
+        return np.add(new_arf, np.dot(rrout, self.basis), new_arf)
 
 
 class SIM1DAdd(object):
@@ -159,6 +170,38 @@ def flatten_arfs(src, bkg):
     return arfs
 
 
+def find_rsp_models(model, arfs):
+    """Return the RSPModelPHA components that use one of the ARFs.
+
+    Parameters
+    ----------
+    model : sherpa.models.model.Model instance
+       The model expression (e.g. fit.model).
+    arfs : sequence of sherpa.astro.data.DataARF
+       The ARFs.
+
+    Returns
+    -------
+    rsps : list of (index, RSPModelPHA)
+       The index of the ARF in arfs and the response component.
+
+    """
+    parts = [model]
+    if isinstance(model, CompositeModel):
+        parts.extend(model)
+
+    rsps = []
+    for part in parts:
+        if not isinstance(part, RSPModelPHA):
+            continue
+        for idx, arf in enumerate(arfs):
+            if part._arf is arf:
+                rsps.append((idx, part))
+                break
+
+    return rsps
+
+
 class WalkWithSubIters(Walk):
 
     def __init__(self, sampler=None, niter=1000):
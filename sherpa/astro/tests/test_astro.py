@@ -26,7 +26,7 @@ import pytest
 
 from sherpa.utils import _ncpus
 from sherpa.utils.testing import SherpaTestCase, requires_data, \
-    requires_fits, requires_xspec, requires_group
+    requires_fits, requires_xspec
 from sherpa import get_config
 import sherpa.astro.ui as ui
 from sherpa.astro.data import DataPHA
@@ -744,7 +744,6 @@ class test_threads(SherpaTestCase):
 
     @requires_fits
     @requires_xspec
-    @requires_group
     def test_setfullmodel(self):
         self.run_thread('setfullmodel')
 
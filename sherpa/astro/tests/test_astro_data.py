@@ -25,7 +25,7 @@ import numpy as np
 import pytest
 
 from sherpa.astro.ui.utils import Session
-from sherpa.astro.data import DataARF, DataPHA, DataRMF
+from sherpa.astro.data import DataARF, DataIMG, DataPHA, DataRMF
 from sherpa.utils.err import DataErr
 from sherpa.utils.testing import SherpaTestCase, requires_data, requires_fits
 
@@ -877,3 +877,294 @@ def test_rmf_get_x_unit():
     expected_rmf_x = (rmf_x_hi + rmf_x_lo)/2
     actual_rmf_x = rmf.get_x()
     np.testing.assert_array_almost_equal(expected_rmf_x, actual_rmf_x)
+
+
+def make_grouped_pha(nchan=20, gap=False):
+    """A PHA with a delta-function response and four groups."""
+
+    egrid = np.linspace(0.1, 2.1, nchan + 1)
+    elo = egrid[:-1]
+    ehi = egrid[1:]
+    e_min = elo.copy()
+    e_max = ehi.copy()
+    if gap:
+        # make the channels not touch, so there are gaps between them
+        e_max -= 0.01
+
+    rmf = create_delta_rmf(elo, ehi, e_min=e_min, e_max=e_max)
+    chans = np.arange(1, nchan + 1, dtype=np.int16)
+    grouping = np.ones(nchan, dtype=np.int16)
+    grouping[1::5] = -1
+    grouping[2::5] = -1
+    pha = DataPHA('test', chans, np.ones(nchan), grouping=grouping)
+    pha.set_rmf(rmf)
+    pha.units = 'energy'
+    return pha
+
+
+@pytest.mark.parametrize("gap", [False, True])
+@pytest.mark.parametrize("grouped", [False, True])
+def test_energy_to_channel_matches_scalar(gap, grouped):
+    """The vectorized lookup matches the per-value calculation."""
+
+    from sherpa.astro.data import _energy_to_channel_scalar
+
+    pha = make_grouped_pha(gap=gap)
+    pha.grouped = grouped
+    elo, ehi = pha._get_ebins()
+
+    evals = np.concatenate((np.linspace(0, 2.5, 101), elo, ehi))
+    expected = _energy_to_channel_scalar(elo, ehi, evals)
+    got = pha._energy_to_channel(evals)
+    assert got.dtype == expected.dtype
+    assert got == pytest.approx(expected)
+
+    assert pha._energy_to_channel(1.0) == \
+        _energy_to_channel_scalar(elo, ehi, np.asarray(1.0))
+
+    # check a descending grid
+    elo = elo[::-1]
+    ehi = ehi[::-1]
+    rmf = create_delta_rmf(elo[::-1], ehi[::-1], e_min=elo, e_max=ehi)
+    pha = DataPHA('x', np.arange(1, elo.size + 1), np.ones(elo.size))
+    pha.set_rmf(rmf)
+    pha.units = 'energy'
+    expected = _energy_to_channel_scalar(elo, ehi, evals)
+    assert pha._energy_to_channel(evals) == pytest.approx(expected)
+
+
+def test_energy_index_cached():
+    """The lookup table is only re-created when the grouping changes."""
+
+    pha = make_grouped_pha()
+    elo1, ehi1 = pha._get_ebins()
+    elo2, ehi2 = pha._get_ebins()
+    assert elo1 is elo2
+    assert ehi1 is ehi2
+    assert len(elo1) == 12
+
+    # the grouped arrays can not be changed by the caller
+    with pytest.raises(ValueError):
+        elo1[0] = 0
+
+    elo3, _ = pha._get_ebins(group=False)
+    assert len(elo3) == 20
+    assert pha._get_ebins(group=False)[0] is elo3
+
+    pha.grouping = np.ones(20, dtype=np.int16)
+    elo4, _ = pha._get_ebins()
+    assert len(elo4) == 20
+    assert pha._get_ebins(group=False)[0] is elo3
+
+    rmf = create_delta_rmf(np.arange(1, 21), np.arange(2, 22),
+                           e_min=np.arange(1, 21), e_max=np.arange(2, 22))
+    pha.set_rmf(rmf)
+    assert pha._get_ebins(group=False)[0] is rmf.e_min
+    assert pha._channel_to_energy(2, group=False) == pytest.approx(2.5)
+    assert pha._energy_to_channel(3.2) == pytest.approx(3)
+    assert pha._wavelength_to_channel(pha._hc / 3.2) == pytest.approx(3)
+
+
+def test_energy_index_set_again():
+    """The lookup table is re-created when the arrays are set."""
+
+    pha = make_grouped_pha()
+    assert len(pha._get_ebins()[0]) == 12
+
+    # changes made in place are only noticed once the array is set
+    pha.grouping[1] = 1
+    assert len(pha._get_ebins()[0]) == 12
+    pha.grouping = pha.grouping
+    assert len(pha._get_ebins()[0]) == 13
+
+    # with no response the bins are taken from the channel values,
+    # whatever the units
+    pha = DataPHA('x', np.arange(1, 6), np.ones(5))
+    pha.units = 'energy'
+    assert pha._get_ebins()[0] == pytest.approx([0.5, 1.5, 2.5, 3.5, 4.5])
+
+    pha.channel = np.arange(11, 16)
+    assert pha._get_ebins()[0][0] == pytest.approx(10.5)
+
+    pha.channel[0] = 1
+    pha.channel = pha.channel
+    assert pha._get_ebins()[0][0] == pytest.approx(0.5)
+
+
+def test_notice_grouped_energy_cached():
+    """notice uses the cached lookup table"""
+
+    pha = make_grouped_pha()
+    pha.notice(0.5, 1.2)
+    assert pha.get_filter(format='%.1f') == '0.6:1.2'
+    pha.ignore(0.8, 0.9)
+    assert pha.get_filter(format='%.1f') == '0.6,1.1:1.2'
+    pha.notice()
+    assert pha.get_filter(format='%.1f') == '0.2:2.0'
+
+    pha.units = 'wavelength'
+    pha.notice(8, 20)
+    assert pha.get_filter(format='%.2f') == '8.00:16.53'
+
+
+def test_pha_cached_arrays():
+    """The grouped and filtered arrays are re-used until a change."""
+
+    pha = make_grouped_pha()
+    pha.units = 'channel'
+    pha.counts = np.arange(1, 21, dtype=float)
+    pha.staterror = np.ones(20)
+
+    dep = pha.get_dep(filter=True)
+    assert dep.size == 12
+    assert dep[0] == pytest.approx(6)
+
+    # the cached array is returned, and can not be changed
+    assert pha.get_dep(filter=True) is dep
+    with pytest.raises(ValueError):
+        dep[0] = 2
+
+    # the ungrouped, unfiltered data is the counts array
+    assert pha.get_dep() is pha.counts
+
+    err = pha.get_staterror(filter=True)
+    assert not err.flags.writeable
+    assert err[0] == pytest.approx(np.sqrt(3))
+
+    # changing the filter
+    pha.ignore(None, 3)
+    dep2 = pha.get_dep(filter=True)
+    assert dep2.size == 11
+    assert dep2[0] == pytest.approx(4)
+
+    # changing the data
+    pha.counts *= 2
+    assert pha.get_dep(filter=True)[0] == pytest.approx(8)
+
+    # changing the grouping
+    pha.grouped = False
+    assert pha.get_dep(filter=True)[0] == pytest.approx(8)
+    assert pha.get_dep(filter=True).size == 17
+
+    pha.backscal = np.full(20, 0.5, dtype=np.float32)
+    bscal = pha.get_backscal(filter=True)
+    assert bscal.size == 17
+    assert bscal == pytest.approx(np.full(17, 0.5))
+
+
+def test_pha_cached_arrays_background():
+    """Changing the background invalidates the source arrays."""
+
+    pha = make_grouped_pha()
+    pha.counts = np.full(20, 4.0)
+    bkg = DataPHA('bkg', pha.channel, np.ones(20))
+    pha.set_background(bkg)
+    pha.subtract()
+
+    assert pha.get_dep() == pytest.approx(np.full(20, 3.0))
+
+    bkg.counts = np.full(20, 2.0)
+    assert pha.get_dep() == pytest.approx(np.full(20, 2.0))
+
+    bkg.backscal = 2.0
+    assert pha.get_dep() == pytest.approx(np.full(20, 3.0))
+
+    pha.unsubtract()
+    assert pha.get_dep() is pha.counts
+
+
+def test_arf_view_filtered_separately():
+    """A view shares the ARF data but not the filter or header."""
+
+    egrid = np.arange(0.1, 1.2, 0.1)
+    arf = create_arf(egrid[:-1], egrid[1:])
+    arf.header = {'TELESCOP': 'SHERPA'}
+
+    view = arf.get_view()
+    assert isinstance(view, DataARF)
+    assert view.specresp is arf.specresp
+    assert view.energ_lo is arf.energ_lo
+
+    mask = np.arange(10) > 3
+    view.notice(mask)
+    assert view.get_dep().size == 6
+    assert arf.get_dep().size == 10
+
+    view.header['TELESCOP'] = 'OTHER'
+    assert arf.header['TELESCOP'] == 'SHERPA'
+
+    # the state can be pickled without the original ARF
+    state = view.__getstate__()
+    assert '_base' not in state
+    assert view._base is arf
+    assert view.get_view()._base is arf
+
+
+@pytest.mark.parametrize("coord", ["logical", "physical", "world"])
+def test_img_implicit_grid(coord):
+    """The implicit grid matches the stored grid."""
+
+    from sherpa.astro.io.wcs import WCS
+    from sherpa.astro.utils import reshape_2d_arrays
+
+    shape = (4, 5)
+    y = np.arange(20, dtype=float)
+    sky = WCS('physical', 'LINEAR', [100.0, 200.0], [0.5, 0.5], [2.0, 2.0])
+    eqpos = WCS('world', 'WCS', [10.0, 20.0], [100.0, 200.0],
+                [-1e-4, 1e-4])
+
+    x0, x1 = reshape_2d_arrays(np.arange(1.0, 6.0), np.arange(1.0, 5.0))
+    img = DataIMG('img', x0, x1, y, shape=shape, sky=sky, eqpos=eqpos)
+    lazy = DataIMG('img', None, None, y, shape=shape, sky=sky, eqpos=eqpos)
+
+    img.set_coord(coord)
+    lazy.set_coord(coord)
+    assert lazy.coord == coord
+
+    mask = np.arange(20) % 3 == 0
+    for filt in [False, True]:
+        if filt:
+            img.mask = mask
+            lazy.mask = mask
+
+        for a, b in zip(img.get_indep(filt), lazy.get_indep(filt)):
+            assert b == pytest.approx(a)
+
+    # The filtered grid is only re-calculated when the filter changes
+    x0 = lazy.get_x0(True)
+    assert lazy.get_x0(True) is x0
+    assert x0.size == 7
+
+    lazy.mask = ~mask
+    assert lazy.get_x0(True).size == 13
+
+
+def test_pha_cached_arrays_set_again():
+    """Arrays changed in place must be set again to clear the cache."""
+
+    pha = DataPHA('x', np.arange(1, 11), np.full(10, 5.0))
+    pha.grouping = np.tile([1, -1], 5)
+    pha.grouped = True
+    assert pha.get_dep(filter=True) == pytest.approx(np.full(5, 10))
+
+    pha.grouping[3] = 1
+    assert pha.get_dep(filter=True) == pytest.approx(np.full(5, 10))
+    pha.grouping = pha.grouping
+    assert pha.get_dep(filter=True) == pytest.approx([10, 5, 5, 10, 10, 10])
+
+    pha.counts[0] = 100
+    pha.counts = pha.counts
+    assert pha.get_dep(filter=True) == pytest.approx([105, 5, 5, 10, 10, 10])
+
+    pha.notice(1, 10)
+    mask = pha.mask.copy()
+    mask[0] = False
+    pha.mask = mask
+    assert pha.get_dep(filter=True) == pytest.approx([5, 5, 10, 10, 10])
+
+    bkg = DataPHA('bkg', pha.channel, np.zeros(10))
+    pha.set_background(bkg)
+    pha.subtract()
+    bkg.counts[2] = 3
+    bkg.counts = bkg.counts
+    assert pha.get_dep(filter=True) == pytest.approx([2, 5, 10, 10, 10])
@@ -0,0 +1,88 @@
+#
+#  Copyright (C) 2018  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+import numpy as np
+
+import pytest
+
+from sherpa.astro.background import BackgroundSumModel
+from sherpa.astro.data import DataPHA
+from sherpa.models.basic import Const1D, Polynom1D
+from sherpa.utils.err import DataErr
+
+
+def make_data():
+    chans = np.arange(1, 11)
+    src = DataPHA('src', chans, np.ones(10), exposure=100.0, backscal=0.2)
+    for bkg_id, exposure, backscal in [(1, 200.0, 0.8), (2, 400.0, 1.2),
+                                       (3, 150.0, 0.5)]:
+        bkg = DataPHA('bkg{}'.format(bkg_id), chans, np.ones(10),
+                      exposure=exposure, backscal=backscal)
+        src.set_background(bkg, id=bkg_id)
+
+    return src
+
+
+def make_model(name, c0, c1):
+    mdl = Polynom1D(name)
+    mdl._use_caching = False
+    mdl.c0 = c0
+    mdl.c1 = c1
+    return mdl
+
+
+def test_background_sum_model_shared_models():
+
+    src = make_data()
+    m1 = make_model('m1', 2, 0.5)
+    m2 = make_model('m2', 10, -0.2)
+    bkgmodels = {1: m1, 2: m2, 3: m1}
+    mdl = BackgroundSumModel(src, bkgmodels)
+
+    x = np.linspace(0.5, 5, 10)
+    expected = src.sum_background_data(lambda key, bkg: bkgmodels[key](x))
+    assert mdl(x) == pytest.approx(expected, rel=1e-12)
+
+
+def test_background_sum_model_uses_p():
+
+    src = make_data()
+    m1 = make_model('m1', 2, 0.5)
+    m2 = Const1D('m2')
+    m2._use_caching = False
+    mdl = BackgroundSumModel(src, {1: m1, 2: m2, 3: m2})
+
+    x = np.linspace(0.5, 5, 10)
+    p = [par.val for par in mdl.pars]
+    y1 = mdl.calc(p, x)
+
+    # changing the parameter values does not change the result when
+    # p is given
+    m1.c0 = 40
+    m2.c0 = 20
+    assert mdl.calc(p, x) == pytest.approx(y1)
+    assert mdl(x) != pytest.approx(y1)
+
+
+def test_background_sum_model_missing_model():
+
+    src = make_data()
+    mdl = BackgroundSumModel(src, {1: Const1D(), 2: Const1D()})
+    with pytest.raises(DataErr):
+        mdl(np.arange(1, 4))
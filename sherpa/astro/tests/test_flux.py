@@ -0,0 +1,99 @@
+#
+#  Copyright (C) 2018  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+import numpy as np
+
+import pytest
+
+from sherpa.astro.data import DataPHA
+from sherpa.astro.flux import calc_flux, calc_model_quantiles
+from sherpa.astro.instrument import Response1D, create_arf, \
+    create_delta_rmf
+from sherpa.astro.utils import calc_energy_flux, calc_photon_flux
+from sherpa.fit import Fit
+from sherpa.models.basic import PowLaw1D
+from sherpa.stats import Cash
+
+
+def setup_fit():
+    egrid = np.linspace(0.1, 10, 100)
+    elo = egrid[:-1]
+    ehi = egrid[1:]
+    chans = np.arange(1, elo.size + 1)
+    data = DataPHA('flux', chans, np.ones(elo.size), exposure=100.0)
+    data.set_arf(create_arf(elo, ehi, np.ones(elo.size) * 50.0))
+    data.set_rmf(create_delta_rmf(elo, ehi, e_min=elo, e_max=ehi))
+
+    src = PowLaw1D()
+    src.ampl = 0.1
+    src.gamma = 1.7
+    model = Response1D(data)(src)
+    return Fit(data, model, stat=Cash()), data, src, model
+
+
+def make_samples(num):
+    np.random.seed(7324)
+    gamma = np.random.uniform(1.2, 2.2, size=num)
+    ampl = np.random.uniform(0.05, 0.15, size=num)
+    return np.column_stack((gamma, ampl))
+
+
+@pytest.mark.parametrize("method", [calc_energy_flux, calc_photon_flux])
+@pytest.mark.parametrize("lo, hi", [(None, None), (0.5, 2.0), (2.0, None)])
+def test_calc_flux_matches_per_sample(method, lo, hi):
+    """The batch calculation matches calling method per sample"""
+
+    fit, data, src, _ = setup_fit()
+    samples = make_samples(25)
+
+    expected = []
+    for sample in samples:
+        fit.model.thawedpars = sample
+        expected.append(method(data, src, lo, hi))
+
+    fit.model.thawedpars = [1.7, 0.1]
+    got = calc_flux(fit, data, src, samples, method=method, lo=lo, hi=hi,
+                    numcores=1, chunksize=7)
+    assert got.shape == (25, 3)
+    assert got[:, 0] == pytest.approx(expected, rel=1e-12)
+    assert (got[:, 1:] == samples).all()
+    assert fit.model.thawedpars == pytest.approx([1.7, 0.1])
+
+
+def test_calc_model_quantiles():
+    """The histogram estimate matches the exact percentiles"""
+
+    fit, data, _, model = setup_fit()
+    samples = make_samples(2000)
+
+    vals = []
+    for sample in samples:
+        fit.model.thawedpars = sample
+        vals.append(data.eval_model(model))
+
+    vals = np.asarray(vals)
+    fit.model.thawedpars = [1.7, 0.1]
+    quantiles = (2.5, 50, 97.5)
+    got = calc_model_quantiles(fit, data, model, samples,
+                               quantiles=quantiles, chunksize=300)
+    expected = np.percentile(vals, quantiles, axis=0)
+    assert got.shape == expected.shape
+    tol = (vals.max(axis=0) - vals.min(axis=0)) / 200.0
+    assert (np.abs(got - expected) <= tol).all()
+    assert fit.model.thawedpars == pytest.approx([1.7, 0.1])
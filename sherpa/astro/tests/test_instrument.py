@@ -43,10 +43,13 @@ from sherpa.models.model import ArithmeticModel, \
     ArithmeticConstantModel, BinaryOpModel
 from sherpa.astro.instrument import ARF1D, ARFModelNoPHA, ARFModelPHA, \
     Response1D, RMF1D, RMFModelNoPHA, RMFModelPHA, \
-    RSPModelNoPHA, RSPModelPHA, create_arf, create_delta_rmf
+    RSPModelNoPHA, RSPModelPHA, create_arf, create_delta_rmf, ARFBasisFold, \
+    MultiResponseSumModel, MultiResponseSet
+from sherpa.astro.utils import compile_energy_grid
 from sherpa.fit import Fit
 from sherpa.astro.data import DataARF, DataPHA, DataRMF
 from sherpa.models.basic import Const1D, Polynom1D, PowLaw1D
+from sherpa.utils import sum_intervals
 from sherpa.utils.err import DataErr
 from sherpa.utils.testing import requires_xspec, requires_data, requires_fits
 
@@ -995,6 +998,219 @@ def test_rspmodelpha_matrix_call(ignore):
     assert_allclose(out, expected)
 
 
+def test_rspmodelpha_arf_basis():
+    """The cached basis folds match folding the combined ARF."""
+
+    exposure = 200.1
+    rdata = create_non_delta_rmf()
+    specresp = create_non_delta_specresp().astype(np.float64)
+    elo = rdata.energ_lo
+    ehi = rdata.energ_hi
+
+    adata = create_arf(elo, ehi, specresp, exposure=exposure)
+    nchans = rdata.e_min.size
+
+    mdl = Polynom1D('sloped')
+    mdl.c0 = 22.3
+    mdl.c1 = -1.2
+
+    channels = np.arange(1, nchans + 1, dtype=np.int16)
+    counts = np.ones(nchans, dtype=np.int16)
+    pha = DataPHA('test-pha', channel=channels, counts=counts,
+                  exposure=exposure)
+    pha.set_rmf(rdata)
+
+    wrapped = RSPModelPHA(adata, rdata, pha, mdl)
+
+    basis = np.zeros((2, elo.size))
+    basis[0, 3:8] = 1.5
+    basis[1] = np.linspace(-1, 1, elo.size)
+    fold = ARFBasisFold(specresp, basis)
+    wrapped.arf_basis = fold
+
+    matrix = get_non_delta_matrix()
+    modvals = mdl(rdata.energ_lo, rdata.energ_hi)
+    wrapped([4, 5])
+    assert fold._folds is None
+
+    for coeffs in [[0.2, -0.4], [1.2, 0.7]]:
+        arfvals = specresp + np.dot(coeffs, basis)
+        adata.specresp = arfvals
+        fold.set_coeffs(coeffs, arfvals)
+        expected = np.matmul(modvals * arfvals, matrix)
+
+        # not active, so the folds are not used
+        assert_allclose(wrapped([4, 5]), expected)
+
+        fold.active = True
+        assert_allclose(wrapped([4, 5]), expected)
+        assert fold._folds.shape == (3, nchans)
+        fold.active = False
+
+    # the folds are not used once the ARF has been changed
+    adata.specresp = specresp
+    fold.active = True
+    expected = np.matmul(modvals * specresp, matrix)
+    assert_allclose(wrapped([4, 5]), expected)
+
+
+def test_rspmodelpha_combined_response():
+    """startup multiplies the RMF by the ARF when the grids match."""
+
+    exposure = 200.1
+    rdata = create_non_delta_rmf()
+    specresp = create_non_delta_specresp().astype(np.float64)
+    elo = rdata.energ_lo
+    ehi = rdata.energ_hi
+
+    adata = create_arf(elo, ehi, specresp, exposure=exposure)
+    nchans = rdata.e_min.size
+
+    mdl = Polynom1D('sloped')
+    mdl.c0 = 22.3
+    mdl.c1 = -1.2
+
+    channels = np.arange(1, nchans + 1, dtype=np.int16)
+    counts = np.ones(nchans, dtype=np.int16)
+    pha = DataPHA('test-pha', channel=channels, counts=counts,
+                  exposure=exposure)
+    pha.set_rmf(rdata)
+
+    wrapped = RSPModelPHA(adata, rdata, pha, mdl)
+    assert wrapped._get_combined() is None
+
+    matrix = get_non_delta_matrix()
+    modvals = mdl(rdata.energ_lo, rdata.energ_hi)
+    expected = np.matmul(modvals * specresp, matrix)
+
+    wrapped.startup()
+    try:
+        assert wrapped._get_combined() is not None
+        assert_allclose(wrapped([4, 5]), expected)
+
+        # A new effective-area array means the combined response
+        # can not be used.
+        newresp = specresp * 1.3
+        wrapped.arf.specresp = newresp
+        assert wrapped._get_combined() is None
+        assert_allclose(wrapped([4, 5]), expected * 1.3)
+
+    finally:
+        wrapped.teardown()
+
+    assert wrapped._combined is None
+    assert_allclose(wrapped([4, 5]), expected)
+
+
+def make_grating_pha(name, nchans=30, seed=2371):
+    """A PHA with three responses (orders) on different energy grids."""
+
+    rng = np.random.RandomState(seed)
+    channels = np.arange(1, nchans + 1, dtype=np.int16)
+    pha = DataPHA(name, channel=channels, counts=np.ones(nchans),
+                  exposure=100.0)
+    ebounds = np.linspace(0.5, 7.5, nchans + 1)
+    for order, nbins in enumerate([40, 25, 32], 1):
+        egrid = np.linspace(0.5 + 0.01 * order, 7.0 + 0.02 * order,
+                            nbins + 1)
+        matrix = rng.uniform(size=nbins * nchans)
+        rmf = DataRMF('rmf{}'.format(order), nchans, egrid[:-1], egrid[1:],
+                      np.ones(nbins, dtype=np.uint32),
+                      np.ones(nbins, dtype=np.uint32),
+                      np.full(nbins, nchans, dtype=np.uint32), matrix,
+                      e_min=ebounds[:-1], e_max=ebounds[1:])
+        arf = create_arf(egrid[:-1], egrid[1:],
+                         rng.uniform(10, 20, size=nbins))
+        pha.set_response(arf, rmf, id=order)
+
+    return pha
+
+
+def multi_response_expected(mdl, pha):
+    """Evaluate the orders with the per-order interval sum and fold."""
+
+    grids = []
+    for id in pha.response_ids:
+        arf, rmf = pha.get_response(id)
+        grids.append(arf.get_indep())
+
+    elo, ehi, table = compile_energy_grid(grids)
+    src = mdl(elo, ehi)
+    orders = []
+    for id, (lo, hi) in zip(pha.response_ids, table):
+        arf, rmf = pha.get_response(id)
+        specresp = arf.get_dep()
+        orders.append(rmf.apply_rmf(specresp * sum_intervals(src, lo, hi)))
+
+    return orders
+
+
+@pytest.mark.parametrize("ignore", [False, True])
+def test_multiresponsesummodel_orders(ignore):
+
+    pha = make_grating_pha('orders')
+    mdl = Polynom1D('mdl')
+    mdl._use_caching = False
+    mdl.c0 = 4.2
+    mdl.c1 = -0.3
+
+    wrapped = MultiResponseSumModel(mdl, pha)
+    if ignore:
+        pha.ignore(None, 2)
+
+    wrapped.startup()
+    try:
+        expected = multi_response_expected(mdl, pha)
+        got = wrapped(pha.get_noticed_channels())
+        total = sum(expected)
+        if ignore:
+            total = total[pha.get_mask()]
+            assert total.size < pha.channel.size
+
+        assert_allclose(got, total, rtol=1e-12)
+
+        assert len(wrapped.orders) == 3
+        for a, b in zip(wrapped.orders, expected):
+            assert_allclose(a, b, rtol=1e-12)
+    finally:
+        wrapped.teardown()
+
+
+def test_multiresponseset_shares_evaluation():
+
+    class CountingPoly(Polynom1D):
+        ncalls = 0
+
+        def calc(self, *args, **kwargs):
+            CountingPoly.ncalls += 1
+            return Polynom1D.calc(self, *args, **kwargs)
+
+    phas = [make_grating_pha('row1'), make_grating_pha('row2', seed=83)]
+    mdl = CountingPoly('mdl')
+    mdl._use_caching = False
+    mdl.c0 = 2.0
+    mdl.c1 = 0.1
+
+    models = MultiResponseSet(phas)(mdl)
+    assert len(models) == 2
+    expected = [multi_response_expected(mdl, pha) for pha in phas]
+
+    CountingPoly.ncalls = 0
+    for pha, model, orders in zip(phas, models, expected):
+        assert_allclose(model(pha.channel), pha.exposure * sum(orders),
+                        rtol=1e-12)
+
+    assert CountingPoly.ncalls == 1
+
+    # a parameter change means the source is re-evaluated
+    mdl.c1 = 0.2
+    expected = multi_response_expected(mdl, phas[1])
+    CountingPoly.ncalls = 0
+    assert_allclose(models[1](phas[1].channel),
+                    phas[1].exposure * sum(expected), rtol=1e-12)
+    assert CountingPoly.ncalls == 1
+
+
 def test_rspmodelpha_delta_call_wave():
     """What happens calling a rsp with a pha (RMF is a delta fn)? Wavelength.
 
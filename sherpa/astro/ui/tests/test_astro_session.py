@@ -16,7 +16,13 @@
 #  with this program; if not, write to the Free Software Foundation, Inc.,
 #  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 #
+import logging
+
+import numpy as np
+import pytest
+
 from sherpa.astro.ui.utils import Session
+from sherpa.utils.err import ArgumentErr, IOErr
 from sherpa.utils.testing import requires_data, requires_fits
 
 
@@ -38,3 +44,96 @@ def test_show_bkg_model_with_bkg(make_data_path):
     session.load_data('foo', make_data_path('3c273.pi'))
     session.show_bkg_model()
     session.show_bkg_model('foo')
+
+
+@requires_fits
+@pytest.mark.parametrize("numcores", [1, 3])
+def test_load_multi_data(numcores, tmpdir, caplog):
+    """Files are loaded in order and failures are skipped."""
+
+    filenames = []
+    for i in range(5):
+        fname = str(tmpdir.join('data{}.dat'.format(i)))
+        np.savetxt(fname, np.asarray([[1, 2, 3], [i, i, i]]).T)
+        filenames.append(fname)
+
+    filenames[2] = str(tmpdir.join('missing.dat'))
+
+    session = Session()
+    session.load_arrays(2, [1, 2], [1, 2])
+    with caplog.at_level(logging.WARNING, logger='sherpa'):
+        ids = session.load_multi_data(filenames, numcores=numcores)
+
+    assert ids == [1, 3, 4, 5]
+    for idval, i in zip(ids, [0, 1, 3, 4]):
+        assert session.get_data(idval).name == filenames[i]
+        assert session.get_dep(idval) == pytest.approx([i, i, i])
+
+    assert session.get_dep(2) == pytest.approx([1, 2])
+
+    msgs = [r.getMessage() for r in caplog.records]
+    assert len(msgs) == 1
+    assert msgs[0].startswith('unable to read ' + filenames[2])
+
+    ids = session.load_multi_data(filenames[:2], ids=['a', 'b'],
+                                  numcores=numcores)
+    assert ids == ['a', 'b']
+    assert session.get_data('b').name == filenames[1]
+
+    with pytest.raises(ArgumentErr):
+        session.load_multi_data(filenames, ids=['a', 'b'])
+
+
+@pytest.mark.parametrize("format", ['npz', 'ascii'])
+def test_save_multi_results(format, tmpdir):
+    """The model and residuals for all data sets are in one table."""
+
+    from sherpa.astro.data import DataPHA
+    from sherpa.astro.instrument import create_delta_rmf
+    from sherpa.models.basic import Const1D, Polynom1D
+
+    session = Session()
+    session.load_arrays(1, [1, 2, 3], [2, 4, 7])
+    session.set_data('pha', DataPHA('pha', np.arange(1, 5), [4, 5, 6, 7]))
+    egrid = np.arange(1, 6)
+    rmf = create_delta_rmf(egrid[:-1], egrid[1:], e_min=egrid[:-1],
+                           e_max=egrid[1:])
+    session.set_rmf('pha', rmf)
+
+    mdl1 = Polynom1D('m1')
+    mdl1.c0 = 0
+    mdl1.c1 = 2
+    session.set_source(1, mdl1)
+    mdl2 = Const1D('m2')
+    mdl2.c0 = 5
+    session.set_source('pha', mdl2)
+
+    fname = str(tmpdir.join('out.' + format))
+    session.save_multi_results(fname, format=format)
+
+    if format == 'npz':
+        out = np.load(fname)
+        cols = [out[name] for name in ['ID', 'X', 'MODEL', 'RESID']]
+    else:
+        with open(fname) as fh:
+            assert fh.readline() == '#ID X MODEL RESID\n'
+            rows = [line.split() for line in fh]
+        cols = [np.asarray(col) for col in zip(*rows)]
+        cols[0] = cols[0].astype(np.bytes_)
+        cols[1:] = [col.astype(float) for col in cols[1:]]
+
+    assert list(cols[0]) == [b'1'] * 3 + [b'pha'] * 4
+    assert cols[1] == pytest.approx([1, 2, 3, 1.5, 2.5, 3.5, 4.5])
+    assert cols[2] == pytest.approx([2, 4, 6, 5, 5, 5, 5])
+    assert cols[3] == pytest.approx([0, 0, 1, -1, 0, 1, 2])
+
+    with pytest.raises(IOErr):
+        session.save_multi_results(fname, format=format)
+
+    session.save_multi_results(fname, ids=[1], types=['model'],
+                               format=format, clobber=True)
+    if format == 'npz':
+        out = np.load(fname)
+        assert sorted(out.files) == ['ID', 'MODEL', 'X']
+        assert out['ID'].dtype.kind == 'i'
+        assert out['MODEL'] == pytest.approx([2, 4, 6])
@@ -0,0 +1,87 @@
+#
+#  Copyright (C) 2019  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+"""Check the cost of importing sherpa.astro.ui.
+
+Each test runs a new Python process, since the modules have already
+been imported by the test suite.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import sherpa
+
+
+# The import-time benchmark is only run when this environment
+# variable is set, since wall-clock times are too noisy to assert
+# on in a shared test environment. The value is the name of a file
+# to which the time (in seconds) is appended.
+BENCHMARK_ENV = 'SHERPA_IMPORT_BENCHMARK'
+
+_script = """
+import json, sys, time
+t0 = time.time()
+import sherpa.astro.ui
+t1 = time.time()
+print(json.dumps({'time': t1 - t0,
+                  'modules': sorted(sys.modules.keys()),
+                  'plot': sherpa.plot.plot_opt}))
+"""
+
+
+def run_import():
+    """Import sherpa.astro.ui in a new process."""
+
+    topdir = os.path.dirname(os.path.dirname(sherpa.__file__))
+    env = os.environ.copy()
+    path = env.get('PYTHONPATH')
+    env['PYTHONPATH'] = topdir if not path else os.pathsep.join([topdir, path])
+
+    out = subprocess.check_output([sys.executable, '-c', _script],
+                                  env=env, cwd=topdir)
+    lines = out.decode('utf-8').strip().split('\n')
+    return json.loads(lines[-1])
+
+
+def test_import_does_not_load_backends():
+    """Plotting, imaging, and FITS support are loaded on first use."""
+
+    out = run_import()
+    modules = set(out['modules'])
+    if out['plot'] == 'pylab_backend':
+        assert 'matplotlib' not in modules
+
+    assert 'astropy' not in modules
+    assert 'sherpa.image.ds9_backend' not in modules
+
+
+@pytest.mark.skipif(BENCHMARK_ENV not in os.environ,
+                    reason="set {} to run".format(BENCHMARK_ENV))
+def test_import_time():
+    """Record the time taken to import sherpa.astro.ui."""
+
+    # Use the fastest of several runs to reduce the noise.
+    tmin = min(run_import()['time'] for _ in range(3))
+    with open(os.environ[BENCHMARK_ENV], 'a') as fh:
+        fh.write("{:.4f}\n".format(tmin))
@@ -172,3 +172,34 @@ def test_load_xstable_model_fails_with_text_column(make_data_path):
         ui.load_xstable_model('stringcol', infile)
 
     assert ui.list_model_components() == []
+
+
+def test_fake_pha_batch():
+    """fake_pha_batch folds the model once and returns num rows"""
+
+    import numpy as np
+    from sherpa.astro.instrument import create_arf, create_delta_rmf
+
+    egrid = np.arange(0.1, 2.0, 0.1)
+    elo = egrid[:-1]
+    ehi = egrid[1:]
+    arf = create_arf(elo, ehi, np.ones(elo.size) * 100.0)
+    rmf = create_delta_rmf(elo, ehi, e_min=elo, e_max=ehi)
+
+    ui.clean()
+    ui.dataspace1d(1, elo.size, id='sim', dstype=ui.DataPHA)
+    mdl = ui.create_model_component('const1d', 'mdl')
+    mdl.c0 = 0.2
+    ui.set_source('sim', mdl)
+
+    np.random.seed(2391)
+    sims = ui.fake_pha_batch('sim', arf, rmf, 100.0, 500)
+    assert sims.shape == (500, elo.size)
+
+    # The expected counts are 0.2 * 0.1 keV * 100 cm^2 * 100 s
+    expected = ui.get_data('sim').eval_model(ui.get_model('sim'))
+    assert expected == pytest.approx(np.ones(elo.size) * 200.0)
+    assert sims.mean(axis=0) == pytest.approx(expected, rel=0.05)
+
+    assert ui.get_data('sim').name == 'faked'
+    assert (ui.get_dep('sim') == sims[0]).all()
@@ -45,7 +45,7 @@ import numpy
 from numpy.testing import assert_array_equal
 
 from sherpa.utils.testing import SherpaTestCase, requires_data, \
-    requires_xspec, has_package_from_list, requires_fits, requires_group
+    requires_xspec, has_package_from_list, requires_fits
 from sherpa.astro import ui
 # from sherpa.astro.ui import serialize
 
@@ -1115,7 +1115,6 @@ class test_ui(SherpaTestCase):
     @requires_data
     @requires_xspec
     @requires_fits
-    @requires_group
     def test_canonical_pha_grouped(self):
 
         _, _, canonical = self._setup_pha_grouped()
@@ -1124,7 +1123,6 @@ class test_ui(SherpaTestCase):
     @requires_data
     @requires_xspec
     @requires_fits
-    @requires_group
     def test_restore_pha_grouped(self):
         "Can the state be evaluated?"
 
@@ -1158,7 +1156,6 @@ class test_ui(SherpaTestCase):
     @requires_data
     @requires_xspec
     @requires_fits
-    @requires_group
     def test_canonical_pha_back(self):
 
         _, _, canonical = self._setup_pha_back()
@@ -1167,7 +1164,6 @@ class test_ui(SherpaTestCase):
     @requires_data
     @requires_xspec
     @requires_fits
-    @requires_group
     def test_restore_pha_back(self):
         "Can the state be evaluated?"
 
@@ -25,8 +25,13 @@ If we want to do this then some way of factoring out the common
 code and tests is likely needed.
 """
 
+import numpy
+import pytest
+
 from sherpa.utils.testing import requires_plotting
 from sherpa.astro.ui.utils import Session
+from sherpa.models import Const1D
+from sherpa.utils.err import IOErr
 from numpy.testing import assert_array_equal
 
 TEST = [1, 2, 3]
@@ -79,3 +84,35 @@ def test_save_restore(tmpdir):
     assert {1, } == set(session.list_data_ids())
     assert_array_equal(TEST, session.get_data(1).get_indep()[0])
     assert_array_equal(TEST2, session.get_data(1).get_dep())
+
+
+def test_save_restore_checkpoint(tmpdir):
+    outdir = tmpdir.join("sherpa.chk")
+    x = numpy.arange(2000) * 0.5
+    session = Session()
+    session.load_arrays(1, x, x * 2)
+    session.load_arrays(2, x, x * 2)
+    session.load_arrays(3, TEST, TEST2)
+    mdl = Const1D('c1')
+    mdl.c0 = 4
+    session.set_source(1, mdl)
+    session.save(str(outdir), checkpoint=True)
+
+    # The shared contents are only written out once.
+    assert len(outdir.join('arrays').listdir()) == 2
+
+    with pytest.raises(IOErr):
+        session.save(str(outdir), checkpoint=True)
+
+    session.clean()
+    session.restore(str(outdir))
+    assert {1, 2, 3} == set(session.list_data_ids())
+    assert_array_equal(x, session.get_data(2).get_indep()[0])
+    assert_array_equal(x * 2, session.get_data(1).get_dep())
+    assert_array_equal(TEST2, session.get_data(3).get_dep())
+    assert session.get_source(1).c0.val == 4
+
+    # The arrays are separate objects, and can be changed.
+    y = session.get_data(1).y
+    y[0] = 10
+    assert session.get_data(2).y[0] == 0
@@ -23,19 +23,22 @@ import logging
 import os
 import sys
 import warnings
+from multiprocessing.pool import ThreadPool
 
 import numpy
 
 import sherpa.ui.utils
 from sherpa.astro.instrument import create_arf, create_delta_rmf, create_non_delta_rmf
-from sherpa.ui.utils import _argument_type_error, _check_type, _send_to_pager
-from sherpa.utils import SherpaInt, SherpaFloat, sao_arange
+from sherpa.ui.utils import _argument_type_error, _check_type, \
+    _send_to_pager, _is_integer, _fake_batch
+from sherpa.utils import SherpaInt, SherpaFloat, sao_arange, _ncpus
 from sherpa.utils.err import ArgumentErr, ArgumentTypeErr, DataErr, \
     IdentifierErr, ImportErr, IOErr, ModelErr
 from sherpa.data import Data1D, Data1DAsymmetricErrs
 import sherpa.astro.all
 import sherpa.astro.plot
 from sherpa.astro.ui import serialize
+from sherpa.astro.io.export import TableWriter
 from sherpa.sim import NormalParameterSampleFromScaleMatrix
 from sherpa.stats import Cash, CStat, WStat
 
@@ -185,7 +188,7 @@ class Session(sherpa.ui.utils.Session):
 
     # Add ability to save attributes sepcific to the astro package.
     # Save XSPEC module settings that need to be restored.
-    def save(self, filename='sherpa.save', clobber=False):
+    def save(self, filename='sherpa.save', clobber=False, checkpoint=False):
         """Save the current Sherpa session to a file.
 
         Parameters
@@ -197,6 +200,11 @@ class Session(sherpa.ui.utils.Session):
            This flag controls whether an existing file can be
            overwritten (``True``) or if it raises an exception (``False``,
            the default setting).
+        checkpoint : bool, optional
+           If ``True`` then `filename` is a directory, and the large
+           arrays in the session - such as the data and responses -
+           are stored as separate files within it (see the Notes
+           section).
 
         Raises
         ------
@@ -217,6 +225,13 @@ class Session(sherpa.ui.utils.Session):
         contains all the data. This means that files created by `save`
         can be sent to collaborators to share results.
 
+        When `checkpoint` is set the session is written to a directory
+        using the `sherpa.ui.checkpoint` module. Arrays with the same
+        contents, such as the responses shared by several data sets,
+        are only stored once, and `restore` maps the arrays into
+        memory rather than reading them, which makes saving and
+        restoring sessions with many data sets much faster.
+
         Examples
         --------
 
@@ -229,12 +244,16 @@ class Session(sherpa.ui.utils.Session):
 
         >>> save('bestfit.sherpa', clobber=True)
 
+        Save the session as a checkpoint directory:
+
+        >>> save('fits.chk', checkpoint=True)
+
         """
         if (hasattr(sherpa.astro, "xspec")):
             self._xspec_state = sherpa.astro.xspec.get_xsstate()
         else:
             self._xspec_state = None
-        sherpa.ui.utils.Session.save(self, filename, clobber)
+        sherpa.ui.utils.Session.save(self, filename, clobber, checkpoint)
 
     def restore(self, filename='sherpa.save'):
         """Load in a Sherpa session from a file.
@@ -268,6 +287,12 @@ class Session(sherpa.ui.utils.Session):
           This probably means that you have restored a session saved with a previous version of Sherpa.
           Falling back to assuming that the model is continuous.
 
+        If `filename` is a directory created by ``save`` with the
+        `checkpoint` flag set then the arrays are mapped from the
+        files in the directory, and are only read in when used, so
+        the directory should not be deleted or changed while the
+        session is in use.
+
         Examples
         --------
 
@@ -1495,10 +1520,165 @@ class Session(sherpa.ui.utils.Session):
         else:
             self.set_data(id, data)
 
+    def unpack_multi_data(self, filenames, numcores=None, **kwargs):
+        """Create sherpa data objects from several files.
+
+        The files are read in at the same time, using a pool of
+        threads, which is faster than calling `unpack_data` for each
+        file in turn. A file which can not be read in does not stop
+        the other files from being read.
+
+        Parameters
+        ----------
+        filenames : iterable
+           The file names, or data structures, as supported by
+           `unpack_data`.
+        numcores : int or None, optional
+           The number of files to read in at the same time. When set
+           to None, the number of available CPUs is used.
+        kwargs
+           The keyword arguments supported by `unpack_data`.
+
+        Returns
+        -------
+        datasets : list
+           The data set objects, in the same order as filenames. The
+           entry is a list when the file contains multiple data sets
+           (e.g. a type II PHA file) and None when the file could not
+           be read in, in which case a warning message is displayed.
+
+        See Also
+        --------
+        load_multi_data : Load data sets from several files.
+        unpack_data : Create a sherpa data object from a file.
+
+        Examples
+        --------
+
+        >>> dsets = unpack_multi_data(['src1.pi', 'src2.pi', 'src3.pi'])
+
+        """
+        filenames = list(filenames)
+
+        def read(filename):
+            try:
+                return self.unpack_data(filename, **kwargs), None
+            except Exception as exc:
+                return None, exc
+
+        if numcores is None:
+            numcores = _ncpus
+        numcores = min(len(filenames), numcores or 1)
+
+        if numcores > 1:
+            pool = ThreadPool(numcores)
+            try:
+                results = pool.map(read, filenames)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = [read(filename) for filename in filenames]
+
+        datasets = []
+        for filename, (data, exc) in izip(filenames, results):
+            if exc is not None:
+                warning("unable to read {}: {}".format(filename, exc))
+            datasets.append(data)
+
+        return datasets
+
+    def load_multi_data(self, filenames, ids=None, numcores=None, **kwargs):
+        """Load data sets from several files.
+
+        The files are read in at the same time, as described in
+        `unpack_multi_data`, and then the data sets are created in
+        the order of the filenames argument. A file which can not
+        be read in is reported, and skipped, rather than stopping
+        the other files from being loaded.
+
+        Parameters
+        ----------
+        filenames : iterable
+           The file names, or data structures, as supported by
+           `load_data`.
+        ids : iterable of int or str, optional
+           The identifiers for the data sets, which must match the
+           filenames argument. If not given then integer values,
+           starting at 1, which are not already in use are chosen;
+           this also supports files which contain multiple data sets.
+        numcores : int or None, optional
+           The number of files to read in at the same time. When set
+           to None, the number of available CPUs is used.
+        kwargs
+           The keyword arguments supported by `load_data`.
+
+        Returns
+        -------
+        ids : list of int or str
+           The identifiers of the data sets that were loaded.
+
+        See Also
+        --------
+        load_data : Load a data set from a file.
+        unpack_multi_data : Create sherpa data objects from several files.
+
+        Examples
+        --------
+
+        Load three PHA files, along with their responses and
+        backgrounds, into the first unused identifiers:
+
+        >>> load_multi_data(['src1.pi', 'src2.pi', 'src3.pi'])
+        [1, 2, 3]
+
+        Load two images into data sets 'a' and 'b':
+
+        >>> load_multi_data(['a.img', 'b.img'], ids=['a', 'b'])
+        ['a', 'b']
+
+        """
+        filenames = list(filenames)
+        if ids is not None:
+            ids = [self._fix_id(id) for id in ids]
+            if len(ids) != len(filenames):
+                raise ArgumentErr('multiid')
+
+        datasets = self.unpack_multi_data(filenames, numcores=numcores,
+                                          **kwargs)
+
+        loaded = []
+        nextid = 1
+        for idx, (filename, data) in enumerate(izip(filenames, datasets)):
+            if data is None:
+                continue
+
+            if type(data) is not list:
+                data = [data]
+
+            if ids is not None:
+                if len(data) != 1:
+                    warning("unable to load {}: it contains {} data "
+                            "sets".format(filename, len(data)))
+                    continue
+
+                self.set_data(ids[idx], data[0])
+                loaded.append(ids[idx])
+                continue
+
+            for dset in data:
+                while nextid in self._data:
+                    nextid += 1
+
+                self.set_data(nextid, dset)
+                loaded.append(nextid)
+
+        return loaded
+
     # DOC-TODO: labelling as AstroPy HDUList; i.e. assuming conversion
     # from PyFITS lands soon.
     def unpack_image(self, arg, coord='logical',
-                     dstype=sherpa.astro.data.DataIMG):
+                     dstype=sherpa.astro.data.DataIMG, lazy=False):
         """Create an image data structure.
 
         Parameters
@@ -1512,6 +1692,11 @@ class Session(sherpa.ui.utils.Session):
            Ensure that the image contains the given coordinate system.
         dstype : optional
            The image class to use. The default is `DataIMG`.
+        lazy : bool, optional
+           If ``True`` then the pixel coordinates of a `DataIMG`
+           image are calculated when needed rather than stored, which
+           reduces the memory needed for large images. See
+           `sherpa.astro.io.read_image`.
 
         Returns
         -------
@@ -1549,10 +1734,10 @@ class Session(sherpa.ui.utils.Session):
         >>> idata = unpack_img(hdus)
 
         """
-        return sherpa.astro.io.read_image(arg, coord, dstype)
+        return sherpa.astro.io.read_image(arg, coord, dstype, lazy=lazy)
 
     def load_image(self, id, arg=None, coord='logical',
-                   dstype=sherpa.astro.data.DataIMG):
+                   dstype=sherpa.astro.data.DataIMG, lazy=False):
         """Load an image as a data set.
 
         Parameters
@@ -1571,6 +1756,11 @@ class Session(sherpa.ui.utils.Session):
            same as 'logical', and 'wcs' the same as 'world'.
         dstype : optional
            The data class to use. The default is `DataIMG`.
+        lazy : bool, optional
+           If ``True`` then the pixel coordinates of a `DataIMG`
+           image are calculated when needed rather than stored, which
+           reduces the memory needed for large images. See
+           `sherpa.astro.io.read_image`.
 
         See Also
         --------
@@ -1604,10 +1794,85 @@ class Session(sherpa.ui.utils.Session):
 
         >>> load_image('bg', 'img_bg.fits')
 
+        Load a large image, only creating the coordinates of the
+        pixels used in the fit:
+
+        >>> load_image('mosaic.fits', lazy=True)
+
         """
         if arg is None:
             id, arg = arg, id
-        self.set_data(id, self.unpack_image(arg, coord, dstype))
+        self.set_data(id, self.unpack_image(arg, coord, dstype, lazy=lazy))
+
+    def load_events(self, id, arg=None, dstype=sherpa.astro.data.DataPHA,
+                    **kwargs):
+        """Load an event list as a PHA or image data set.
+
+        The events are binned as they are read in, so the event list
+        does not have to be binned by another tool first.
+
+        .. versionadded:: 4.12.0
+
+        Parameters
+        ----------
+        id : int or str, optional
+           The identifier for the data set to use. If not given then
+           the default identifier is used, as returned by
+           `get_default_id`.
+        arg
+           Identify the event list: a file name, or a data structure
+           representing the data to use, as used by the I/O backend in
+           use by Sherpa: a ``TABLECrate`` for crates, as used by CIAO,
+           or a list of AstroPy HDU objects.
+        dstype : optional
+           The data class to create: `DataPHA` (the default), which
+           bins the events by channel, or `DataIMG`, which bins them
+           by position.
+        **kwargs
+           The binning and filter options - such as ``channel``,
+           ``binsize``, ``bounds``, ``time``, and ``energy`` - which
+           are described in `sherpa.astro.io.read_events`.
+
+        See Also
+        --------
+        load_image : Load an image as a data set.
+        load_pha : Load a PHA data set.
+        set_rmf : Set the RMF for use by a PHA data set.
+
+        Notes
+        -----
+        The function does not follow the normal Python standards for
+        parameter use, since it is designed for easy interactive use.
+        When called with a single un-named argument, it is taken to be
+        the `arg` parameter. If given two un-named arguments, then
+        they are interpreted as the `id` and `arg` parameters,
+        respectively. The remaining parameters are expected to be
+        given as named arguments.
+
+        No response is set for a PHA data set, so `load_rmf` and
+        `load_arf` should be used before fitting it.
+
+        Examples
+        --------
+
+        Create a spectrum from the events with an energy between 0.5
+        and 7 keV (the ENERGY column is in eV):
+
+        >>> load_events('evt2.fits', energy=(500, 7000))
+        >>> load_rmf('src.rmf')
+        >>> load_arf('src.arf')
+
+        Create an image of part of the observation, using a bin size
+        of 2:
+
+        >>> load_events('img', 'evt2.fits', dstype=DataIMG, binsize=2,
+        ...             bounds=[(3800, 4300), (3900, 4400)])
+
+        """
+        if arg is None:
+            id, arg = arg, id
+        self.set_data(id, sherpa.astro.io.read_events(arg, dstype=dstype,
+                                                      **kwargs))
 
     # DOC-TODO: labelling as AstroPy HDUList; i.e. assuming conversion
     # from PyFITS lands soon.
@@ -4111,6 +4376,133 @@ class Session(sherpa.ui.utils.Session):
         self._save_type('delchi', id, filename, ascii=ascii, clobber=clobber,
                         bkg_id=bkg_id)
 
+    def save_multi_results(self, filename, ids=None, types=('model', 'resid'),
+                           bkg_id=None, format='fits', clobber=False):
+        """Save the results for several data sets to a single file.
+
+        The values are written out one data set at a time, so the
+        whole table does not have to be created in memory, which
+        makes this much faster than calling `save_model` or
+        `save_resid` for each data set when there are many of them.
+
+        .. versionadded:: 4.12.0
+
+        Parameters
+        ----------
+        filename : str
+           The name of the file to write the table to.
+        ids : sequence of int or str, optional
+           The data sets to include. If not given then all data sets
+           are used, as returned by `list_data_ids`.
+        types : sequence of str, optional
+           The values to write out, each of which is the name of a
+           plot type supported by ``get_<type>_plot`` (or
+           ``get_bkg_<type>_plot`` when `bkg_id` is set), such as
+           'data', 'model', 'source', 'resid', 'ratio', and 'delchi'.
+        bkg_id : int or str, optional
+           Set if the background values should be written out rather
+           than the source.
+        format : {'fits', 'npz', 'ascii'}, optional
+           The file format: a FITS binary table, a NumPy archive (as
+           created by `numpy.savez`), or a text file.
+        clobber : bool, optional
+           This flag controls whether an existing file can be
+           overwritten (``True``) or if it raises an exception
+           (``False``, the default setting).
+
+        Raises
+        ------
+        sherpa.utils.err.DataErr
+           If a data set contains image data, or the values for a data
+           set do not have the same size.
+        sherpa.utils.err.IOErr
+           If `filename` already exists and `clobber` is ``False``.
+
+        See Also
+        --------
+        save_model : Save the model values to a file.
+        save_resid : Save the residuals (data-model) to a file.
+
+        Notes
+        -----
+        The output contains the columns ``ID``, ``X``, and a column
+        for each element of `types`, in upper case (e.g. ``MODEL``).
+        For binned data sets ``X`` is the center of each bin. The
+        values respect any filter or (for PHA files) grouping
+        settings. The FITS output is always created directly, rather
+        than by the I/O backend.
+
+        Examples
+        --------
+
+        Write the model and residual values for all the data sets to
+        the file "results.fits":
+
+        >>> save_multi_results('results.fits')
+
+        Write the model values for data sets 1 to 3 to a NumPy archive:
+
+        >>> save_multi_results('results.npz', [1, 2, 3], types=['model'],
+        ...                    format='npz')
+
+        """
+        _check_type(filename, string_types, 'filename', 'a string')
+        clobber = sherpa.utils.bool_cast(clobber)
+        if ids is None:
+            ids = self.list_data_ids()
+
+        types = [str(objtype) for objtype in types]
+        funcname = 'get_'
+        if bkg_id is not None:
+            funcname += 'bkg_'
+
+        plotfuncs = []
+        for objtype in types:
+            plotfunc = getattr(self, funcname + objtype + '_plot', None)
+            if plotfunc is None:
+                raise AttributeError("'%s%s_plot()' not found" % (funcname,
+                                                                  objtype))
+            plotfuncs.append(plotfunc)
+
+        if all(isinstance(id, (int, numpy.integer)) for id in ids):
+            idtype = 'i8'
+        else:
+            idtype = 'S{}'.format(max([len(str(id)) for id in ids] + [1]))
+
+        names = ['ID', 'X'] + [objtype.upper() for objtype in types]
+        dtypes = [idtype, 'f8'] + ['f8'] * len(types)
+
+        with TableWriter(filename, names, dtypes, format=format,
+                         clobber=clobber) as tbl:
+            for id in ids:
+                d = self.get_data(id)
+                if isinstance(d, (sherpa.data.Data2D, sherpa.data.Data2DInt)):
+                    raise DataErr("save_multi_results() does not apply " +
+                                  "for images")
+
+                cols = []
+                x = None
+                for objtype, plotfunc in zip(types, plotfuncs):
+                    if bkg_id is None:
+                        obj = plotfunc(id)
+                    else:
+                        obj = plotfunc(id, bkg_id=bkg_id)
+
+                    if x is None:
+                        if getattr(obj, 'xlo', None) is not None:
+                            x = (numpy.asarray(obj.xlo) +
+                                 numpy.asarray(obj.xhi)) / 2.0
+                        else:
+                            x = numpy.asarray(obj.x)
+
+                    y = numpy.asarray(obj.y)
+                    if y.size != x.size:
+                        raise DataErr('mismatch', 'X', objtype.upper())
+
+                    cols.append(y)
+
+                tbl.write([str(id) if idtype[0] == 'S' else id, x] + cols)
+
     # DOC-NOTE: also in sherpa.utils with a different interface
     def save_filter(self, id, filename=None, bkg_id=None, ascii=True,
                     clobber=False):
@@ -5343,6 +5735,14 @@ class Session(sherpa.ui.utils.Session):
         to replace the 0 by the value 1e-10, which will also cause
         a warning message to be displayed.
 
+        The response is shared by all the data sets that read in the
+        same file, so its arrays are read only. Replace an array to
+        change it for just this data set - for example
+        `arf.specresp = arf.specresp * 0.9` rather than
+        `arf.specresp *= 0.9` - or set the `share_responses` setting
+        of the `ogip` section of the Sherpa configuration file to
+        False to give each data set its own copy.
+
         Examples
         --------
 
@@ -5427,6 +5827,14 @@ class Session(sherpa.ui.utils.Session):
         to replace the 0 by the value 1e-10, which will also cause
         a warning message to be displayed.
 
+        The response is shared by all the data sets that read in the
+        same file, so its arrays are read only. Replace an array to
+        change it for just this data set - for example
+        `arf.specresp = arf.specresp * 0.9` rather than
+        `arf.specresp *= 0.9` - or set the `share_responses` setting
+        of the `ogip` section of the Sherpa configuration file to
+        False to give each data set its own copy.
+
         Examples
         --------
 
@@ -5820,6 +6228,14 @@ class Session(sherpa.ui.utils.Session):
         to replace the 0 by the value 1e-10, which will also cause
         a warning message to be displayed.
 
+        The response is shared by all the data sets that read in the
+        same file, so its arrays are read only. Replace an array to
+        change it for just this data set - for example
+        `rmf.matrix = rmf.matrix * 0.9` rather than `rmf.matrix *= 0.9` -
+        or set the `share_responses` setting of the `ogip` section
+        of the Sherpa configuration file to False to give each data
+        set its own copy.
+
         Examples
         --------
 
@@ -5904,6 +6320,14 @@ class Session(sherpa.ui.utils.Session):
         to replace the 0 by the value 1e-10, which will also cause
         a warning message to be displayed.
 
+        The response is shared by all the data sets that read in the
+        same file, so its arrays are read only. Replace an array to
+        change it for just this data set - for example
+        `rmf.matrix = rmf.matrix * 0.9` rather than `rmf.matrix *= 0.9` -
+        or set the `share_responses` setting of the `ogip` section
+        of the Sherpa configuration file to False to give each data
+        set its own copy.
+
         Examples
         --------
 
@@ -8594,6 +9018,150 @@ class Session(sherpa.ui.utils.Session):
         >>> save_pha('sim', 'sim.pi')
 
         """
+        d = self._prepare_fake_pha(id, arf, rmf, exposure, backscal=backscal,
+                                   areascal=areascal, grouping=grouping,
+                                   grouped=grouped, quality=quality, bkg=bkg)
+
+        # Calculate the source model, and take a Poisson draw based on
+        # the source model.  That becomes the simulated data.
+        m = self.get_model(id)
+        d.counts = sherpa.utils.poisson_noise(d.eval_model(m))
+
+        # Add in background counts (see _fake_pha_background).
+        if bkg is not None:
+            b = self._fake_pha_background(d)
+            if b is not None:
+                d.counts = d.counts + sherpa.utils.poisson_noise(b)
+
+        d.name = 'faked'
+
+    def fake_pha_batch(self, id, arf, rmf, exposure, num, backscal=None,
+                       areascal=None, grouping=None, grouped=False,
+                       quality=None, bkg=None,
+                       method=sherpa.utils.poisson_noise):
+        """Simulate several PHA data sets from a model in one call.
+
+        This is a vectorized version of `fake_pha`: the data set is
+        set up in the same way, the source model is folded through
+        the response once, and ``num`` realisations are drawn from
+        the predicted counts.
+
+        .. versionadded:: 4.12.0
+
+        Parameters
+        ----------
+        id : int or str
+           The identifier for the data set to create. If it
+           already exists then it is assumed to contain a PHA
+           data set.
+        arf : filename or ARF object
+           The name of the ARF, or an ARF data object.
+        rmf : filename or RMF object
+           The name of the RMF, or an RMF data object.
+        exposure : number
+           The exposure time, in seconds.
+        num : int
+           The number of realisations to create.
+        backscal : number, optional
+           The 'BACKSCAL' value for the data set.
+        areascal : number, optional
+           The 'AREASCAL' value for the data set.
+        grouping : array, optional
+           The grouping array for the data (see `set_grouping`).
+        grouped : bool, optional
+           Should the simulated data be grouped (see `group`)?
+        quality : array, optional
+           The quality array for the data (see `set_quality`).
+        bkg : optional
+           If set to a PHA data object, then the counts from this data
+           set are scaled appropriately and a random realisation of
+           them is added to each simulated spectrum.
+        method : func, optional
+           The function used to create the random realisations. It
+           is sent an array of shape ``(num, nchan)`` and must return
+           an array of the same shape.
+
+        Returns
+        -------
+        sims : array
+           The simulated counts, as a ``(num, nchan)`` array, where
+           ``nchan`` is the number of channels in the RMF. The columns
+           are not grouped or filtered.
+
+        Raises
+        ------
+        sherpa.utils.err.ArgumentErr
+           If the data set already exists and does not contain PHA
+           data.
+
+        See Also
+        --------
+        fake_batch : Simulate several realisations of a data set.
+        fake_pha : Simulate a PHA data set from a model.
+
+        Notes
+        -----
+        The data set ``id`` is left set up with the first realisation
+        as its counts, so the remaining rows can be sent to `set_dep`
+        (or `DataPHA.counts`) one at a time in a refit loop.
+
+        Examples
+        --------
+        Create 10000 simulated spectra for a 5000 second observation:
+
+        >>> set_source(1, xsphabs.gal * xsapec.clus)
+        >>> sims = fake_pha_batch(1, 'src.arf', 'src.rmf', 5000, 10000)
+
+        """
+        if not _is_integer(num) or num < 1:
+            _argument_type_error('num', 'a positive integer')
+
+        d = self._prepare_fake_pha(id, arf, rmf, exposure, backscal=backscal,
+                                   areascal=areascal, grouping=grouping,
+                                   grouped=grouped, quality=quality, bkg=bkg)
+
+        m = self.get_model(id)
+        sims = _fake_batch(d.eval_model(m), num, method)
+
+        if bkg is not None:
+            b = self._fake_pha_background(d)
+            if b is not None:
+                sims += _fake_batch(b, num, method)
+
+        d.counts = sims[0].copy()
+        d.name = 'faked'
+        return sims
+
+    def _fake_pha_background(self, d):
+        """Return the average scaled background counts, or None."""
+
+        # Add in background counts:
+        #  -- Scale each background properly given data's
+        #     exposure time, BACKSCAL and AREASCAL
+        #  -- Take average of scaled backgrounds
+        #  -- Take a Poisson draw based on the average scaled background
+        #  -- Add that to the simulated data counts
+        #
+        # Adding background counts is OPTIONAL, only done if user sets
+        # "bkg" argument to fake_pha.  The reason is that the user could
+        # well set a "source" model that does include a background
+        # component.  In that case users should have the option to simulate
+        # WITHOUT background counts being added in.
+        nbkg = len(d.background_ids)
+        if nbkg == 0:
+            return None
+
+        b = 0
+        for bkg_id in d.background_ids:
+            b = b + d.get_background_scale() * \
+                d.get_background(bkg_id).counts
+
+        return b / nbkg
+
+    def _prepare_fake_pha(self, id, arf, rmf, exposure, backscal=None,
+                          areascal=None, grouping=None, grouped=False,
+                          quality=None, bkg=None):
+        """Set up the PHA data set used by fake_pha and fake_pha_batch."""
         d = sherpa.astro.data.DataPHA('', None, None)
         if id in self._data:
             d = self._get_pha_data(id)
@@ -8664,40 +9232,7 @@ class Session(sherpa.ui.utils.Session):
                 d.delete_background(bkg_id)
             self.set_bkg(id, bkg)
 
-        # Calculate the source model, and take a Poisson draw based on
-        # the source model.  That becomes the simulated data.
-        m = self.get_model(id)
-        d.counts = sherpa.utils.poisson_noise(d.eval_model(m))
-
-        # Add in background counts:
-        #  -- Scale each background properly given data's
-        #     exposure time, BACKSCAL and AREASCAL
-        #  -- Take average of scaled backgrounds
-        #  -- Take a Poisson draw based on the average scaled background
-        #  -- Add that to the simulated data counts
-        #
-        # Adding background counts is OPTIONAL, only done if user sets
-        # "bkg" argument to fake_pha.  The reason is that the user could
-        # well set a "source" model that does include a background
-        # component.  In that case users should have the option to simulate
-        # WITHOUT background counts being added in.
-        #
-        # If bkg is not None, then backgrounds were previously updated
-        # above, so it is OK to use "bkg is not None" as the condition
-        # here.
-        if bkg is not None:
-            nbkg = len(d.background_ids)
-            b = 0
-            for bkg_id in d.background_ids:
-                b = b + d.get_background_scale() * \
-                    d.get_background(bkg_id).counts
-
-            if (nbkg > 0):
-                b = b / nbkg
-                b_poisson = sherpa.utils.poisson_noise(b)
-                d.counts = d.counts + b_poisson
-
-        d.name = 'faked'
+        return d
 
     ###########################################################################
     # PSF
@@ -113,7 +113,14 @@ def bounds_check(lo, hi):
 _charge_e = 1.60217653e-09  # elementary charge [ergs] 1 keV, nist.gov
 
 
-def _flux(data, lo, hi, src, eflux=False, srcflux=False):
+def _flux_weights(data, lo, hi, eflux=False, srcflux=False):
+    """Return the grid, bin selection, and weights used by _flux.
+
+    The flux of a source model is the weighted sum
+    ``(src(*axislist)[idx] * weights).sum()``, so the weights only
+    have to be calculated once when the flux is evaluated for many
+    parameter values.
+    """
     lo, hi = bounds_check(lo, hi)
 
     axislist = None
@@ -122,10 +129,10 @@ def _flux(data, lo, hi, src, eflux=False, srcflux=False):
     else:
         axislist = data.get_indep(filter=False)
 
-    y = src(*axislist)
+    weights = numpy.ones(numpy.asarray(axislist[0]).size, SherpaFloat)
 
     if srcflux and len(axislist) > 1:
-        y /= numpy.asarray(axislist[1] - axislist[0])
+        weights /= numpy.asarray(axislist[1] - axislist[0])
 
     dim = numpy.asarray(axislist).squeeze().ndim
     if eflux:
@@ -138,27 +145,32 @@ def _flux(data, lo, hi, src, eflux=False, srcflux=False):
             energ.append(grid)
 
         if dim == 1:
-            y = numpy.asarray(0.5 * y * energ[0], SherpaFloat)
+            weights *= 0.5 * energ[0]
         elif dim == 2:
-            y = numpy.asarray(0.5 * y * (energ[0] + energ[1]),
-                              SherpaFloat)
+            weights *= 0.5 * (energ[0] + energ[1])
         else:
             raise IOErr('>axes', "2")
 
     mask = filter_bins((lo,), (hi,), (axislist[0],))
 
-    val = y.sum()
+    idx = slice(None)
     if mask is not None:
-        flux = y[mask]
+        idx = mask
         # flux density at a single bin -> divide by bin width.
-        if dim == 2 and len(flux) == 1:
-            flux /= numpy.abs(axislist[1][mask] - axislist[0][mask])
-        val = flux.sum()
+        if dim == 2 and mask.sum() == 1:
+            weights[mask] /= numpy.abs(axislist[1][mask] - axislist[0][mask])
 
     if eflux:
-        val *= _charge_e
+        weights *= _charge_e
 
-    return val
+    return axislist, idx, weights[idx]
+
+
+def _flux(data, lo, hi, src, eflux=False, srcflux=False):
+    axislist, idx, weights = _flux_weights(data, lo, hi, eflux=eflux,
+                                           srcflux=srcflux)
+    y = numpy.asarray(src(*axislist), SherpaFloat)
+    return numpy.dot(y[idx], weights)
 
 
 def _counts(data, lo, hi, func, *args):
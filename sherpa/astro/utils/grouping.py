@@ -0,0 +1,678 @@
+#
+#  Copyright (C) 2018  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+"""Dynamic grouping of PHA data.
+
+This module provides the grouping schemes of the CIAO group library,
+and is used by `sherpa.astro.data.DataPHA` when the ``group`` module
+is not installed. The routines have the same names and arguments as
+the ``group`` module, and return the grouping and quality arrays.
+
+Channels marked by the ``tabStops`` argument are not grouped (they
+have a grouping and quality of 0) and groups do not extend across
+them. Groups which do not meet the requested condition - for instance
+the last group when there are not enough counts left - are flagged
+with a quality of 2.
+
+The schemes use cumulative sums: a group ends at the first channel
+where the sum since the start of the group meets the condition, which
+is found with a binary search (``numpy.searchsorted``) for the count
+and Poisson signal-to-noise schemes, so the cost depends on the number
+of groups rather than the number of channels. The `group_spectra`
+routine groups many spectra at once, since each step of the search
+finds the next group of every spectrum.
+"""
+
+import logging
+
+import numpy
+
+__all__ = ('grpNumBins', 'grpBinWidth', 'grpNumCounts', 'grpSnr',
+           'grpAdaptive', 'grpAdaptiveSnr', 'group_spectra')
+
+warning = logging.getLogger(__name__).warning
+
+# The grouping and quality values
+GRP_BEGIN = 1
+GRP_MIDDLE = -1
+GRP_TABBED = 0
+QUAL_GOOD = 0
+QUAL_POOR = 2
+
+
+def _get_free(nchan, tabStops):
+    """Which channels can be grouped?"""
+    if tabStops is None:
+        return numpy.ones(nchan, dtype=bool)
+
+    tabs = numpy.asarray(tabStops)
+    if tabs.shape != (nchan,):
+        raise ValueError("tabStops must match the number of channels")
+
+    return ~tabs.astype(bool)
+
+
+def _get_maxlen(maxLength):
+    if maxLength is None or maxLength <= 0:
+        return None
+    return int(maxLength)
+
+
+def _cumsum(data):
+    """The cumulative sum, starting at 0, of data."""
+    out = numpy.zeros(len(data) + 1, dtype=numpy.float64)
+    numpy.cumsum(data, out=out[1:])
+    return out
+
+
+def _run_ends(free, breaks=None):
+    """The last channel of the run of free channels containing each channel.
+
+    Runs also end at the channels marked by breaks (used to separate
+    spectra which have been concatenated).
+    """
+    nchan = free.size
+    last = free.copy()
+    last[:-1] &= ~free[1:]
+    if breaks is not None:
+        last[breaks] = free[breaks]
+
+    ends = numpy.flatnonzero(last)
+    idx = numpy.searchsorted(ends, numpy.arange(nchan))
+    out = numpy.full(nchan, -1, dtype=numpy.int64)
+    ok = idx < ends.size
+    out[ok] = ends[idx[ok]]
+    return out
+
+
+def _next_free(free):
+    """The first free channel at or after each channel (size + 1 elements)."""
+    nchan = free.size
+    out = numpy.full(nchan + 1, nchan, dtype=numpy.int64)
+    idx = numpy.flatnonzero(free)
+    pos = numpy.searchsorted(idx, numpy.arange(nchan))
+    ok = pos < idx.size
+    out[:-1][ok] = idx[pos[ok]]
+    return out
+
+
+def _make_columns(nchan, free, starts, ends, good):
+    """Create the grouping and quality arrays for the groups.
+
+    The groups are given by their first and last channel (inclusive)
+    and whether they are good or not.
+    """
+    grouping = numpy.full(nchan, GRP_MIDDLE, dtype=numpy.int16)
+    grouping[~free] = GRP_TABBED
+    grouping[starts] = GRP_BEGIN
+
+    poor = ~numpy.asarray(good, dtype=bool)
+    delta = numpy.zeros(nchan + 1, dtype=numpy.int64)
+    numpy.add.at(delta, starts[poor], 1)
+    numpy.add.at(delta, ends[poor] + 1, -1)
+    quality = numpy.where(numpy.cumsum(delta[:-1]) > 0, QUAL_POOR,
+                          QUAL_GOOD).astype(numpy.int16)
+    return grouping, quality
+
+
+def _scan(test, start, stop):
+    """The first channel in start to stop (inclusive) that passes test.
+
+    The test is applied to increasingly-large blocks of channels, so
+    the cost scales with the size of the group. Returns the last
+    channel, and False, if no channel passes.
+    """
+    width = 16
+    lo = start
+    while lo <= stop:
+        hi = min(stop + 1, lo + width)
+        ok = test(start, numpy.arange(lo, hi))
+        if ok.any():
+            return lo + ok.argmax(), True
+        lo = hi
+        width *= 4
+
+    return stop, False
+
+
+def _sequential(data, free, limit, maxlen, row_starts=None, test=None):
+    """Group consecutive channels until the condition is met.
+
+    Parameters
+    ----------
+    data : array
+        The values to sum, which may be the concatenation of several
+        spectra.
+    free : array of bool
+        Which channels can be grouped.
+    limit : number
+        The value the sum of data over a group must reach (used when
+        test is None).
+    maxlen : int or None
+        The maximum number of channels in a group.
+    row_starts : array of int or None
+        The first channel of each spectrum, when data is the
+        concatenation of several spectra.
+    test : callable or None
+        If set, called with the first channel of a group and an
+        array of possible last channels, and returns whether the
+        group is complete. If None then the data must not be
+        negative.
+
+    Returns
+    -------
+    starts, ends, good : array
+        The first and last channels of each group, and whether it
+        meets the condition.
+    """
+    nchan = data.size
+    if row_starts is None:
+        row_starts = numpy.zeros(1, dtype=numpy.int64)
+        breaks = None
+    else:
+        row_starts = numpy.asarray(row_starts, dtype=numpy.int64)
+        breaks = row_starts[1:] - 1
+
+    row_stops = numpy.append(row_starts[1:], nchan)
+    run_end = _run_ends(free, breaks)
+    next_free = _next_free(free)
+    csum = _cumsum(data) if test is None else None
+
+    all_starts = []
+    all_ends = []
+    all_good = []
+
+    cur = next_free[row_starts]
+    active = cur < row_stops
+    cur = cur[active]
+    stops = row_stops[active]
+    while cur.size > 0:
+        cap = run_end[cur]
+        if maxlen is not None:
+            cap = numpy.minimum(cap, cur + maxlen - 1)
+
+        if test is None:
+            target = csum[cur] + limit
+            end = numpy.searchsorted(csum, target, side='left') - 1
+            end = numpy.clip(end, cur, cap)
+            good = csum[end + 1] >= target
+        else:
+            res = [_scan(test, s, c) for s, c in zip(cur, cap)]
+            end = numpy.asarray([r[0] for r in res], dtype=numpy.int64)
+            good = numpy.asarray([r[1] for r in res], dtype=bool)
+
+        all_starts.append(cur)
+        all_ends.append(end)
+        all_good.append(good)
+
+        cur = next_free[end + 1]
+        active = cur < stops
+        cur = cur[active]
+        stops = stops[active]
+
+    if not all_starts:
+        empty = numpy.zeros(0, dtype=numpy.int64)
+        return empty, empty, numpy.zeros(0, dtype=bool)
+
+    return (numpy.concatenate(all_starts), numpy.concatenate(all_ends),
+            numpy.concatenate(all_good))
+
+
+def _count_test(counts, numCounts):
+    """The minimum-counts condition for a group, when counts can be negative."""
+
+    csum = _cumsum(counts)
+
+    def test(start, ends):
+        return csum[ends + 1] - csum[start] >= numCounts
+
+    return test
+
+
+def _snr_test(counts, errors, snr):
+    """The signal-to-noise condition for a group."""
+
+    csum = _cumsum(counts)
+    vsum = _cumsum(numpy.asarray(errors, dtype=numpy.float64) ** 2)
+    snr2 = snr * snr
+
+    # start can be a scalar or an array matching ends
+    def test(start, ends):
+        signal = csum[ends + 1] - csum[start]
+        var = vsum[ends + 1] - vsum[start]
+        return (signal > 0) & (signal * signal >= snr2 * var)
+
+    return test
+
+
+def _check_errors(nchan, errorCol):
+    errors = numpy.asarray(errorCol, dtype=numpy.float64)
+    if errors.shape != (nchan,):
+        raise ValueError("errorCol must match the number of channels")
+
+    nzero = (errors == 0).sum()
+    if nzero > 0:
+        warning("The error column has %d zero-valued element(s)", nzero)
+
+    return errors
+
+
+def _width_groups(free, width):
+    """Split each run of free channels into groups of width channels."""
+
+    nchan = free.size
+    if width < 1:
+        raise ValueError("The group width must be at least 1")
+
+    # The position of each channel within its run of free channels
+    idx = numpy.arange(nchan)
+    start_run = free.copy()
+    start_run[1:] &= ~free[:-1]
+    run_start = numpy.maximum.accumulate(numpy.where(start_run, idx, 0))
+    pos = idx - run_start
+
+    run_end = _run_ends(free)
+    starts = numpy.flatnonzero(free & (pos % width == 0))
+    ends = numpy.minimum(starts + width - 1, run_end[starts])
+    good = (ends - starts + 1) == width
+    return starts, ends, good
+
+
+def grpNumBins(numChans, numBins, tabStops=None):
+    """Group the channels into a fixed number of groups.
+
+    Parameters
+    ----------
+    numChans : int
+        The number of channels.
+    numBins : int
+        The number of groups. Each group contains the same number of
+        channels (the number of channels which are not tab stops
+        divided by numBins).
+    tabStops : array or None, optional
+        Channels with a non-zero value are not grouped.
+
+    Returns
+    -------
+    grouping, quality : array of int16
+    """
+    numChans = int(numChans)
+    free = _get_free(numChans, tabStops)
+    if numBins < 1:
+        raise ValueError("The number of groups must be at least 1")
+
+    width = free.sum() // int(numBins)
+    if width < 1:
+        raise ValueError("There are more groups than channels")
+
+    return _make_columns(numChans, free, *_width_groups(free, width))
+
+
+def grpBinWidth(numChans, binWidth, tabStops=None):
+    """Group the channels into groups with a fixed number of channels.
+
+    Parameters
+    ----------
+    numChans : int
+        The number of channels.
+    binWidth : int
+        The number of channels in each group.
+    tabStops : array or None, optional
+        Channels with a non-zero value are not grouped.
+
+    Returns
+    -------
+    grouping, quality : array of int16
+    """
+    numChans = int(numChans)
+    free = _get_free(numChans, tabStops)
+    return _make_columns(numChans, free, *_width_groups(free, int(binWidth)))
+
+
+def grpNumCounts(countsArray, numCounts, maxLength=None, tabStops=None):
+    """Group the channels so each group has a minimum number of counts.
+
+    Parameters
+    ----------
+    countsArray : array
+        The counts in each channel.
+    numCounts : number
+        The minimum number of counts in each group.
+    maxLength : int or None, optional
+        The maximum number of channels in a group.
+    tabStops : array or None, optional
+        Channels with a non-zero value are not grouped.
+
+    Returns
+    -------
+    grouping, quality : array of int16
+    """
+    counts = numpy.asarray(countsArray, dtype=numpy.float64)
+    if numCounts <= 0:
+        raise ValueError("The number of counts must be positive")
+
+    free = _get_free(counts.size, tabStops)
+    maxlen = _get_maxlen(maxLength)
+    test = None
+    if (counts < 0).any():
+        test = _count_test(counts, numCounts)
+
+    groups = _sequential(counts, free, numCounts, maxlen, test=test)
+    return _make_columns(counts.size, free, *groups)
+
+
+def grpSnr(countsArray, snr, maxLength=None, tabStops=None, errorCol=None):
+    """Group the channels so each group has a minimum signal-to-noise ratio.
+
+    Parameters
+    ----------
+    countsArray : array
+        The counts in each channel.
+    snr : number
+        The minimum signal-to-noise ratio of each group.
+    maxLength : int or None, optional
+        The maximum number of channels in a group.
+    tabStops : array or None, optional
+        Channels with a non-zero value are not grouped.
+    errorCol : array or None, optional
+        The error for each channel. If not set then Poisson errors
+        are used, so the signal-to-noise ratio is the square root of
+        the number of counts.
+
+    Returns
+    -------
+    grouping, quality : array of int16
+    """
+    counts = numpy.asarray(countsArray, dtype=numpy.float64)
+    if snr <= 0:
+        raise ValueError("The signal-to-noise ratio must be positive")
+
+    if errorCol is None:
+        return grpNumCounts(counts, snr * snr, maxLength=maxLength,
+                            tabStops=tabStops)
+
+    errors = _check_errors(counts.size, errorCol)
+    free = _get_free(counts.size, tabStops)
+    test = _snr_test(counts, errors, snr)
+    groups = _sequential(counts, free, None, _get_maxlen(maxLength),
+                         test=test)
+    return _make_columns(counts.size, free, *groups)
+
+
+def _adaptive(counts, free, maxlen, window_ok, max_possible=None):
+    """Group the brightest parts of the spectrum first.
+
+    Groups of one channel are created first, then two channels, and
+    so on, from channels which have not already been grouped. The
+    remaining channels are placed in poor-quality groups.
+    """
+    nchan = counts.size
+    free = free.copy()
+    starts = []
+    ends = []
+    good = []
+
+    length = 1
+    while free.any():
+        if maxlen is not None and length > maxlen:
+            break
+
+        run_end = _run_ends(free)
+        runs = numpy.flatnonzero(free & numpy.append(True, ~free[:-1]))
+        longest = (run_end[runs] - runs + 1).max()
+        if length > longest:
+            break
+
+        if max_possible is not None and \
+           not max_possible(runs, run_end[runs]):
+            break
+
+        # The windows of length channels which only contain free
+        # channels and meet the condition.
+        fsum = _cumsum(free)
+        first = numpy.arange(nchan - length + 1)
+        valid = (fsum[first + length] - fsum[first]) == length
+        cands = first[valid]
+        cands = cands[window_ok(cands, length)]
+
+        # Select non-overlapping windows from the start.
+        pos = 0
+        while True:
+            idx = numpy.searchsorted(cands, pos)
+            if idx >= cands.size:
+                break
+            start = cands[idx]
+            starts.append(start)
+            ends.append(start + length - 1)
+            good.append(True)
+            free[start:start + length] = False
+            pos = start + length
+
+        length += 1
+
+    # The left-over channels are grouped, within each run, into
+    # groups of up to maxlen channels.
+    if free.any():
+        width = nchan if maxlen is None else maxlen
+        lstart, lend, _ = _width_groups(free, width)
+        starts.extend(lstart)
+        ends.extend(lend)
+        good.extend([False] * lstart.size)
+
+    starts = numpy.asarray(starts, dtype=numpy.int64)
+    ends = numpy.asarray(ends, dtype=numpy.int64)
+    good = numpy.asarray(good, dtype=bool)
+    return starts, ends, good
+
+
+def _run_test(csum, minCounts):
+    """Can any of the runs of free channels contain a group?"""
+
+    def test(runs, run_ends):
+        return (csum[run_ends + 1] - csum[runs] >= minCounts).any()
+
+    return test
+
+
+def grpAdaptive(countsArray, minCounts, maxLength=None, tabStops=None):
+    """Adaptively group the channels to a minimum number of counts.
+
+    Parameters
+    ----------
+    countsArray : array
+        The counts in each channel.
+    minCounts : number
+        The minimum number of counts in each group.
+    maxLength : int or None, optional
+        The maximum number of channels in a group.
+    tabStops : array or None, optional
+        Channels with a non-zero value are not grouped.
+
+    Returns
+    -------
+    grouping, quality : array of int16
+    """
+    counts = numpy.asarray(countsArray, dtype=numpy.float64)
+    if minCounts <= 0:
+        raise ValueError("The number of counts must be positive")
+
+    free = _get_free(counts.size, tabStops)
+    csum = _cumsum(counts)
+
+    def window_ok(first, length):
+        return csum[first + length] - csum[first] >= minCounts
+
+    # a group can not have more counts than the run containing it
+    max_possible = None
+    if (counts >= 0).all():
+        max_possible = _run_test(csum, minCounts)
+
+    groups = _adaptive(counts, free, _get_maxlen(maxLength), window_ok,
+                       max_possible)
+    return _make_columns(counts.size, free, *groups)
+
+
+def grpAdaptiveSnr(countsArray, snr, maxLength=None, tabStops=None,
+                   errorCol=None):
+    """Adaptively group the channels to a minimum signal-to-noise ratio.
+
+    Parameters
+    ----------
+    countsArray : array
+        The counts in each channel.
+    snr : number
+        The minimum signal-to-noise ratio of each group.
+    maxLength : int or None, optional
+        The maximum number of channels in a group.
+    tabStops : array or None, optional
+        Channels with a non-zero value are not grouped.
+    errorCol : array or None, optional
+        The error for each channel. If not set then Poisson errors
+        are used.
+
+    Returns
+    -------
+    grouping, quality : array of int16
+    """
+    counts = numpy.asarray(countsArray, dtype=numpy.float64)
+    if snr <= 0:
+        raise ValueError("The signal-to-noise ratio must be positive")
+
+    if errorCol is None:
+        return grpAdaptive(counts, snr * snr, maxLength=maxLength,
+                           tabStops=tabStops)
+
+    errors = _check_errors(counts.size, errorCol)
+    free = _get_free(counts.size, tabStops)
+    test = _snr_test(counts, errors, snr)
+
+    def window_ok(first, length):
+        return test(first, first + length - 1)
+
+    groups = _adaptive(counts, free, _get_maxlen(maxLength), window_ok)
+    return _make_columns(counts.size, free, *groups)
+
+
+_schemes = {'bins': grpNumBins,
+            'width': grpBinWidth,
+            'counts': grpNumCounts,
+            'snr': grpSnr,
+            'adapt': grpAdaptive,
+            'adapt_snr': grpAdaptiveSnr}
+
+
+def group_spectra(scheme, spectra, value, maxLength=None, tabStops=None,
+                  errorCol=None):
+    """Group several spectra with the same scheme.
+
+    Parameters
+    ----------
+    scheme : {'counts', 'snr', 'adapt', 'adapt_snr', 'bins', 'width'}
+        The grouping scheme, which matches the `DataPHA` method
+        of the same name (e.g. 'counts' for `group_counts`).
+    spectra : sequence of arrays
+        The counts for each spectrum. The spectra do not need to have
+        the same number of channels.
+    value : number
+        The parameter of the scheme: the minimum number of counts,
+        the signal-to-noise ratio, the number of groups, or the group
+        width.
+    maxLength : int or None, optional
+        The maximum number of channels in a group. It is not used
+        for the 'bins' and 'width' schemes.
+    tabStops : sequence of arrays or None, optional
+        The tab stops for each spectrum.
+    errorCol : sequence of arrays or None, optional
+        The errors for each spectrum ('snr' and 'adapt_snr' only).
+
+    Returns
+    -------
+    groups : list of (grouping, quality)
+        The grouping and quality arrays for each spectrum.
+
+    Notes
+    -----
+    The 'counts' scheme, and the 'snr' scheme without errorCol, are
+    calculated for all the spectra at once. The other schemes are
+    applied to each spectrum in turn.
+
+    Examples
+    --------
+
+    >>> groups = group_spectra('counts', [pha.counts for pha in phas], 20)
+    >>> for pha, (grp, qual) in zip(phas, groups):
+    ...     pha.grouping = grp
+    ...     pha.quality = qual
+    ...     pha.group()
+
+    """
+    try:
+        func = _schemes[scheme]
+    except KeyError:
+        raise ValueError("unknown grouping scheme: '{}'".format(scheme))
+
+    spectra = [numpy.asarray(s, dtype=numpy.float64) for s in spectra]
+    nspec = len(spectra)
+    if tabStops is None:
+        tabStops = [None] * nspec
+    if errorCol is None:
+        errorCol = [None] * nspec
+    if len(tabStops) != nspec or len(errorCol) != nspec:
+        raise ValueError("tabStops and errorCol must match the spectra")
+
+    if nspec == 0:
+        return []
+
+    limit = None
+    if scheme == 'counts':
+        limit = value
+    elif scheme == 'snr' and all(e is None for e in errorCol) and value > 0:
+        limit = value * value
+
+    negative = any((s < 0).any() for s in spectra)
+    if limit is None or negative:
+        out = []
+        for counts, tabs, errs in zip(spectra, tabStops, errorCol):
+            if scheme in ('bins', 'width'):
+                out.append(func(counts.size, value, tabStops=tabs))
+            elif scheme in ('snr', 'adapt_snr'):
+                out.append(func(counts, value, maxLength=maxLength,
+                                tabStops=tabs, errorCol=errs))
+            else:
+                out.append(func(counts, value, maxLength=maxLength,
+                                tabStops=tabs))
+        return out
+
+    if limit <= 0:
+        raise ValueError("The number of counts must be positive")
+
+    # Concatenate the spectra and find the groups for all of them.
+    sizes = numpy.asarray([s.size for s in spectra], dtype=numpy.int64)
+    row_starts = numpy.append(0, numpy.cumsum(sizes)[:-1])
+    data = numpy.concatenate(spectra)
+    free = numpy.concatenate([_get_free(s.size, t)
+                              for s, t in zip(spectra, tabStops)])
+
+    groups = _sequential(data, free, limit, _get_maxlen(maxLength),
+                         row_starts)
+    grouping, quality = _make_columns(data.size, free, *groups)
+
+    bounds = numpy.append(row_starts, data.size)
+    return [(grouping[lo:hi], quality[lo:hi])
+            for lo, hi in zip(bounds[:-1], bounds[1:])]
@@ -0,0 +1,249 @@
+#
+#  Copyright (C) 2018  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+"""Evaluate the pileup model of Davis (2001).
+
+This is a re-implementation of the `sherpa.astro.utils.apply_pileup`
+routine, which separates the parts of the calculation that do not
+depend on the model parameters - the fine energy grid, the effective
+area on this grid, and the rebinning to the ARF grid - so that they
+are calculated once, by `PileupKernel`, rather than on each call.
+The multi-photon terms are calculated with real FFTs, and the series
+is stopped once the probability of the remaining terms is smaller
+than a tolerance.
+"""
+
+import numpy
+
+from sherpa.utils import SherpaFloat
+from .response import SparseResponse
+
+__all__ = ('PileupKernel', )
+
+
+# The maximum number of terms supported by apply_pileup
+MAX_NUM_TERMS = 30
+
+# The fine energy grid used for the calculation, which covers 0 to
+# 15 keV.
+_num_points = 1024 * 4
+_max_energy = 15.0
+
+
+def _fine_grid():
+    """The energy grid used to evaluate the pileup."""
+    de = _max_energy / _num_points
+    energies = numpy.arange(_num_points) * de
+    energies[0] = 0.0001
+
+    ehi = numpy.append(energies[:-1], energies[-1] + de)
+    elo = numpy.append(energies[0] / 2.0 if de >= energies[0]
+                       else energies[0], ehi[:-1])
+    return energies, elo, ehi
+
+
+def _rebin_response(flo, fhi, tlo, thi):
+    """The matrix that integrates the (flo, fhi) bins onto (tlo, thi)."""
+
+    nt = len(tlo)
+    first = numpy.searchsorted(fhi, tlo, side='left')
+    last = numpy.searchsorted(flo, thi, side='right')
+    count = numpy.maximum(last - first, 0)
+
+    rows = numpy.repeat(numpy.arange(nt), count)
+    start = numpy.cumsum(count) - count
+    cols = numpy.repeat(first - start, count) + numpy.arange(count.sum())
+
+    f0 = flo[cols]
+    f1 = fhi[cols]
+    overlap = numpy.minimum(thi[rows], f1) - numpy.maximum(tlo[rows], f0)
+    data = overlap / (f1 - f0)
+
+    order = numpy.argsort(cols, kind='mergesort')
+    indptr = numpy.zeros(len(flo) + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(cols, minlength=len(flo)), out=indptr[1:])
+    return SparseResponse(indptr, rows[order], data[order], nt)
+
+
+class PileupKernel(object):
+    """The parameter-independent parts of the pileup calculation.
+
+    Parameters
+    ----------
+    exposure_time : number
+        The exposure time of the observation.
+    energ_lo, energ_hi : array
+        The energy grid of the ARF.
+    specresp : array
+        The effective area.
+    fracexpo : number
+        The fractional exposure of the ARF.
+    frame_time : number
+        The frame time.
+    nbins : int or None, optional
+        The number of bins of the output grid, which is the start of
+        the ARF grid. If None then the whole ARF grid is used.
+    tol : number, optional
+        The series of multi-photon terms is stopped when the
+        probability that more photons are involved is below this
+        value.
+
+    See Also
+    --------
+    sherpa.astro.models.JDPileup
+    """
+
+    def __init__(self, exposure_time, energ_lo, energ_hi, specresp,
+                 fracexpo, frame_time, nbins=None, tol=1e-5):
+        self._key = (energ_lo, energ_hi, specresp, nbins)
+        if nbins is None:
+            nbins = len(energ_lo)
+
+        energ_lo = numpy.asarray(energ_lo, dtype=SherpaFloat)[:nbins]
+        energ_hi = numpy.asarray(energ_hi, dtype=SherpaFloat)[:nbins]
+        specresp = numpy.asarray(specresp, dtype=SherpaFloat)[:nbins]
+        if exposure_time <= 0.0 or frame_time <= 0.0 or \
+           fracexpo < 0.0 or fracexpo > 1.0 or nbins < 1 or \
+           energ_lo.size != nbins or energ_hi.size != nbins or \
+           specresp.size != nbins:
+            raise ValueError("invalid pileup parameters")
+
+        self.exposure_time = exposure_time
+        self.fracexpo = fracexpo
+        self.frame_time = frame_time
+        self.tol = tol
+        self.num_frames = exposure_time / frame_time
+
+        energies, self.elo, self.ehi = _fine_grid()
+
+        # The effective area (times the frame time) on the fine grid.
+        idx = numpy.searchsorted(energ_lo, energies, side='right') - 1
+        idx = numpy.clip(idx, 0, energ_lo.size - 1)
+        arf_time = specresp[idx] * frame_time
+        outside = (energies >= energ_hi[-1]) | (energies < energ_lo[0])
+        arf_time[outside] = 0.0
+        arf_time[0] = 0.0
+        self.arf_time = numpy.clip(arf_time, 0, None)
+
+        self.rebin = _rebin_response(self.elo, self.ehi, energ_lo, energ_hi)
+
+    def is_for(self, exposure_time, energ_lo, energ_hi, specresp,
+               fracexpo, frame_time, nbins=None):
+        """Can the kernel be used for these settings?
+
+        The arrays are compared by identity, not value.
+        """
+        lo, hi, rsp, num = self._key
+        return exposure_time == self.exposure_time and \
+            fracexpo == self.fracexpo and frame_time == self.frame_time and \
+            energ_lo is lo and energ_hi is hi and specresp is rsp and \
+            nbins == num
+
+    def calc(self, model, alpha, g0, num_regions, psf_frac,
+                 max_num_terms):
+        """Calculate the piled-up spectrum.
+
+        Parameters
+        ----------
+        model : callable
+            The source model, which is called with the low and high
+            edges of the fine energy grid.
+        alpha, g0, num_regions, psf_frac : number
+            The grade-migration parameter, the grade correction for
+            single-photon events, the number of regions, and the
+            fraction of flux in the central region.
+        max_num_terms : int
+            The maximum number of photons considered for pileup.
+
+        Returns
+        -------
+        vals, pileup_fractions, integral_ae, num_terms
+            As returned by `sherpa.astro.utils.apply_pileup`: the
+            spectrum on the ARF grid, the fraction of events with
+            each number of photons, the integrated counts per frame,
+            and the number of terms used.
+        """
+        max_num_terms = int(max_num_terms)
+        if max_num_terms < 1 or max_num_terms > MAX_NUM_TERMS or \
+           alpha < 0.0 or alpha > 1.0 or g0 <= 0.0 or g0 > 1.0 or \
+           num_regions <= 0.0 or psf_frac < 0.0 or psf_frac > 1.0:
+            raise ValueError("invalid pileup parameters")
+
+        s_den = numpy.asarray(model(self.elo, self.ehi), dtype=SherpaFloat)
+        if s_den.shape != self.elo.shape:
+            raise TypeError("model evaluation failed")
+
+        arf_s = numpy.clip(self.arf_time * s_den, 0, None)
+        results, fractions, integral_ae, num_terms = \
+            self._pileup(arf_s, alpha, g0, num_regions, psf_frac,
+                         max_num_terms)
+
+        other = 1.0 - psf_frac
+        if other > 0.0:
+            results += arf_s * (other * self.num_frames)
+
+        return (self.rebin.fold(results), fractions, integral_ae,
+                num_terms)
+
+    def _pileup(self, arf_s, alpha, g0, num_regions, psf_frac,
+                max_num_terms):
+        """The piled-up spectrum on the fine grid."""
+
+        fractions = numpy.zeros(max_num_terms + 1, dtype=SherpaFloat)
+
+        frac = psf_frac / num_regions
+        if self.fracexpo > 0:
+            frac /= self.fracexpo
+
+        results = arf_s * frac
+        integ = results.sum()
+        fractions[1] = integ
+        integral_ae = integ / g0
+        num_terms = max_num_terms
+        if integ == 0.0:
+            return results, fractions, integral_ae, num_terms
+
+        # Normalize to avoid possible floating-point overflow.
+        term = results / integ
+        nfft = 2 * term.size
+        fft_s = numpy.fft.rfft(term, nfft)
+
+        cutoff = (1.0 - self.tol) * numpy.exp(integ)
+        norm = integ
+        total_prob = 1.0 + integ
+        for i in range(2, max_num_terms + 1):
+            norm *= integ / i
+            total_prob += norm
+
+            # The convolution is truncated to the fine grid, so the
+            # wrap-around of the circular convolution is not included.
+            term = numpy.fft.irfft(numpy.fft.rfft(term, nfft) * fft_s,
+                                   nfft)[:term.size]
+
+            scale = norm * alpha ** (i - 1)
+            results += scale * term
+            fractions[i] = scale
+
+            if total_prob > cutoff:
+                num_terms = i
+                break
+
+        results *= numpy.exp(-integral_ae) * self.num_frames * \
+            num_regions * self.fracexpo
+        return results, fractions, integral_ae, num_terms
@@ -0,0 +1,572 @@
+#
+#  Copyright (C) 2018  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+"""Sparse representations of instrument responses.
+
+The OGIP RMF format stores the response as a set of channel groups
+for each energy bin (the N_GRP, F_CHAN, N_CHAN, and MATRIX columns).
+The `SparseResponse` class converts this to compressed sparse column
+(CSC) form, with one column per energy bin, so that the fold is a
+sparse matrix-vector product which can be split up by energy across
+threads, and which can fold many spectra in a single pass.
+
+The `ResponseFilterCache` class memoizes the filtered RMF arrays (and
+their sparse form) for each set of noticed channels, so that
+re-applying a filter does not re-process the full matrix.
+
+The `interval_response` and `stack_responses` routines create the
+operators used to fold a model, evaluated once on a common energy
+grid, through several responses (e.g. the grating orders of a
+PHA dataset) with two sparse products.
+"""
+
+import threading
+
+import numpy
+
+from sherpa.utils import SherpaFloat, _ncpus
+from ._utils import csc_fold
+
+__all__ = ('rmf_to_csc', 'SparseResponse', 'filter_rmf_groups',
+           'ResponseFilterCache', 'interval_response', 'stack_responses')
+
+
+# The index type used by the csc_fold extension (an unsigned int).
+_csc_index = numpy.uintc
+
+# Responses with fewer non-zero elements than this are folded by a
+# single thread, since the cost of starting the threads would be
+# larger than the time saved.
+_min_nnz_threaded = 1 << 20
+
+
+def _invalid_rmf():
+    return ValueError("RMF data is invalid or inconsistent")
+
+
+def _rmf_groups(n_grp, f_chan, n_chan, matrix, offset, error):
+    """Validate the RMF columns and return them as flat arrays.
+
+    The returned arrays are restricted to the groups, and matrix
+    elements, that are referenced by n_grp.
+    """
+
+    n_grp = numpy.asarray(n_grp, dtype=numpy.int64).ravel()
+    f_chan = numpy.asarray(f_chan, dtype=numpy.int64).ravel()
+    n_chan = numpy.asarray(n_chan, dtype=numpy.int64).ravel()
+    matrix = numpy.asarray(matrix, dtype=SherpaFloat).ravel()
+
+    ngroups = n_grp.sum()
+    if ngroups > f_chan.size or ngroups > n_chan.size or \
+       (n_grp < 0).any():
+        raise error()
+
+    f_chan = f_chan[:ngroups]
+    n_chan = n_chan[:ngroups]
+    if (f_chan < offset).any() or (n_chan < 0).any() or \
+       n_chan.sum() > matrix.size:
+        raise error()
+
+    return n_grp, f_chan, n_chan, matrix[:n_chan.sum()]
+
+
+def rmf_to_csc(n_grp, f_chan, n_chan, matrix, detchans, offset=1):
+    """Convert the OGIP RMF columns to compressed sparse column form.
+
+    Parameters
+    ----------
+    n_grp, f_chan, n_chan, matrix : array
+        The N_GRP, F_CHAN, N_CHAN, and MATRIX columns of the RMF.
+        The matrix values are given as a 1D array, in the order
+        they are used by the channel groups.
+    detchans : int
+        The number of channels.
+    offset : int, optional
+        The number of the first channel.
+
+    Returns
+    -------
+    indptr, indices, data : array
+        The CSC representation of the matrix, with one column per
+        energy bin and one row per channel (numbered from 0).
+        Elements equal to zero are dropped.
+
+    Raises
+    ------
+    ValueError
+        If the arrays are inconsistent (e.g. a group extends past
+        the last channel).
+    """
+
+    if numpy.size(f_chan) != numpy.size(n_chan):
+        raise _invalid_rmf()
+
+    n_grp, f_chan, n_chan, matrix = _rmf_groups(n_grp, f_chan, n_chan,
+                                                matrix, offset,
+                                                _invalid_rmf)
+    detchans = int(detchans)
+    f_chan = f_chan - offset
+    nelem = n_chan.sum()
+    if (f_chan + n_chan > detchans).any():
+        raise _invalid_rmf()
+
+    # The energy bin and channel number of each matrix element; the
+    # elements are already ordered by energy.
+    group_energy = numpy.repeat(numpy.arange(n_grp.size), n_grp)
+    energy = numpy.repeat(group_energy, n_chan)
+    start = numpy.cumsum(n_chan) - n_chan
+    chans = numpy.repeat(f_chan - start, n_chan) + numpy.arange(nelem)
+    data = matrix
+
+    keep = data != 0
+    indptr = numpy.zeros(n_grp.size + 1, dtype=_csc_index)
+    numpy.cumsum(numpy.bincount(energy[keep], minlength=n_grp.size),
+                 out=indptr[1:])
+
+    return (indptr, chans[keep].astype(_csc_index),
+            numpy.ascontiguousarray(data[keep]))
+
+
+class SparseResponse(object):
+    """A response matrix stored in compressed sparse column form.
+
+    Parameters
+    ----------
+    indptr, indices, data : array
+        The CSC representation of the matrix, with one column per
+        energy bin and one row per channel.
+    nchan : int
+        The number of channels (rows).
+    numthreads : int or None, optional
+        The maximum number of threads to use when folding. If None
+        then the number of CPUs is used.
+
+    See Also
+    --------
+    rmf_to_csc
+    """
+
+    def __init__(self, indptr, indices, data, nchan, numthreads=None):
+        self.indptr = numpy.ascontiguousarray(indptr, dtype=_csc_index)
+        self.indices = numpy.ascontiguousarray(indices, dtype=_csc_index)
+        self.data = numpy.ascontiguousarray(data, dtype=SherpaFloat)
+        self.nchan = int(nchan)
+        self.numthreads = numthreads
+        self._key = None
+
+    @classmethod
+    def from_rmf(cls, rmf, numthreads=None):
+        """Create the sparse form of the current (filtered) RMF matrix."""
+        indptr, indices, data = rmf_to_csc(rmf._grp, rmf._fch, rmf._nch,
+                                           rmf._rsp, rmf.detchans,
+                                           rmf.offset)
+        out = cls(indptr, indices, data, rmf.detchans,
+                  numthreads=numthreads)
+        out._key = (rmf._grp, rmf._fch, rmf._nch, rmf._rsp, rmf.detchans,
+                    rmf.offset)
+        return out
+
+    def is_from(self, rmf):
+        """Is this the sparse form of the current RMF matrix?"""
+        if self._key is None:
+            return False
+
+        grp, fch, nch, rsp, detchans, offset = self._key
+        return grp is rmf._grp and fch is rmf._fch and \
+            nch is rmf._nch and rsp is rmf._rsp and \
+            detchans == rmf.detchans and offset == rmf.offset
+
+    def scale(self, weights):
+        """Return the response with each energy bin multiplied by weights.
+
+        This is used to combine an ARF with the RMF, so that a single
+        fold applies both.
+
+        Parameters
+        ----------
+        weights : array
+            The scaling for each energy bin (column).
+
+        Returns
+        -------
+        rsp : SparseResponse instance
+            The scaled response, which shares the index arrays with
+            this object.
+        """
+        weights = numpy.asarray(weights, dtype=SherpaFloat)
+        if weights.shape != (self.nenergy,):
+            raise TypeError("Mismatched weights and response sizes: " +
+                            "{} vs {}".format(weights.size, self.nenergy))
+
+        counts = numpy.diff(self.indptr.astype(numpy.int64))
+        data = self.data * numpy.repeat(weights, counts)
+        return SparseResponse(self.indptr, self.indices, data, self.nchan,
+                              numthreads=self.numthreads)
+
+    @property
+    def nenergy(self):
+        """The number of energy bins (columns)."""
+        return self.indptr.size - 1
+
+    @property
+    def nnz(self):
+        """The number of stored elements."""
+        return self.data.size
+
+    def _blocks(self, nsrc):
+        """Split the energy bins into blocks containing similar work."""
+        nthreads = self.numthreads
+        if nthreads is None:
+            nthreads = _ncpus
+        nthreads = int(nthreads or 1)
+        if nthreads < 2 or self.nnz * nsrc < _min_nnz_threaded:
+            return [(0, self.nenergy)]
+
+        nthreads = min(nthreads, self.nenergy)
+        targets = numpy.linspace(0, self.nnz, nthreads + 1)[1:-1]
+        edges = numpy.searchsorted(self.indptr, targets)
+        edges = numpy.unique(numpy.concatenate(([0], edges,
+                                                [self.nenergy])))
+        return [(int(start), int(end))
+                for start, end in zip(edges[:-1], edges[1:])]
+
+    def fold(self, src):
+        """Fold one or more spectra through the response.
+
+        Parameters
+        ----------
+        src : array
+            The model values for each energy bin, either as a 1D array
+            of nenergy elements or a 2D array of shape (n, nenergy).
+
+        Returns
+        -------
+        counts : array
+            The predicted counts per channel, with shape (nchan,) or
+            (n, nchan).
+        """
+        src = numpy.asarray(src, dtype=SherpaFloat)
+        if src.ndim not in (1, 2) or src.shape[-1] != self.nenergy:
+            raise TypeError("Mismatched source and response sizes: " +
+                            "{} vs {}".format(src.shape[-1], self.nenergy))
+
+        if src.ndim == 1:
+            nsrc = 1
+            flat = numpy.ascontiguousarray(src)
+        else:
+            nsrc = src.shape[0]
+            if nsrc == 0:
+                return numpy.zeros((0, self.nchan), dtype=SherpaFloat)
+
+            # the spectra must vary fastest
+            flat = numpy.ascontiguousarray(src.T).ravel()
+
+        args = (self.indptr, self.indices, self.data, flat, nsrc,
+                self.nchan)
+        blocks = self._blocks(nsrc)
+        if len(blocks) == 1:
+            counts = csc_fold(*(args + blocks[0]))
+        else:
+            results = [None] * len(blocks)
+            errors = []
+
+            def worker(idx, start, end):
+                try:
+                    results[idx] = csc_fold(*(args + (start, end)))
+                except Exception as exc:
+                    errors.append(exc)
+
+            # csc_fold releases the GIL, so the blocks are folded in
+            # parallel, each into its own output array.
+            threads = [threading.Thread(target=worker,
+                                        args=(idx, start, end))
+                       for idx, (start, end) in enumerate(blocks)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            if errors:
+                raise errors[0]
+
+            counts = numpy.sum(results, axis=0)
+
+        if src.ndim == 1:
+            return counts
+
+        return counts.reshape(self.nchan, nsrc).T.copy()
+
+
+def interval_response(lo_idx, hi_idx, nenergy, weights=None):
+    """Represent a sum over index intervals as a sparse matrix.
+
+    This is the matrix form of `sherpa.utils.sum_intervals`: row i
+    of the output is the sum of the input values from ``lo_idx[i]``
+    to ``hi_idx[i]`` inclusive, multiplied by ``weights[i]``.
+
+    Parameters
+    ----------
+    lo_idx, hi_idx : array of int
+        The first and last index of each interval.
+    nenergy : int
+        The number of elements in the input array.
+    weights : array or None, optional
+        The scaling for each interval (e.g. the effective area).
+
+    Returns
+    -------
+    rsp : SparseResponse instance
+        The operator, with one row per interval.
+
+    Raises
+    ------
+    ValueError
+        If an interval is invalid.
+    """
+
+    lo_idx = numpy.asarray(lo_idx, dtype=numpy.int64).ravel()
+    hi_idx = numpy.asarray(hi_idx, dtype=numpy.int64).ravel()
+    nenergy = int(nenergy)
+    if lo_idx.shape != hi_idx.shape or (lo_idx > hi_idx).any() or \
+       (lo_idx < 0).any() or (hi_idx >= nenergy).any():
+        raise ValueError("sum_intervals")
+
+    if weights is None:
+        weights = numpy.ones(lo_idx.size, dtype=SherpaFloat)
+    else:
+        weights = numpy.asarray(weights, dtype=SherpaFloat).ravel()
+        if weights.size != lo_idx.size:
+            raise ValueError("sum_intervals")
+
+    width = hi_idx - lo_idx + 1
+    rows = numpy.repeat(numpy.arange(lo_idx.size), width)
+    start = numpy.cumsum(width) - width
+    cols = numpy.repeat(lo_idx - start, width) + numpy.arange(width.sum())
+
+    order = numpy.argsort(cols, kind='mergesort')
+    indptr = numpy.zeros(nenergy + 1, dtype=_csc_index)
+    numpy.cumsum(numpy.bincount(cols, minlength=nenergy), out=indptr[1:])
+    return SparseResponse(indptr, rows[order], weights[rows[order]],
+                          lo_idx.size)
+
+
+def stack_responses(responses, offsets, nchan):
+    """Combine responses so that they can be applied in one fold.
+
+    The columns of the responses are concatenated, and the rows of
+    each response are shifted by the given offset, so that folding
+    the concatenated input arrays returns the output of each
+    response in its own (or a shared) part of the output.
+
+    Parameters
+    ----------
+    responses : sequence of SparseResponse
+        The responses.
+    offsets : sequence of int
+        The first output row for each response.
+    nchan : int
+        The number of rows in the combined response.
+
+    Returns
+    -------
+    rsp : SparseResponse instance
+    """
+
+    if len(responses) != len(offsets):
+        raise TypeError("Mismatched responses and offsets")
+
+    for rsp, offset in zip(responses, offsets):
+        if offset < 0 or offset + rsp.nchan > nchan:
+            raise TypeError("response does not fit in {} ".format(nchan) +
+                            "channels")
+
+    starts = numpy.cumsum([0] + [rsp.nnz for rsp in responses])
+    indptr = numpy.concatenate([[0]] +
+                               [rsp.indptr[1:].astype(numpy.int64) + start
+                                for rsp, start in zip(responses, starts)])
+    indices = numpy.concatenate([[]] +
+                                [rsp.indices.astype(numpy.int64) + offset
+                                 for rsp, offset in zip(responses, offsets)])
+    data = numpy.concatenate([[]] + [rsp.data for rsp in responses])
+    return SparseResponse(indptr, indices, data, nchan)
+
+
+def _filter_failed():
+    return TypeError("response filter failed")
+
+
+def filter_rmf_groups(noticed_chans, n_grp, f_chan, n_chan, matrix,
+                      offset=1):
+    """Filter the RMF columns to the groups that overlap the channels.
+
+    This is a vectorized version of `sherpa.astro.utils.filter_resp`,
+    which returns the same arrays, along with the per-group selection.
+    A channel group is kept, in full, if any of the channels from its
+    first channel to the first channel plus the number of channels
+    are noticed.
+
+    Parameters
+    ----------
+    noticed_chans : array
+        The noticed channel numbers.
+    n_grp, f_chan, n_chan, matrix : array
+        The N_GRP, F_CHAN, N_CHAN, and MATRIX columns of the RMF.
+    offset : int, optional
+        The number of the first channel.
+
+    Returns
+    -------
+    n_grp, f_chan, n_chan, matrix, bin_mask, keep : array
+        The filtered columns, the mask of energy bins that contain
+        at least one selected group, and the mask of selected groups.
+
+    Raises
+    ------
+    ValueError
+        If there are no noticed channels.
+    TypeError
+        If the RMF arrays are inconsistent.
+    """
+
+    chans = numpy.unique(numpy.asarray(noticed_chans, dtype=numpy.int64))
+    if chans.size == 0:
+        raise ValueError("There are no noticed channels")
+
+    n_grp, f_chan, n_chan, matrix = _rmf_groups(n_grp, f_chan, n_chan,
+                                                matrix, offset,
+                                                _filter_failed)
+
+    # if f_chan values are indices, convert to channels
+    lo = f_chan + 1 if offset == 0 else f_chan
+    hi = lo + n_chan
+    keep = numpy.searchsorted(chans, hi, side='right') > \
+        numpy.searchsorted(chans, lo, side='left')
+
+    rows = numpy.repeat(numpy.arange(n_grp.size), n_grp)[keep]
+    bin_mask = numpy.zeros(n_grp.size, dtype=bool)
+    bin_mask[rows] = True
+    grp = numpy.bincount(rows, minlength=n_grp.size)[bin_mask]
+
+    return (grp.astype(_csc_index), f_chan[keep].astype(_csc_index),
+            n_chan[keep].astype(_csc_index),
+            matrix[numpy.repeat(keep, n_chan)], bin_mask, keep)
+
+
+class ResponseFilterCache(object):
+    """Memoize the filtered arrays, and sparse forms, of a RMF.
+
+    The filtered RMF columns are stored for the most-recently used
+    sets of noticed channels. When a new set of channels selects
+    the same channel groups as a stored set - which is common, since
+    groups are kept in full - the stored arrays are re-used. The
+    sparse forms of the filtered matrices are also stored, so that
+    re-creating a filtered view of the RMF does not need a new
+    conversion.
+
+    Parameters
+    ----------
+    rmf : sherpa.astro.data.DataRMF instance
+        The (unfiltered) RMF.
+    size : int, optional
+        The maximum number of sets to store.
+    """
+
+    def __init__(self, rmf, size=8):
+        self.size = size
+        self._key = None
+        self._entries = []
+        self._sparse = []
+        self._check(rmf)
+
+    def _check(self, rmf):
+        """Clear the cache if the RMF columns have been changed."""
+        key = (rmf.n_grp, rmf.f_chan, rmf.n_chan, rmf.matrix, rmf.offset)
+        if self._key is not None and \
+           all(a is b for a, b in zip(key, self._key)):
+            return
+
+        self._key = key
+        self._entries = []
+        self._sparse = []
+
+    def filter(self, rmf, noticed_chans):
+        """Return the filtered RMF columns for these channels.
+
+        Parameters
+        ----------
+        rmf : sherpa.astro.data.DataRMF instance
+            The RMF; the unfiltered columns (``n_grp``, ``f_chan``,
+            ``n_chan``, and ``matrix``) are used.
+        noticed_chans : array
+            The noticed channels.
+
+        Returns
+        -------
+        n_grp, f_chan, n_chan, matrix, bin_mask : array
+            The filtered columns and the mask of the selected energy
+            bins, as returned by `sherpa.astro.utils.filter_resp`.
+            The arrays must not be changed.
+        """
+        self._check(rmf)
+        chans = numpy.asarray(noticed_chans)
+        for entry in self._entries:
+            if numpy.array_equal(entry[0], chans):
+                self._touch(self._entries, entry)
+                return entry[2]
+
+        out = filter_rmf_groups(chans, rmf.n_grp, rmf.f_chan, rmf.n_chan,
+                                rmf.matrix, rmf.offset)
+        keep = out[-1]
+        filtered = out[:-1]
+        for entry in self._entries:
+            if numpy.array_equal(entry[1], keep):
+                filtered = entry[2]
+                break
+
+        self._add(self._entries, (chans.copy(), keep, filtered))
+        return filtered
+
+    def get_sparse(self, rmf):
+        """Return the sparse form of the current RMF matrix.
+
+        Parameters
+        ----------
+        rmf : sherpa.astro.data.DataRMF instance
+            The RMF, or a filtered view of it.
+
+        Returns
+        -------
+        rsp : SparseResponse instance
+        """
+        for rsp in self._sparse:
+            if rsp.is_from(rmf):
+                self._touch(self._sparse, rsp)
+                return rsp
+
+        rsp = SparseResponse.from_rmf(rmf)
+        self._add(self._sparse, rsp)
+        return rsp
+
+    def _touch(self, store, item):
+        store.remove(item)
+        store.insert(0, item)
+
+    def _add(self, store, item):
+        store.insert(0, item)
+        del store[self.size:]
@@ -1,5 +1,5 @@
 // 
-//  Copyright (C) 2009, 2017  Smithsonian Astrophysical Observatory
+//  Copyright (C) 2009, 2017, 2018  Smithsonian Astrophysical Observatory
 //
 //
 //  This program is free software; you can redistribute it and/or modify
@@ -120,6 +120,75 @@ namespace sherpa { namespace astro { namespace utils {
     
   }
       
+  template <typename FloatArrayType, typename IntArrayType>
+  PyObject* csc_fold( PyObject* self, PyObject* args )
+  {
+
+    IntArrayType indptr;
+    IntArrayType indices;
+    FloatArrayType data;
+    FloatArrayType source;
+    long nsrc;
+    long nchan;
+    long col_start;
+    long col_end;
+
+    if ( !PyArg_ParseTuple( args, (char*)"O&O&O&O&llll",
+			    (converter)convert_to_contig_array< IntArrayType >,
+			    &indptr,
+			    (converter)convert_to_contig_array< IntArrayType >,
+			    &indices,
+			    (converter)convert_to_contig_array< FloatArrayType >,
+			    &data,
+			    (converter)convert_to_contig_array< FloatArrayType >,
+			    &source,
+			    &nsrc,
+			    &nchan,
+			    &col_start,
+			    &col_end) )
+      return NULL;
+
+    if ( ( nsrc < 1 ) || ( nchan < 0 ) ||
+	 ( data.get_size() != indices.get_size() ) ||
+	 ( source.get_size() != ( indptr.get_size() - 1 ) * nsrc ) ) {
+      PyErr_SetString( PyExc_TypeError,
+		       (char*)"input array sizes do not match" );
+      return NULL;
+    }
+
+    npy_intp dim = npy_intp( nsrc * nchan );
+    FloatArrayType counts;
+    if ( EXIT_SUCCESS != counts.zeros( 1, &dim ) )
+      return NULL;
+
+    if ( ( dim == 0 ) || ( col_end <= col_start ) )
+      return counts.return_new_ref();
+
+    int status;
+
+    // The arrays are owned by this function while the fold is
+    // running, so the GIL can be released.
+    Py_BEGIN_ALLOW_THREADS
+    status = csc_fold( npy_intp( indptr.get_size() ), &indptr[0],
+		       npy_intp( indices.get_size() ), &indices[0],
+		       &data[0],
+		       npy_intp( source.get_size() ), &source[0],
+		       npy_intp( nsrc ), npy_intp( col_start ),
+		       npy_intp( col_end ), dim, &counts[0] );
+    Py_END_ALLOW_THREADS
+
+    if ( EXIT_SUCCESS != status ) {
+
+      PyErr_SetString( PyExc_ValueError,
+		       (char*)"response data is invalid or inconsistent" );
+      return NULL;
+
+    }
+
+    return counts.return_new_ref();
+
+  }
+
   template <typename FloatArrayType, typename IntArrayType>
   PyObject* do_group( PyObject* self, PyObject* args )
   {
@@ -503,6 +572,8 @@ static PyMethodDef UtilsFcts[] = {
   FCTSPEC( arf_fold, sherpa::astro::utils::arf_fold< SherpaFloatArray > ),
   FCTSPEC( rmf_fold, (sherpa::astro::utils::rmf_fold< SherpaFloatArray,
 		      SherpaUIntArray >) ),
+  FCTSPEC( csc_fold, (sherpa::astro::utils::csc_fold< SherpaFloatArray,
+		      SherpaUIntArray >) ),
 
   FCTSPEC( do_group, (sherpa::astro::utils::do_group<
 		      SherpaFloatArray, IntArray>) ),
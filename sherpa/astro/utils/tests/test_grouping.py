@@ -0,0 +1,305 @@
+#
+#  Copyright (C) 2018  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+import pytest
+
+from sherpa.astro.data import DataPHA
+from sherpa.astro.utils import grouping
+
+
+def group_counts_loop(counts, num, maxlen=None, tabs=None):
+    """Group the counts one channel at a time."""
+
+    nchan = len(counts)
+    free = np.ones(nchan, dtype=bool)
+    if tabs is not None:
+        free = ~np.asarray(tabs, dtype=bool)
+
+    grp = np.zeros(nchan, dtype=np.int16)
+    qual = np.zeros(nchan, dtype=np.int16)
+    i = 0
+    while i < nchan:
+        if not free[i]:
+            i += 1
+            continue
+
+        start = i
+        total = 0
+        while i < nchan and free[i]:
+            total += counts[i]
+            i += 1
+            if total >= num or (maxlen is not None and i - start == maxlen):
+                break
+
+        grp[start] = 1
+        grp[start + 1:i] = -1
+        if total < num:
+            qual[start:i] = 2
+
+    return grp, qual
+
+
+@pytest.mark.parametrize("maxlen", [None, 3])
+@pytest.mark.parametrize("tabs", [False, True])
+def test_grpnumcounts(maxlen, tabs):
+
+    rng = np.random.RandomState(8723)
+    for _ in range(50):
+        nchan = rng.randint(1, 80)
+        counts = rng.poisson(2, nchan)
+        tabstops = None
+        if tabs:
+            tabstops = rng.uniform(size=nchan) < 0.1
+
+        got = grouping.grpNumCounts(counts, 8, maxLength=maxlen,
+                                    tabStops=tabstops)
+        expected = group_counts_loop(counts, 8, maxlen, tabstops)
+        assert_array_equal(got[0], expected[0])
+        assert_array_equal(got[1], expected[1])
+
+
+def test_grpnumcounts_simple():
+
+    grp, qual = grouping.grpNumCounts([2, 0, 3, 5, 1, 1, 0, 1], 4)
+    assert_array_equal(grp, [1, -1, -1, 1, 1, -1, -1, -1])
+    assert_array_equal(qual, [0, 0, 0, 0, 2, 2, 2, 2])
+
+    grp, qual = grouping.grpNumCounts([2, 0, 3, 5, 1, 1, 0, 1], 4,
+                                      tabStops=[0, 0, 1, 0, 0, 0, 0, 0])
+    assert_array_equal(grp, [1, -1, 0, 1, 1, -1, -1, -1])
+    assert_array_equal(qual, [2, 2, 0, 0, 2, 2, 2, 2])
+
+
+def test_grpsnr_poisson_matches_counts():
+
+    counts = np.random.RandomState(2).poisson(3, 100)
+    got = grouping.grpSnr(counts, 3)
+    expected = grouping.grpNumCounts(counts, 9)
+    assert_array_equal(got[0], expected[0])
+    assert_array_equal(got[1], expected[1])
+
+
+def test_grpsnr_errors():
+
+    grp, qual = grouping.grpSnr([1, 10, 1, 1, 1, 1, 20, 0, 0, 1], 2,
+                                errorCol=np.ones(10))
+    assert_array_equal(grp, [1, -1, 1, -1, -1, -1, 1, 1, -1, -1])
+    assert_array_equal(qual, [0, 0, 0, 0, 0, 0, 0, 2, 2, 2])
+
+
+def test_grpbinwidth():
+
+    grp, qual = grouping.grpBinWidth(10, 3)
+    assert_array_equal(grp, [1, -1, -1, 1, -1, -1, 1, -1, -1, 1])
+    assert_array_equal(qual, [0, 0, 0, 0, 0, 0, 0, 0, 0, 2])
+
+
+@pytest.mark.parametrize("nchan,nbins,expected,nleft",
+                         [(9, 3, [1, -1, -1, 1, -1, -1, 1, -1, -1], 0),
+                          (10, 3, [1, -1, -1, 1, -1, -1, 1, -1, -1, 1], 1),
+                          (5, 5, [1, 1, 1, 1, 1], 0),
+                          (7, 2, [1, -1, -1, 1, -1, -1, 1], 1)])
+def test_grpnumbins(nchan, nbins, expected, nleft):
+    """The groups have a fixed width; left-over channels are poor quality"""
+
+    grp, qual = grouping.grpNumBins(nchan, nbins)
+    assert_array_equal(grp, expected)
+    assert_array_equal(qual[:nchan - nleft], 0)
+    assert_array_equal(qual[nchan - nleft:], 2)
+
+
+def test_grpnumbins_too_many():
+
+    with pytest.raises(ValueError):
+        grouping.grpNumBins(4, 5)
+
+
+def test_grpnumbins_tabstops():
+
+    tabs = [0, 0, 0, 1, 0, 0, 0, 0, 0, 0]
+    grp, qual = grouping.grpNumBins(10, 3, tabStops=tabs)
+    assert_array_equal(grp, [1, -1, -1, 0, 1, -1, -1, 1, -1, -1])
+    assert_array_equal(qual, np.zeros(10))
+
+
+def test_grpadaptive():
+    """The bright channels are grouped first"""
+
+    counts = [1, 10, 1, 1, 1, 1, 20, 0, 0, 1]
+    grp, qual = grouping.grpAdaptive(counts, 5)
+    assert_array_equal(grp, [1, 1, 1, -1, -1, -1, 1, 1, -1, -1])
+    assert_array_equal(qual, [2, 0, 2, 2, 2, 2, 0, 2, 2, 2])
+
+    grp, qual = grouping.grpAdaptive(counts, 3)
+    assert_array_equal(grp, [1, 1, 1, -1, -1, 1, 1, 1, -1, -1])
+    assert_array_equal(qual, [2, 0, 0, 0, 0, 2, 0, 2, 2, 2])
+
+    # the Poisson SNR version is the same as the counts version
+    got = grouping.grpAdaptiveSnr(counts, np.sqrt(3))
+    assert_array_equal(got[0], grp)
+    assert_array_equal(got[1], qual)
+
+
+@pytest.mark.parametrize("scheme,value", [('counts', 10), ('snr', 3),
+                                          ('adapt', 10), ('width', 4)])
+def test_group_spectra(scheme, value):
+    """The batch version matches grouping each spectrum"""
+
+    rng = np.random.RandomState(372)
+    spectra = [rng.poisson(2, rng.randint(1, 60)) for _ in range(40)]
+    tabs = [rng.uniform(size=s.size) < 0.05 for s in spectra]
+    kwargs = {}
+    if scheme != 'width':
+        kwargs['maxLength'] = 5
+
+    got = grouping.group_spectra(scheme, spectra, value, tabStops=tabs,
+                                 **kwargs)
+    assert len(got) == len(spectra)
+
+    func = grouping._schemes[scheme]
+    for counts, tab, (grp, qual) in zip(spectra, tabs, got):
+        if scheme == 'width':
+            expected = func(counts.size, value, tabStops=tab)
+        else:
+            expected = func(counts, value, tabStops=tab, **kwargs)
+        assert_array_equal(grp, expected[0])
+        assert_array_equal(qual, expected[1])
+
+
+def test_group_spectra_unknown_scheme():
+
+    with pytest.raises(ValueError):
+        grouping.group_spectra('foo', [[1, 2, 3]], 2)
+
+
+def tabs(nchan, chans):
+    """Create a tabStops array with the given channels set."""
+    out = np.zeros(nchan, dtype=np.int16)
+    out[list(chans)] = 1
+    return out
+
+
+# Reference outputs, worked out by hand from the rules used by the
+# CIAO group library (as described in the module documentation). They
+# do not depend on the code in sherpa.astro.utils.grouping, and they
+# are also compared to the group module when it is installed.
+#
+REFERENCE = [
+    ('grpNumCounts', ([3, 1, 0, 4, 2, 2, 5, 0, 1], 4), {},
+     [1, -1, 1, -1, 1, -1, 1, 1, -1],
+     [0, 0, 0, 0, 0, 0, 0, 2, 2]),
+    ('grpNumCounts', ([3, 1, 0, 4, 2, 2, 5, 0, 1], 4),
+     {'maxLength': 2, 'tabStops': tabs(9, [4])},
+     [1, -1, 1, -1, 0, 1, -1, 1, -1],
+     [0, 0, 0, 0, 0, 0, 0, 2, 2]),
+    ('grpNumCounts', ([1, 1, 1, 1, 6, 1, 1], 3), {'maxLength': 2},
+     [1, -1, 1, -1, 1, 1, -1],
+     [2, 2, 2, 2, 0, 2, 2]),
+    ('grpSnr', ([4, 0, 9, 1, 1, 16], 2), {'errorCol': [2, 1, 3, 1, 1, 4]},
+     [1, 1, -1, 1, -1, -1],
+     [0, 0, 0, 0, 0, 0]),
+    ('grpBinWidth', (7, 3), {},
+     [1, -1, -1, 1, -1, -1, 1],
+     [0, 0, 0, 0, 0, 0, 2]),
+    ('grpBinWidth', (8, 3), {'tabStops': tabs(8, [3])},
+     [1, -1, -1, 0, 1, -1, -1, 1],
+     [0, 0, 0, 0, 0, 0, 0, 2]),
+    ('grpNumBins', (10, 3), {},
+     [1, -1, -1, 1, -1, -1, 1, -1, -1, 1],
+     [0, 0, 0, 0, 0, 0, 0, 0, 0, 2]),
+    ('grpNumBins', (11, 3), {'tabStops': tabs(11, [0, 10])},
+     [0, 1, -1, -1, 1, -1, -1, 1, -1, -1, 0],
+     [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]),
+    ('grpNumBins', (8, 3), {'tabStops': tabs(8, [2])},
+     [1, -1, 0, 1, -1, 1, -1, 1],
+     [0, 0, 0, 0, 0, 0, 0, 2]),
+    ('grpAdaptive', ([2, 6, 1, 1, 3, 0, 0, 7], 4), {},
+     [1, 1, 1, 1, -1, 1, -1, 1],
+     [2, 0, 2, 0, 0, 2, 2, 0])
+]
+
+
+@pytest.mark.parametrize("name,args,kwargs,egrp,equal", REFERENCE)
+def test_reference(name, args, kwargs, egrp, equal):
+    """The results match the reference values"""
+
+    grp, qual = getattr(grouping, name)(*args, **kwargs)
+    assert_array_equal(grp, egrp)
+    assert_array_equal(qual, equal)
+
+
+@pytest.mark.parametrize("name,args,kwargs,egrp,equal", REFERENCE)
+def test_reference_matches_group_module(name, args, kwargs, egrp, equal):
+    """The reference values match the CIAO group module"""
+
+    pygroup = pytest.importorskip('group')
+
+    grp, qual = getattr(pygroup, name)(*args, **kwargs)
+    assert_array_equal(grp, egrp)
+    assert_array_equal(qual, equal)
+
+
+@pytest.mark.parametrize("name,args,kwargs",
+                         [('grpNumCounts', (8,), {}),
+                          ('grpNumCounts', (8,), {'maxLength': 4}),
+                          ('grpSnr', (3,), {}),
+                          ('grpAdaptive', (10,), {}),
+                          ('grpAdaptive', (10,), {'maxLength': 5}),
+                          ('grpAdaptiveSnr', (3,), {}),
+                          ('grpBinWidth', (4,), {}),
+                          ('grpBinWidth', (7,), {}),
+                          ('grpNumBins', (3,), {}),
+                          ('grpNumBins', (8,), {})])
+def test_matches_group_module(name, args, kwargs):
+    """The results match the CIAO group module, when it is installed"""
+
+    pygroup = pytest.importorskip('group')
+
+    rng = np.random.RandomState(9283)
+    for _ in range(40):
+        # The sizes are not always a multiple of the group width or
+        # number of groups, and there are tab stops.
+        counts = rng.poisson(2, rng.randint(10, 160)).astype(np.float64)
+        tabstops = (rng.uniform(size=counts.size) < 0.05).astype(np.int16)
+        if name in ('grpBinWidth', 'grpNumBins'):
+            data = counts.size
+        else:
+            data = counts
+
+        expected = getattr(pygroup, name)(data, *args, tabStops=tabstops,
+                                          **kwargs)
+        got = getattr(grouping, name)(data, *args, tabStops=tabstops,
+                                      **kwargs)
+        assert_array_equal(got[0], expected[0])
+        assert_array_equal(got[1], expected[1])
+
+
+def test_datapha_group_counts():
+    """The DataPHA grouping methods work"""
+
+    counts = np.asarray([2, 0, 3, 5, 1, 1, 0, 1])
+    pha = DataPHA('x', np.arange(1, 9), counts)
+    pha.group_counts(4)
+    assert pha.grouped
+    assert_array_equal(pha.grouping, [1, -1, -1, 1, 1, -1, -1, -1])
+    assert_array_equal(pha.quality, [0, 0, 0, 0, 2, 2, 2, 2])
+    assert_array_equal(pha.get_dep(filter=True), [5, 5, 3])
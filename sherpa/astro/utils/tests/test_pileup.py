@@ -0,0 +1,113 @@
+#
+#  Copyright (C) 2018  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+import numpy as np
+
+import pytest
+
+from sherpa.astro.models import JDPileup
+from sherpa.astro.utils import apply_pileup
+from sherpa.astro.utils.pileup import PileupKernel
+from sherpa.models.basic import PowLaw1D
+
+
+EXPOSURE = 5.0e4
+FRACEXPO = 0.987
+FRAME_TIME = 3.241
+
+
+def make_arf():
+    egrid = np.linspace(0.3, 11.0, 1071)
+    elo = egrid[:-1]
+    ehi = egrid[1:]
+    specresp = 400 * np.exp(-0.5 * ((elo - 1.5) / 1.2)**2) + 10
+    return elo, ehi, specresp
+
+
+def make_source(ampl):
+    mdl = PowLaw1D()
+    mdl._use_caching = False
+    mdl.ampl = ampl
+    return mdl
+
+
+# The apply_pileup routine can only be used for comparison when less
+# than 13 terms are needed, as its factorial calculation overflows.
+@pytest.mark.parametrize("ampl,nterms,psf_frac",
+                         [(1e-4, 30, 0.95), (1e-3, 30, 0.95),
+                          (1e-3, 5, 1.0), (2e-2, 12, 0.8)])
+def test_kernel_matches_apply_pileup(ampl, nterms, psf_frac):
+    elo, ehi, specresp = make_arf()
+    mdl = make_source(ampl)
+    pars = (0.5, 0.9, 1.0, psf_frac)
+
+    expected = apply_pileup(mdl(elo, ehi), EXPOSURE, nterms, elo, ehi,
+                            specresp, FRACEXPO, FRAME_TIME, *(pars + (mdl,)))
+
+    kernel = PileupKernel(EXPOSURE, elo, ehi, specresp, FRACEXPO,
+                          FRAME_TIME)
+    got = kernel.calc(mdl, *(pars + (nterms,)))
+
+    assert got[0] == pytest.approx(expected[0], rel=1e-10)
+    assert got[1] == pytest.approx(expected[1], rel=1e-10)
+    assert got[2] == pytest.approx(expected[2], rel=1e-12)
+    assert got[3] == expected[3]
+
+
+def test_kernel_no_flux():
+    elo, ehi, specresp = make_arf()
+    kernel = PileupKernel(EXPOSURE, elo, ehi, specresp, FRACEXPO,
+                          FRAME_TIME)
+    vals, fractions, integral_ae, nterms = \
+        kernel.calc(make_source(0), 0.5, 1, 1, 0.95, 30)
+    assert (vals == 0).all()
+    assert integral_ae == 0
+    assert nterms == 30
+
+
+@pytest.mark.parametrize("pars", [(1.5, 1, 1, 0.95, 30),
+                                  (0.5, 0, 1, 0.95, 30),
+                                  (0.5, 1, 1, 0.95, 31)])
+def test_kernel_invalid_parameters(pars):
+    elo, ehi, specresp = make_arf()
+    kernel = PileupKernel(EXPOSURE, elo, ehi, specresp, FRACEXPO,
+                          FRAME_TIME)
+    with pytest.raises(ValueError):
+        kernel.calc(make_source(1e-3), *pars)
+
+
+def test_jdpileup_reuses_kernel():
+    elo, ehi, specresp = make_arf()
+    mdl = make_source(1e-3)
+    jdp = JDPileup()
+    jdp._use_caching = False
+
+    args = (mdl(elo, ehi), EXPOSURE, elo, ehi, specresp, mdl)
+    y1 = jdp(*args)
+    kernel = jdp._kernel
+    assert kernel is not None
+
+    jdp.alpha = 0.8
+    y2 = jdp(*args)
+    assert jdp._kernel is kernel
+    assert (y2 != y1).any()
+
+    # a new effective area means a new kernel
+    jdp(mdl(elo, ehi), EXPOSURE, elo, ehi, specresp * 2, mdl)
+    assert jdp._kernel is not kernel
@@ -0,0 +1,197 @@
+#
+#  Copyright (C) 2018  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+import numpy as np
+
+import pytest
+
+from sherpa.astro.data import DataARF, DataRMF, _rmf_to_arf_mask
+from sherpa.astro.utils import rmf_fold, filter_resp
+from sherpa.astro.utils.response import rmf_to_csc, SparseResponse, \
+    filter_rmf_groups
+from sherpa.utils import filter_bins
+import sherpa.astro.utils.response as response
+
+
+def make_rmf(nenergy=200, detchans=150, offset=1):
+    """A RMF with two channel groups per energy bin"""
+
+    np.random.seed(8721)
+    n_grp = np.full(nenergy, 2, dtype=np.uint32)
+    nchan = 20
+    first = np.random.randint(offset, offset + detchans - 2 * nchan - 5,
+                              size=nenergy)
+    f_chan = np.column_stack((first, first + nchan + 5)).ravel()
+    n_chan = np.full(2 * nenergy, nchan, dtype=np.uint32)
+    matrix = np.random.uniform(size=n_chan.sum())
+    matrix[::7] = 0.0
+
+    egrid = np.linspace(0.1, 10.0, nenergy + 1)
+    return DataRMF('rmf', detchans, egrid[:-1], egrid[1:], n_grp,
+                   f_chan.astype(np.uint32), n_chan, matrix,
+                   offset=offset)
+
+
+def rmf_fold_orig(rmf, src):
+    return rmf_fold(src, rmf._grp, rmf._fch, rmf._nch, rmf._rsp,
+                    rmf.detchans, rmf.offset)
+
+
+@pytest.mark.parametrize("offset", [0, 1])
+def test_apply_rmf_matches_rmf_fold(offset):
+    rmf = make_rmf(offset=offset)
+    src = np.random.uniform(size=rmf.energ_lo.size)
+    assert rmf.apply_rmf(src) == pytest.approx(rmf_fold_orig(rmf, src),
+                                               rel=1e-14)
+
+
+def test_rmf_to_csc_drops_zeros():
+    rmf = make_rmf()
+    indptr, indices, data = rmf_to_csc(rmf.n_grp, rmf.f_chan, rmf.n_chan,
+                                       rmf.matrix, rmf.detchans)
+    assert indptr.size == rmf.energ_lo.size + 1
+    assert indptr[-1] == data.size
+    assert data.size == (rmf.matrix != 0).sum()
+    assert (data != 0).all()
+    assert indices.max() < rmf.detchans
+
+
+def test_rmf_to_csc_invalid():
+    with pytest.raises(ValueError):
+        rmf_to_csc([1], [10], [5], np.ones(5), 12)
+
+
+def test_apply_rmf_batch():
+    rmf = make_rmf()
+    srcs = np.random.uniform(size=(5, rmf.energ_lo.size))
+    got = rmf.apply_rmf(srcs)
+    assert got.shape == (5, rmf.detchans)
+    for src, counts in zip(srcs, got):
+        assert counts == pytest.approx(rmf_fold_orig(rmf, src), rel=1e-14)
+
+
+@pytest.mark.parametrize("nsrc", [1, 4])
+def test_fold_threaded(nsrc, monkeypatch):
+    monkeypatch.setattr(response, '_min_nnz_threaded', 0)
+    rmf = make_rmf()
+    rsp = SparseResponse.from_rmf(rmf, numthreads=3)
+    assert len(rsp._blocks(nsrc)) == 3
+
+    srcs = np.random.uniform(size=(nsrc, rmf.energ_lo.size))
+    got = rsp.fold(srcs)
+    for src, counts in zip(srcs, got):
+        assert counts == pytest.approx(rmf_fold_orig(rmf, src), rel=1e-12)
+
+
+def test_sparse_follows_notice():
+    rmf = make_rmf()
+    src = np.ones(rmf.energ_lo.size)
+    rmf.apply_rmf(src)
+    rsp = rmf.get_sparse()
+    assert rmf.get_sparse() is rsp
+
+    rmf.notice(np.arange(20, 60))
+    src = np.ones(rmf._lo.size)
+    assert rmf.apply_rmf(src) == pytest.approx(rmf_fold_orig(rmf, src))
+    assert rmf.get_sparse() is not rsp
+
+
+def test_scale():
+    rmf = make_rmf()
+    rsp = rmf.get_sparse()
+    weights = np.random.uniform(1, 2, size=rsp.nenergy)
+    scaled = rsp.scale(weights)
+    src = np.random.uniform(size=rsp.nenergy)
+    assert scaled.fold(src) == pytest.approx(rsp.fold(src * weights),
+                                             rel=1e-14)
+    assert scaled.indptr is rsp.indptr
+
+    with pytest.raises(TypeError):
+        rsp.scale(weights[1:])
+
+
+@pytest.mark.parametrize("offset", [0, 1])
+@pytest.mark.parametrize("chans", [np.arange(20, 60),
+                                   np.asarray([3, 40, 41, 97, 120]),
+                                   np.arange(1, 151)])
+def test_filter_rmf_groups_matches_filter_resp(offset, chans):
+    rmf = make_rmf(offset=offset)
+    # include energy bins with no groups
+    rmf.n_grp[::9] = 0
+    expected = filter_resp(chans, rmf.n_grp, rmf.f_chan, rmf.n_chan,
+                           rmf.matrix, rmf.offset)
+    got = filter_rmf_groups(chans, rmf.n_grp, rmf.f_chan, rmf.n_chan,
+                            rmf.matrix, rmf.offset)
+    assert len(got) == len(expected) + 1
+    for a, b in zip(got, expected):
+        assert a.dtype == b.dtype
+        assert a == pytest.approx(b)
+
+
+def test_filter_rmf_groups_no_channels():
+    rmf = make_rmf()
+    with pytest.raises(ValueError):
+        filter_rmf_groups([], rmf.n_grp, rmf.f_chan, rmf.n_chan,
+                          rmf.matrix)
+
+
+def test_filter_cache_shared_by_views():
+    rmf = make_rmf()
+    view1 = rmf.get_view()
+    view2 = rmf.get_view()
+    mask1 = view1.notice(np.arange(20, 60))
+    # the same groups are selected, but the channel arrays differ
+    mask2 = view2.notice(np.arange(20, 60)[::-1])
+    assert (mask1 == mask2).all()
+    assert view1._rsp is view2._rsp
+    assert view1.get_sparse() is view2.get_sparse()
+
+    src = np.ones(view1._lo.size)
+    assert view2.apply_rmf(src) == pytest.approx(rmf_fold_orig(view2, src))
+
+    # a new selection is not affected by the cached values
+    view2.notice(np.arange(100, 120))
+    assert view2._rsp is not view1._rsp
+    src = np.ones(view2._lo.size)
+    assert view2.apply_rmf(src) == pytest.approx(rmf_fold_orig(view2, src))
+
+
+def test_filter_cache_reset_when_matrix_changes():
+    rmf = make_rmf()
+    rmf.notice(np.arange(20, 60))
+    rsp = rmf._rsp
+    rmf.matrix = rmf.matrix * 2
+    rmf.notice(np.arange(20, 60))
+    assert rmf._rsp == pytest.approx(rsp * 2)
+
+
+def test_rmf_to_arf_mask():
+    rmf = make_rmf()
+    # an ARF grid 3 times finer than the RMF, which includes the RMF
+    # bin edges
+    edges = np.linspace(0.1, 10.0, 3 * rmf.energ_lo.size + 1)
+    arf = DataARF('arf', edges[:-1], edges[1:], np.ones(edges.size - 1))
+    bin_mask = np.zeros(rmf.energ_lo.size, dtype=bool)
+    bin_mask[[0, 4, 5, 6, 50, 199]] = True
+
+    expected = np.zeros(arf.energ_lo.size, dtype=bool)
+    for lo, hi in zip(rmf.energ_lo[bin_mask], rmf.energ_hi[bin_mask]):
+        expected |= filter_bins((lo,), (hi,), (arf.energ_lo, arf.energ_hi))
+
+    assert (_rmf_to_arf_mask(rmf, arf, bin_mask) == expected).all()
@@ -371,6 +371,11 @@ class Filter(object):
     """
     A class for representing filters of N-Dimentional datasets.
     """
+
+    # Incremented each time the mask is set, so that users of the
+    # filter can tell when values derived from the mask are out of date.
+    version = 0
+
     def __init__(self):
         self._mask = True
 
@@ -393,6 +398,7 @@ class Filter(object):
             raise DataErr('ismask')
         else:
             self._mask = numpy.asarray(val, numpy.bool_)
+        self.version += 1
 
     def apply(self, array):
         """
@@ -880,8 +886,16 @@ class DataSimulFit(NoNewAttributesAfterInit):
     def eval_model_to_fit(self, modelfuncs):
         total_model = []
 
-        for func, data in izip(modelfuncs, self.datasets):
-            total_model.append(data.eval_model_to_fit(func))
+        # A SimulFitModel shares the evaluation of source expressions
+        # between the datasets.
+        shared = getattr(modelfuncs, 'shared_evaluation', None)
+        if shared is None:
+            for func, data in izip(modelfuncs, self.datasets):
+                total_model.append(data.eval_model_to_fit(func))
+        else:
+            with shared():
+                for func, data in izip(modelfuncs, self.datasets):
+                    total_model.append(data.eval_model_to_fit(func))
 
         return numpy.concatenate(total_model)
 
@@ -23,18 +23,40 @@ from sherpa.utils import NoNewAttributesAfterInit, bool_cast
 
 import logging
 warning = logging.getLogger(__name__).warning
-backend = None
-
-try:
-    from . import ds9_backend as backend
-
-except Exception as e:
-    # if DS9 is not found for some reason, like inside gdb
-    # give a useful warning and fall back on dummy_backend of noops
-    warning("imaging routines will not be available, \n" +
-            "failed to import sherpa.image.ds9_backend due to \n'%s: %s'" %
-            (type(e).__name__, str(e)))
-    from . import dummy_backend as backend
+
+
+def _load_backend():
+    """Import the image backend."""
+    try:
+        from . import ds9_backend as module
+
+    except Exception as e:
+        # if DS9 is not found for some reason, like inside gdb
+        # give a useful warning and fall back on dummy_backend of noops
+        warning("imaging routines will not be available, \n" +
+                "failed to import sherpa.image.ds9_backend due to \n'%s: %s'" %
+                (type(e).__name__, str(e)))
+        from . import dummy_backend as module
+
+    return module
+
+
+class _Backend(object):
+    """The image backend, which is loaded when first used.
+
+    Looking for DS9 and XPA - and checking whether DS9 is running -
+    is slow, so it is only done when an image routine is called.
+    """
+
+    module = None
+
+    def __getattr__(self, name):
+        if self.module is None:
+            self.module = _load_backend()
+        return getattr(self.module, name)
+
+
+backend = _Backend()
 
 
 __all__ = ('Image', 'DataImage', 'ModelImage', 'RatioImage',
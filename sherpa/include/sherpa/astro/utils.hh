@@ -174,6 +174,84 @@ namespace sherpa { namespace astro { namespace utils {
 
   }
 
+  //
+  // Fold nsrc source spectra through a response stored in compressed
+  // sparse column (CSC) form, with one column per energy bin and one
+  // row per channel. Only the energy bins col_start to col_end - 1 are
+  // included, so that the work can be split up by the caller (the
+  // partial results are then summed). The arrays are stored with the
+  // spectra varying fastest:
+  //
+  //   source[ energy * nsrc + nn ]
+  //   counts[ chan * nsrc + nn ] += sum_k data[k] * source[ energy * nsrc + nn ]
+  //
+  // for k in [indptr[energy], indptr[energy+1]) and chan = indices[k].
+  //
+  // Requirements:
+  //
+  //   col_start <= col_end < len_indptr
+  //   indptr is non-decreasing and indptr[ col_end ] <= len_indices
+  //   indices < len_counts / nsrc
+  //   len_source == (len_indptr - 1) * nsrc
+  //
+
+  template <typename ConstIntType, typename ConstFloatType,
+	    typename FloatType, typename IndexType>
+  int csc_fold( IndexType len_indptr, const ConstIntType *indptr,
+		IndexType len_indices, const ConstIntType *indices,
+		const ConstFloatType *data,
+		IndexType len_source, const ConstFloatType *source,
+		IndexType nsrc, IndexType col_start, IndexType col_end,
+		IndexType len_counts, FloatType *counts )
+  {
+
+    if ( ( nsrc < 1 ) || ( col_start < 0 ) || ( col_end < col_start ) ||
+	 ( col_end >= len_indptr ) ||
+	 ( len_source != ( len_indptr - 1 ) * nsrc ) ||
+	 ( IndexType( indptr[ col_end ] ) > len_indices ) )
+      return EXIT_FAILURE;
+
+    IndexType nchan = len_counts / nsrc;
+
+    for ( IndexType col = col_start; col < col_end; col++ ) {
+
+      IndexType start = indptr[ col ];
+      IndexType end = indptr[ col + 1 ];
+      if ( end < start )
+	return EXIT_FAILURE;
+
+      const ConstFloatType *src = source + col * nsrc;
+
+      if ( nsrc == 1 ) {
+
+	FloatType src_col = src[ 0 ];
+	for ( IndexType kk = start; kk < end; kk++ ) {
+	  IndexType chan = indices[ kk ];
+	  if ( chan >= nchan )
+	    return EXIT_FAILURE;
+	  counts[ chan ] += data[ kk ] * src_col;
+	}
+
+      } else {
+
+	for ( IndexType kk = start; kk < end; kk++ ) {
+	  IndexType chan = indices[ kk ];
+	  if ( chan >= nchan )
+	    return EXIT_FAILURE;
+	  FloatType *out = counts + chan * nsrc;
+	  FloatType val = data[ kk ];
+	  for ( IndexType nn = 0; nn < nsrc; nn++ )
+	    out[ nn ] += val * src[ nn ];
+	}
+
+      }
+
+    }
+
+    return EXIT_SUCCESS;
+
+  }
+
   template <typename ConstIntType, typename IndexType, typename IntType>
   bool is_in( const ConstIntType *noticed_chans, IndexType& size,
 	      IntType& lo, IntType& hi ) {
@@ -17,7 +17,11 @@
 #  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 #
 
-from six.moves import xrange
+from itertools import chain
+import re
+
+from six.moves import map, xrange, zip as izip
+from six import string_types
 
 import numpy
 from sherpa.utils import SherpaFloat, get_num_args, is_binary_file
@@ -27,7 +31,7 @@ import os
 
 
 __all__ = ('read_data', 'write_data', 'get_ascii_data', 'read_arrays',
-           'write_arrays')
+           'write_arrays', 'read_file_data', 'iter_file_data', 'format_rows')
 
 
 def _is_subclass(t1, t2):
@@ -44,59 +48,220 @@ def _check_args(size, dstype):
                         (dstype.__name__, req_args))
 
 
-def read_file_data(filename, sep=' ', comment='#', require_floats=True):
-    bad_chars = '\t\n\r,;: |'
-    fp = open(filename, 'r')
-    raw_names = []
-    rows = []
-    try:
-        for line in fp:
-            for char in bad_chars:
-                if char in line:
-                    # replace any bad chars in line with sep for tokenize
-                    line = line.replace(char, sep)
-
-            line = line.strip()
-
-            # look for last commented line before data
-            if len(line) > 0 and line[0] == comment:
-                # Slice off the comment
-                # TODO: why is this not just `line = line[1:]`?
-                line = line.replace(comment, ' ')
-                raw_names = line.strip().split(sep)
-
-            elif line == '':
-                continue
+# The characters, along with the separator, that split values in an
+# ASCII file.
+_bad_chars = '\t\n\r,;: |'
+
+# The approximate number of bytes read in at a time.
+_chunksize = 8 * 1024 * 1024
+
+
+def _get_names(line, sep, comment):
+    """The column names from a comment line."""
+    for char in _bad_chars:
+        line = line.replace(char, sep)
+
+    line = line.strip().replace(comment, ' ')
+    raw_names = line.strip().split(sep)
+    return [name.strip(_bad_chars) for name in raw_names if name != '']
+
+
+def _default_names(ncols):
+    return ['col%i' % (i + 1) for i in xrange(ncols)]
+
+
+def _iter_chunks(filename, sep, comment, chunksize):
+    """Read the file in chunks, returning the column names and rows.
+
+    Each chunk returns the names from the last comment line (None if
+    there has been no comment line) and the data rows, as a list of
+    tokens per row, which can be empty.
+    """
+
+    # All the separators, except for new lines, are converted to
+    # spaces so that each line can be split on white space.
+    chars = '[' + re.escape(_bad_chars.replace('\n', '')) + ']'
+    pattern = re.compile(re.escape(sep) + '|' + chars)
+
+    names = None
+    with open(filename, 'r') as fp:
+        while True:
+            lines = fp.readlines(chunksize)
+            if not lines:
+                break
+
+            text = pattern.sub(' ', ''.join(lines))
+            rows = [line.split() for line in text.split('\n')]
+            if comment in text:
+                data = []
+                for line, row in izip(lines, rows):
+                    if len(row) == 0:
+                        continue
+                    if row[0][0] == comment:
+                        names = _get_names(line, sep, comment)
+                    else:
+                        data.append(row)
+
+                rows = data
+
             else:
-                # split line at sep
-                elems = line.strip().split(sep)
-                row = [elem for elem in elems if elem != '']
+                rows = [row for row in rows if len(row) > 0]
+
+            yield names, rows
 
-                # make list of row elements
-                rows.append(row)
 
-    finally:
-        fp.close()
+def _convert_rows(filename, rows, require_floats):
+    """Convert the rows of tokens into a list of columns."""
+
+    ncols = len(rows[0])
+    if any(n != ncols for n in map(len, rows)):
+        raise ValueError("The file {} could not ".format(filename) +
+                         "be loaded, as the number of columns " +
+                         "changes")
+
+    if require_floats:
+        try:
+            vals = numpy.fromiter(map(float, chain.from_iterable(rows)),
+                                  SherpaFloat, count=len(rows) * ncols)
+        except ValueError:
+            raise ValueError("The file {} could not ".format(filename) +
+                             "be loaded, probably because it contained " +
+                             "spurious data and/or strings")
 
-    # rotate rows into list of columns
-    cols = numpy.column_stack(rows)
+        return list(vals.reshape(len(rows), ncols).T.copy())
 
-    # cast columns to appropriate type
     args = []
-    for col in cols:
+    for col in numpy.asarray(rows).T:
         try:
             args.append(col.astype(SherpaFloat))
         except ValueError:
-            if require_floats:
-                raise ValueError("The file {} could not ".format(filename) +
-                                 "be loaded, probably because it contained " +
-                                 "spurious data and/or strings")
             args.append(col)
 
-    names = [name.strip(bad_chars) for name in raw_names if name != '']
+    return args
+
+
+def iter_file_data(filename, sep=' ', comment='#', require_floats=True,
+                   chunksize=None):
+    """Read in the columns of an ASCII file in chunks.
+
+    The file is processed as described in `read_file_data`, but the
+    data is returned in blocks of rows, so that large files can be
+    processed without reading in all the data.
+
+    Parameters
+    ----------
+    filename : str
+       The name of the ASCII file to read in.
+    sep : str, optional
+       The separator character. The default is ``' '``.
+    comment : str, optional
+       The comment character. The default is ``'#'``.
+    require_floats : bool, optional
+       If ``True`` (the default), non-numeric data values will
+       raise a `ValueError`. Otherwise the column is returned as
+       strings, which is decided separately for each chunk.
+    chunksize : int or None, optional
+       The approximate number of bytes to read in for each chunk.
+
+    Returns
+    -------
+    chunks : iterator of (names, columns)
+       The column names, taken from the last comment line seen so
+       far, and the data for the columns for the chunk.
+
+    Examples
+    --------
+
+    >>> total = 0
+    >>> for names, cols in iter_file_data('lc.dat'):
+    ...     total += cols[1].sum()
+
+    """
+
+    if chunksize is None:
+        chunksize = _chunksize
+
+    ncols = None
+    for names, rows in _iter_chunks(filename, sep, comment, int(chunksize)):
+        if len(rows) == 0:
+            continue
+
+        args = _convert_rows(filename, rows, require_floats)
+        if ncols is None:
+            ncols = len(args)
+        elif len(args) != ncols:
+            raise ValueError("The file {} could not ".format(filename) +
+                             "be loaded, as the number of columns " +
+                             "changes")
 
-    if len(names) == 0:
-        names = ['col%i' % (i + 1) for i in xrange(len(args))]
+        if names is None:
+            names = _default_names(ncols)
+
+        yield names, args
+
+
+def read_file_data(filename, sep=' ', comment='#', require_floats=True):
+    """Read in the columns of an ASCII file.
+
+    The file is read in large chunks (see `iter_file_data`) and each
+    chunk is converted straight to arrays.
+
+    Parameters
+    ----------
+    filename : str
+       The name of the ASCII file to read in.
+    sep : str, optional
+       The separator character. The default is ``' '``.
+    comment : str, optional
+       The comment character. The default is ``'#'``.
+    require_floats : bool, optional
+       If ``True`` (the default), non-numeric data values will
+       raise a `ValueError`.
+
+    Returns
+    -------
+    names, args
+       The column names and data. The names are taken from the last
+       comment line in the file, otherwise they are ``col1`` to
+       ``coln``.
+
+    See Also
+    --------
+    get_ascii_data, iter_file_data
+    """
+
+    names = None
+    chunks = []
+    for names, rows in _iter_chunks(filename, sep, comment, _chunksize):
+        if len(rows) == 0:
+            continue
+        if require_floats:
+            rows = _convert_rows(filename, rows, require_floats)
+        chunks.append(rows)
+
+    if len(chunks) == 0:
+        raise ValueError("The file {} could not ".format(filename) +
+                         "be loaded, as it contains no data")
+
+    if require_floats:
+        ncols = set(len(chunk) for chunk in chunks)
+        if len(ncols) != 1:
+            raise ValueError("The file {} could not ".format(filename) +
+                             "be loaded, as the number of columns " +
+                             "changes")
+
+        if len(chunks) == 1:
+            args = chunks[0]
+        else:
+            args = [numpy.concatenate(cols) for cols in izip(*chunks)]
+
+    else:
+        # The type of each column depends on all the rows.
+        args = _convert_rows(filename, list(chain.from_iterable(chunks)),
+                             require_floats)
+
+    if names is None or len(names) == 0:
+        names = _default_names(len(args))
 
     return names, args
 
@@ -386,6 +551,59 @@ def read_arrays(*args):
     return dstype('', *args)
 
 
+# The number of rows converted to text at a time by write_arrays.
+_format_rows_block = 65536
+
+
+def format_rows(rows, format='%g', sep=' ', linebreak='\n', prefix=''):
+    """Convert a 2D array to text, one line per row.
+
+    Parameters
+    ----------
+    rows : 2D array
+       The values to convert, with one row per line.
+    format : str or sequence of str, optional
+       The format used for each value, or for each column.
+    sep : str, optional
+       The separator between the values of a row.
+    linebreak : str, optional
+       The text added to the end of each row.
+    prefix : str, optional
+       The text added to the start of each row.
+
+    Returns
+    -------
+    text : str
+       The rows, each of which ends with ``linebreak``.
+
+    Notes
+    -----
+    The rows are converted with a single string-formatting call, so
+    the values are converted without looping over them in Python;
+    ``rows`` should be split into blocks when it is large, to limit
+    the size of the string.
+    """
+    rows = numpy.asarray(rows)
+    if rows.ndim != 2:
+        raise ValueError("rows must be a 2D array")
+
+    nrows, ncols = rows.shape
+    if nrows == 0:
+        return ''
+
+    if isinstance(format, string_types):
+        format = [format] * ncols
+    elif len(format) != ncols:
+        raise ValueError("expected {} formats, not {}".format(ncols,
+                                                               len(format)))
+
+    # Only the formats should be interpreted by the % operator.
+    sep, linebreak, prefix = [t.replace('%', '%%')
+                              for t in (sep, linebreak, prefix)]
+    rowfmt = prefix + sep.join(format) + linebreak
+    return (rowfmt * nrows) % tuple(rows.ravel().tolist())
+
+
 def write_arrays(filename, args, fields=None, sep=' ', comment='#',
                  clobber=False, linebreak='\n', format='%g'):
     """Write a list of arrays to an ASCII file.
@@ -455,21 +673,18 @@ def write_arrays(filename, args, fields=None, sep=' ', comment='#',
 
     args = numpy.column_stack(numpy.asarray(args))
 
-    f = open(filename, 'w')
-
-    if fields is not None:
-        f.write(comment + sep.join(fields) + linebreak)
-
-    lines = []
-    for arg in args:
-        line = [format % elem for elem in arg]
-        lines.append(sep.join(line))
+    with open(filename, 'w') as f:
+        if fields is not None:
+            f.write(comment + sep.join(fields) + linebreak)
 
-    f.write(linebreak.join(lines))
+        for start in xrange(0, len(args), _format_rows_block):
+            rows = args[start:start + _format_rows_block]
+            f.write(format_rows(rows, format, sep, linebreak))
 
-    # add a newline at end
-    f.write(linebreak)
-    f.close()
+        # As each row ends in a line break, this is only needed when
+        # there are no rows.
+        if len(args) == 0:
+            f.write(linebreak)
 
 
 def write_data(filename, dataset, fields=None, sep=' ', comment='#',
@@ -37,7 +37,8 @@ warning = logging.getLogger(__name__).warning
 __all__ = ('Model', 'CompositeModel', 'SimulFitModel',
            'ArithmeticConstantModel', 'ArithmeticModel', 'RegriddableModel1D', 'RegriddableModel2D',
            'UnaryOpModel', 'BinaryOpModel', 'FilterModel', 'modelCacher1d',
-           'ArithmeticFunctionModel', 'NestedModel', 'MultigridSumModel')
+           'ArithmeticFunctionModel', 'NestedModel', 'MultigridSumModel',
+           'SharedEvaluation', 'shared_calc')
 
 
 def boolean_to_byte(boolean_value):
@@ -412,6 +413,150 @@ class CompositeModel(Model):
         pass
 
 
+# The SharedEvaluation instances that are currently in use.
+_shared_scopes = []
+
+
+class SharedEvaluation(object):
+    """Evaluate a model only once for each grid.
+
+    When used as a context manager, calls to `shared_calc` re-use the
+    model values calculated earlier in the same context for the same
+    model, parameter values, and grid. Grids are compared by value,
+    but each array is only compared once per SharedEvaluation
+    instance, so re-using the instance for repeated evaluations (e.g.
+    each iteration of a fit) makes the look up cheap.
+
+    This is used by `SimulFitModel` so that the source expression of
+    datasets which share an energy grid - such as multiple observations
+    with the same instrument - is only evaluated once per statistic
+    calculation.
+
+    Examples
+    --------
+
+    >>> shared = SharedEvaluation()
+    >>> with shared:
+    ...     y1 = shared_calc(mdl, mdl.thawedpars, x1)
+    ...     y2 = shared_calc(mdl, mdl.thawedpars, x2)
+
+    """
+
+    def __init__(self):
+        # The arrays that have been seen, indexed by id, and the
+        # representative array for each token.
+        self._arrays = {}
+        self._grids = []
+        self._values = None
+        self._depth = 0
+
+    def __enter__(self):
+        if self._depth == 0:
+            self._values = {}
+        self._depth += 1
+        _shared_scopes.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _shared_scopes.pop()
+        self._depth -= 1
+        if self._depth == 0:
+            self._values = None
+
+    def _token(self, arr):
+        """Return an integer that is the same for equal arrays."""
+        known = self._arrays.get(id(arr))
+        if known is not None and known[0] is arr:
+            return known[1]
+
+        vals = numpy.asarray(arr)
+        token = None
+        for idx, grid in enumerate(self._grids):
+            if grid.shape == vals.shape and numpy.array_equal(grid, vals):
+                token = idx
+                break
+
+        if token is None:
+            token = len(self._grids)
+            self._grids.append(vals)
+
+        # store the array so that the id is not re-used
+        self._arrays[id(arr)] = (arr, token)
+        return token
+
+    def calc(self, model, p, *args, **kwargs):
+        """Evaluate the model, re-using an earlier evaluation if possible.
+
+        Parameters
+        ----------
+        model : Model instance
+        p : sequence of numbers
+            The parameter values.
+        *args
+            The grid (arrays of the independent axes).
+        **kwargs
+            Any other arguments for model.calc.
+
+        Returns
+        -------
+        vals : array
+        """
+        if self._values is None or kwargs or \
+           not all(numpy.ndim(arg) == 1 for arg in args):
+            return model.calc(p, *args, **kwargs)
+
+        key = (id(model), tuple(p),
+               tuple(self._token(arg) for arg in args))
+        stored = self._values.get(key)
+        if stored is not None and stored[0] is model:
+            return stored[1]
+
+        vals = model.calc(p, *args)
+        self._values[key] = (model, vals)
+        return vals
+
+
+def shared_calc(model, p, *args, **kwargs):
+    """Evaluate the model, sharing the evaluation between datasets.
+
+    The model is evaluated with ``model.calc(p, *args, **kwargs)``,
+    unless a `SharedEvaluation` context is active and it has already
+    evaluated the model with the same grid. A model which multiplies
+    a constant (e.g. the exposure time) and another model is split,
+    so that the evaluation can be shared by sources that differ only
+    in their scaling.
+
+    Parameters
+    ----------
+    model : Model instance
+    p : sequence of numbers
+        The parameter values.
+    *args
+        The grid (arrays of the independent axes).
+    **kwargs
+        Any other arguments for model.calc.
+
+    Returns
+    -------
+    vals : array
+    """
+    if len(_shared_scopes) == 0:
+        return model.calc(p, *args, **kwargs)
+
+    scope = _shared_scopes[-1]
+    if isinstance(model, BinaryOpModel) and model.op is numpy.multiply:
+        if isinstance(model.lhs, ArithmeticConstantModel):
+            return model.op(model.lhs.val,
+                            shared_calc(model.rhs, p, *args, **kwargs))
+        if isinstance(model.rhs, ArithmeticConstantModel):
+            nlhs = len(model.lhs.pars)
+            return model.op(shared_calc(model.lhs, p[:nlhs], *args,
+                                        **kwargs),
+                            model.rhs.val)
+
+    return scope.calc(model, p, *args, **kwargs)
+
+
 class SimulFitModel(CompositeModel):
     """Store multiple models.
 
@@ -444,19 +589,39 @@ class SimulFitModel(CompositeModel):
 
     >>> ymdl = dall.eval_model_to_fit(mall)
 
+    The evaluation of a source model is shared between the models
+    when they use the same grid (see `SharedEvaluation`).
+
     """
 
+    # Re-used between startup and teardown, so that the grids are
+    # only compared once per fit.
+    _shared = None
+
     def __iter__(self):
         return iter(self.parts)
 
+    def shared_evaluation(self):
+        """Return the context used to evaluate the models.
+
+        Returns
+        -------
+        shared : SharedEvaluation instance
+        """
+        if self._shared is None:
+            return SharedEvaluation()
+        return self._shared
+
     def startup(self):
         for part in self:
             part.startup()
+        self._shared = SharedEvaluation()
         CompositeModel.startup(self)
 
     def teardown(self):
         for part in self:
             part.teardown()
+        self._shared = None
         CompositeModel.teardown(self)
 
 
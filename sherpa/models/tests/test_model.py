@@ -24,7 +24,9 @@ import warnings
 from sherpa.utils.testing import SherpaTestCase
 from sherpa.utils.err import ModelErr
 from sherpa.models.model import ArithmeticModel, ArithmeticConstantModel, \
-    BinaryOpModel, FilterModel, NestedModel, UnaryOpModel
+    BinaryOpModel, FilterModel, NestedModel, UnaryOpModel, SimulFitModel, \
+    SharedEvaluation, shared_calc
+from sherpa.data import Data1DInt, DataSimulFit
 from sherpa.models.parameter import Parameter, tinyval
 from sherpa.models.basic import Sin, Const1D
 
@@ -273,3 +275,61 @@ class test_model_parametercase_instance(test_model_renamed):
 
     def test_name(self):
         self.assertEqual(self.m.name, 'parametercase')
+
+
+class SharedModel(ArithmeticModel):
+    """Evaluate a model with shared_calc, as the instrument models do."""
+
+    def __init__(self, model, name='shared'):
+        self.model = model
+        ArithmeticModel.__init__(self, name, model.pars)
+
+    def calc(self, p, *args, **kwargs):
+        return shared_calc(self.model, p, *args, **kwargs)
+
+
+def test_shared_evaluation_same_grid():
+
+    calls = []
+
+    class Counting(Const1D):
+        def calc(self, *args, **kwargs):
+            calls.append(args[1])
+            return Const1D.calc(self, *args, **kwargs)
+
+    src = Counting('src')
+    src._use_caching = False
+    src.c0 = 3
+
+    # the grids have the same values but are different objects
+    grids = [numpy.arange(1, 5), numpy.arange(1, 5), numpy.arange(2, 6)]
+    datasets = [Data1DInt('d{}'.format(idx), grid, grid + 1,
+                          numpy.ones(grid.size))
+                for idx, grid in enumerate(grids)]
+    models = [SharedModel(2 * src), SharedModel(src * 5), SharedModel(src)]
+
+    dall = DataSimulFit('all', datasets)
+    mall = SimulFitModel('all', models)
+    got = dall.eval_model_to_fit(mall)
+    assert got.tolist() == [6] * 4 + [15] * 4 + [3] * 4
+
+    # once for the first two datasets, once for the third
+    assert len(calls) == 2
+    assert calls[1] is grids[2]
+
+    # outside of a SimulFitModel each call evaluates the model
+    shared_calc(src, [3], grids[0], grids[0] + 1)
+    assert len(calls) == 3
+
+
+def test_shared_evaluation_parameter_change():
+
+    src = Const1D('src')
+    src._use_caching = False
+    x = numpy.arange(1, 4)
+    with SharedEvaluation():
+        y1 = shared_calc(src, [2], x)
+        y2 = shared_calc(src, [4], x.copy())
+
+    assert y1.tolist() == [2] * 3
+    assert y2.tolist() == [4] * 3
@@ -18,11 +18,46 @@
 #
 
 
+import logging
+
 import numpy
-import pylab
 
 from sherpa.utils import get_keyword_defaults
 from sherpa.utils.err import NotImplementedErr
+from sherpa.utils.lazy import lazy_import
+
+warning = logging.getLogger(__name__).warning
+
+# matplotlib is only loaded when something is plotted, since it
+# takes a large fraction of the time needed to import Sherpa.
+pylab = lazy_import('pylab')
+
+# Set when pylab could not be imported.
+_pylab_failed = False
+
+
+def _load_pylab():
+    """Can pylab be used?
+
+    Since pylab is loaded lazily, an installation of matplotlib which
+    can not be imported is only found when something is plotted. In
+    that case a warning is displayed, and - as with the dummy backend
+    that sherpa.plot falls back to when the backend can not be
+    imported - nothing is plotted.
+    """
+    global _pylab_failed
+    if _pylab_failed:
+        return False
+
+    try:
+        getattr(pylab, 'gca')
+    except Exception:
+        _pylab_failed = True
+        warning('failed to import pylab; plotting routines will not ' +
+                'be available')
+        return False
+
+    return True
 
 
 __all__ = ('clear_window','point','plot','histo','contour','set_subplot','init',
@@ -49,6 +84,8 @@ def begin():
     pass
 
 def end():
+    if not _load_pylab():
+        return
     set_window_redraw(True)
     if pylab.isinteractive():
         pylab.draw()
@@ -62,17 +99,21 @@ def _choose(test, iftrue, iffalse=None):
     return iffalse
 
 
-# In matplotlib 1.5RC1 the kwargs to pylab.Axes.errorbar are not
-# explictit, but they appear to be set for pybal.errorbar, so
-# switch to that.
-# _errorbar_defaults = get_keyword_defaults(pylab.Axes.errorbar)
-_errorbar_defaults = get_keyword_defaults(pylab.errorbar)
+# The default values of the pylab.errorbar arguments. These used to be
+# read from pylab.errorbar, but that requires matplotlib to be loaded.
+# A capsize of None means that it is not sent to errorbar, so that
+# the matplotlib default is used.
+_errorbar_defaults = {'ecolor': None, 'capsize': None, 'barsabove': False}
 
 
 def clear_window():
+    if not _load_pylab():
+        return
     pylab.clf()
 
 def set_window_redraw(redraw):
+    if not _load_pylab():
+        return
     if redraw:
         pylab.draw()
 
@@ -80,6 +121,8 @@ def set_window_redraw(redraw):
 def point(x, y, overplot=True, clearwindow=False,
           symbol=None,
           color=None):
+    if not _load_pylab():
+        return
 
     if overplot:
         axes = pylab.gca()
@@ -144,6 +187,8 @@ def vline(x, ymin=0, ymax=1,
           linestyle=None,
           linewidth=None,
           overplot=False, clearwindow=True):
+    if not _load_pylab():
+        return
 
     if overplot:
         axes = pylab.gca()
@@ -169,6 +214,8 @@ def hline(y, xmin=0, xmax=1,
           linestyle=None,
           linewidth=None,
           overplot=False, clearwindow=True):
+    if not _load_pylab():
+        return
 
     if overplot:
         axes = pylab.gca()
@@ -206,6 +253,8 @@ def plot(x, y, yerr=None, xerr=None, title=None, xlabel=None, ylabel=None,
          markersize=None,
          xaxis=False,
          ratioline=False):
+    if not _load_pylab():
+        return
 
     if overplot:
         axes = pylab.gca()
@@ -240,9 +289,12 @@ def plot(x, y, yerr=None, xerr=None, title=None, xlabel=None, ylabel=None,
             xerr = xerr / 2.
         xerr = _choose(xerrorbars, xerr)
         yerr = _choose(yerrorbars, yerr)
-        line = axes.errorbar(x, y, yerr, xerr, ecolor=ecolor, capsize=capsize,
+        kwargs = {}
+        if capsize is not None:
+            kwargs['capsize'] = capsize
+        line = axes.errorbar(x, y, yerr, xerr, ecolor=ecolor,
                              barsabove=barsabove, color=color,
-                             markerfacecolor=markerfacecolor)[0]
+                             markerfacecolor=markerfacecolor, **kwargs)[0]
 
     for var in ('linestyle', 'color', 'marker', 'markerfacecolor',
                 'markersize'):
@@ -278,6 +330,8 @@ def contour(x0, x1, y, levels=None, title=None, xlabel=None, ylabel=None,
             ylog=False,
             linewidths=None,
             colors=None):
+    if not _load_pylab():
+        return
 
     if overcontour:
         axes = pylab.gca()
@@ -324,6 +378,8 @@ def set_subplot(row, col, nrows, ncols, clearaxes=True,
                 top=None,
                 wspace=0.3,
                 hspace=0.4):
+    if not _load_pylab():
+        return
 
     pylab.subplots_adjust(left=left, right=right, bottom=bottom, top=top,
                           wspace=wspace, hspace=hspace)
@@ -345,6 +401,8 @@ def set_subplot(row, col, nrows, ncols, clearaxes=True,
 def set_jointplot(row, col, nrows, ncols, clearaxes=True,
                   top=1,
                   ratio=2):
+    if not _load_pylab():
+        return
 
     if not clearaxes:
         f, axarr = pylab.subplots(nrows, sharex=True, num=1)
@@ -17,6 +17,8 @@
 #  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 #
 
+import logging
+
 from sherpa.utils.testing import SherpaTestCase, requires_pylab
 
 
@@ -27,3 +29,27 @@ class pylab_test(SherpaTestCase):
         from sherpa.plot.pylab_backend import _errorbar_defaults
         # assert all needed defaults have been found
         assert all(e in _errorbar_defaults for e in ('ecolor', 'capsize', 'barsabove'))
+
+
+@requires_pylab
+def test_pylab_import_fails(monkeypatch, caplog):
+    """A matplotlib which can not be imported is reported on first use."""
+
+    from sherpa.plot import pylab_backend
+    from sherpa.utils.lazy import LazyModule
+
+    # other tests may have changed the level of the sherpa logger
+    caplog.set_level(logging.WARNING, logger=pylab_backend.__name__)
+    monkeypatch.setattr(pylab_backend, 'pylab',
+                        LazyModule('sherpa_not_a_module'))
+    monkeypatch.setattr(pylab_backend, '_pylab_failed', False)
+
+    # nothing is plotted, as with the dummy backend
+    pylab_backend.plot([1, 2], [3, 4])
+    pylab_backend.clear_window()
+    pylab_backend.end()
+
+    msgs = [r.getMessage() for r in caplog.records
+            if r.name == 'sherpa.plot.pylab_backend']
+    assert msgs == ['failed to import pylab; plotting routines will not ' +
+                    'be available']
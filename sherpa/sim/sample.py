@@ -18,12 +18,14 @@
 #
 
 from six.moves import zip as izip
+from six.moves import xrange
 import numpy
 import numpy.random
 
 from sherpa.estmethods import Covariance, Confidence
 from sherpa.utils.err import EstErr
-from sherpa.utils import parallel_map, NoNewAttributesAfterInit
+from sherpa.utils import parallel_map, NoNewAttributesAfterInit, \
+    SherpaFloat, _ncpus
 
 
 import logging
@@ -243,22 +245,24 @@ class ParameterSampleFromScaleMatrix(NoNewAttributesAfterInit):
 class UniformParameterSampleFromScaleVector(ParameterSampleFromScaleVector):
 
     def get_sample(self, fit, factor=4, num=1):
-        vals = numpy.array(fit.model.thawedpars)
-        scales = self.scale.get_scales(fit)
-        samples = [numpy.random.uniform(val - factor * abs(scale),
-                                        val + factor * abs(scale),
-                                        int(num)) for val, scale in izip(vals, scales)]
-        return numpy.asarray(samples).T
+        vals = numpy.array(fit.model.thawedpars)[:, numpy.newaxis]
+        scales = numpy.abs(self.scale.get_scales(fit))[:, numpy.newaxis]
+        # All the parameters are drawn in one call; the draws are made
+        # parameter by parameter, as before, and then transposed.
+        samples = numpy.random.uniform(vals - factor * scales,
+                                       vals + factor * scales,
+                                       (vals.size, int(num)))
+        return samples.T
 
 
 class NormalParameterSampleFromScaleVector(ParameterSampleFromScaleVector):
 
     def get_sample(self, fit, myscales=None, num=1):
-        vals = numpy.array(fit.model.thawedpars)
-        scales = self.scale.get_scales(fit, myscales)
-        samples = [numpy.random.normal(
-            val, scale, int(num)) for val, scale in izip(vals, scales)]
-        return numpy.asarray(samples).T
+        vals = numpy.array(fit.model.thawedpars)[:, numpy.newaxis]
+        scales = numpy.asarray(self.scale.get_scales(fit, myscales),
+                               dtype=SherpaFloat)[:, numpy.newaxis]
+        samples = numpy.random.normal(vals, scales, (vals.size, int(num)))
+        return samples.T
 
 
 class NormalParameterSampleFromScaleMatrix(ParameterSampleFromScaleMatrix):
@@ -291,18 +295,102 @@ class Evaluate(object):
         return self.fit.calc_stat()
 
 
-def _sample_stat(fit, samples, numcores=None):
+class EvaluateChunk(Evaluate):
+    """
+    Callable class for _sample_stat multiprocessing call that
+    calculates the statistic for a 2D array of samples, returning
+    an array rather than a list of values.
+    """
+    def __call__(self, samples):
+        stats = numpy.empty(len(samples), dtype=SherpaFloat)
+        for idx, sample in enumerate(samples):
+            stats[idx] = Evaluate.__call__(self, sample)
+        return stats
+
+
+# The maximum number of samples evaluated in one call to parallel_map,
+# which bounds the memory used to transfer the results.
+_chunksize = 10000
+
+
+def _sample_stat(fit, samples, numcores=None, chunksize=None):
+
+    samples = numpy.asarray(samples)
+    nsamples = samples.shape[0]
+    if chunksize is None:
+        chunksize = _chunksize
+    chunksize = max(int(chunksize), 1)
+
+    ncores = numcores if numcores is not None else _ncpus
+    ncores = max(int(ncores or 1), 1)
+
+    # The output is allocated once, and the statistic column filled
+    # in chunk by chunk; each core is sent a contiguous block of
+    # samples and returns an array.
+    out = numpy.empty((nsamples, samples.shape[1] + 1), dtype=SherpaFloat)
+    out[:, 1:] = samples
 
     oldvals = fit.model.thawedpars
+    evaluate = EvaluateChunk(fit)
 
     try:
         fit.model.startup()
-        stats = numpy.asarray(parallel_map(Evaluate(fit), samples, numcores))
+        for start in xrange(0, nsamples, chunksize):
+            chunk = samples[start:start + chunksize]
+            blocks = numpy.array_split(chunk, min(ncores, len(chunk)))
+            stats = parallel_map(evaluate, blocks, numcores)
+            out[start:start + len(chunk), 0] = numpy.concatenate(stats)
     finally:
         fit.model.teardown()
         fit.model.thawedpars = oldvals
 
-    return numpy.concatenate([stats[:, numpy.newaxis], samples], axis=1)
+    return out
+
+
+def clip_to_limits(samples, mins, maxes):
+    """Restrict the parameter samples to lie within the limits.
+
+    Parameters
+    ----------
+    samples : 2D array
+       The parameter samples, with shape (nsamples, npars). The
+       array is changed in place.
+    mins, maxes : sequence of number
+       The limits for each parameter.
+
+    Returns
+    -------
+    samples : 2D array
+       The input array.
+
+    """
+    return numpy.clip(samples, mins, maxes, out=samples)
+
+
+def within_ranges(samples, mins, maxes, offset=0):
+    """Select the parameter samples that lie within the ranges.
+
+    Parameters
+    ----------
+    samples : 2D array
+       The samples, with shape (nsamples, ncols).
+    mins, maxes : sequence of number
+       The exclusive limits for each parameter.
+    offset : int, optional
+       The column of ``samples`` that contains the first parameter
+       (e.g. 1 when the first column is the statistic or flux).
+
+    Returns
+    -------
+    selected : 2D array
+       Those rows of ``samples`` where all the parameters lie
+       within their limits.
+
+    """
+    mins = numpy.asarray(mins)
+    pars = samples[:, offset:offset + mins.size]
+    keep = numpy.all((pars > mins) & (pars < numpy.asarray(maxes)), axis=1)
+    return samples[keep]
 
 
 class NormalSampleFromScaleMatrix(NormalParameterSampleFromScaleMatrix):
@@ -26,9 +26,11 @@ from sherpa.stats import Cash, CStat
 from sherpa.optmethods import NelderMead
 from sherpa.estmethods import Covariance
 from sherpa.utils import parallel_map, poisson_noise, NoNewAttributesAfterInit
+from sherpa.utils import _ncpus
 from sherpa.fit import Fit
 from sherpa.sim.sample import NormalParameterSampleFromScaleMatrix
 
+import os
 import time
 import numpy
 
@@ -135,15 +137,61 @@ class LikelihoodRatioResults(NoNewAttributesAfterInit):
 class LikelihoodRatioTestWorker(object):
     """
     Worker class for LikelihoodRatioTest
+
+    Each process running the worker fits its own copy of the null
+    and alternate fits, so that the simulated data sets never share
+    a data object and the simulations can be run concurrently.
     """
     def __init__(self, null_fit, alt_fit, null_vals, alt_vals):
         self.null_fit = null_fit
         self.alt_fit = alt_fit
         self.null_vals = null_vals
         self.alt_vals = alt_vals
+        self._pid = None
+        self._fits = None
+
+    def _get_fits(self):
+        # The copy is made once per process (rather than once per
+        # simulation); the null and alt fits are copied together so
+        # that they continue to share the same (copied) data object.
+        pid = os.getpid()
+        if self._fits is None or self._pid != pid:
+            self._fits = deepcopy((self.null_fit, self.alt_fit))
+            self._pid = pid
+        return self._fits
 
     def __call__(self, proposal):
-        return LikelihoodRatioTest.calculate(self.null_fit, self.alt_fit, proposal, self.null_vals, self.alt_vals)
+        nullfit, altfit = self._get_fits()
+        return LikelihoodRatioTest.calculate(nullfit, altfit, proposal,
+                                             self.null_vals, self.alt_vals)
+
+
+def _binomial_halfwidth(nsucc, ntrial, z=1.96):
+    """The half-width of the Wilson score interval for a proportion.
+
+    Parameters
+    ----------
+    nsucc : int
+       The number of successes.
+    ntrial : int
+       The number of trials.
+    z : number, optional
+       The number of standard deviations for the interval; the
+       default corresponds to a 95% interval.
+
+    Returns
+    -------
+    hwidth : number
+       Half the width of the confidence interval on nsucc / ntrial.
+
+    """
+    if ntrial < 1:
+        return numpy.inf
+    phat = nsucc / float(ntrial)
+    z2 = z * z
+    denom = 1.0 + z2 / ntrial
+    return z * numpy.sqrt(phat * (1.0 - phat) / ntrial +
+                          z2 / (4.0 * ntrial * ntrial)) / denom
 
 
 class LikelihoodRatioTest(NoNewAttributesAfterInit):
@@ -173,6 +221,33 @@ class LikelihoodRatioTest(NoNewAttributesAfterInit):
 
     @staticmethod
     def calculate(nullfit, altfit, proposal, null_vals, alt_vals):
+        """Simulate a data set from the null model and fit both models.
+
+        The data object shared by ``nullfit`` and ``altfit`` is
+        over-written with the simulated data, so the caller is
+        responsible for restoring it (or for sending in copies).
+
+        Parameters
+        ----------
+        nullfit, altfit : `sherpa.fit.Fit` instances
+           The fits for the null and alternate models; they must
+           use the same data object.
+        proposal : sequence of number
+           The null-model parameter values used to simulate the data.
+        null_vals, alt_vals : sequence of number or None
+           The starting values for the fits of the null and
+           alternate models to the simulated data (normally the
+           best-fit values for the observed data). A value of
+           ``None`` means that the fit starts from the current
+           parameter values.
+
+        Returns
+        -------
+        stats : list of number
+           The null statistic, alternate statistic, and the
+           likelihood ratio.
+
+        """
 
         # FIXME: only null perturbed?
         nullfit.model.thawedpars = proposal
@@ -180,11 +255,12 @@ class LikelihoodRatioTest(NoNewAttributesAfterInit):
         # Fake using poisson_noise with null
         fake = poisson_noise(nullfit.data.eval_model(nullfit.model))
 
-                # Set faked data for both nullfit and altfit
+        # Set faked data for both nullfit and altfit
         nullfit.data.set_dep(fake)
 
         # Start the faked fit at initial null best-fit values
-        #nullfit.model.thawedpars = null_vals
+        if null_vals is not None:
+            nullfit.model.thawedpars = null_vals
 
         # Fit with null model
         nullfr = nullfit.fit()
@@ -198,7 +274,8 @@ class LikelihoodRatioTest(NoNewAttributesAfterInit):
         assert (nullfit.data.get_dep() == altfit.data.get_dep()).all()
 
         # Start the faked fit at the initial alt best-fit values
-        #altfit.model.thawedpars = alt_vals
+        if alt_vals is not None:
+            altfit.model.thawedpars = alt_vals
 
         debug("proposal: " + repr(proposal))
         debug("alt model")
@@ -222,7 +299,42 @@ class LikelihoodRatioTest(NoNewAttributesAfterInit):
     @staticmethod
     def run(fit, null_comp, alt_comp, conv_mdl=None,
             stat=None, method=None,
-            niter=500, numcores=None):
+            niter=500, numcores=None, ptol=None, batchsize=None):
+        """Run the likelihood ratio test.
+
+        Parameters
+        ----------
+        fit : `sherpa.fit.Fit` instance
+           The fit containing the data to use.
+        null_comp, alt_comp : model instances
+           The null and alternate models.
+        conv_mdl : optional
+           An expression used to modify the models so that they can
+           be compared to the data (e.g. a PSF or PHA response).
+        stat : optional
+           The statistic to use; it must be Cash or CStat, and
+           defaults to CStat.
+        method : optional
+           The optimiser to use; the default is NelderMead.
+        niter : int, optional
+           The maximum number of simulations to run.
+        numcores : int or None, optional
+           The number of CPU cores to use.
+        ptol : number or None, optional
+           If set, the simulations are run in batches and stop once
+           the half-width of the 95% binomial confidence interval on
+           the p value is less than or equal to ``ptol``.
+        batchsize : int or None, optional
+           The number of simulations per batch when ``ptol`` is set.
+           The default is ``max(50, 10 * numcores)``.
+
+        Returns
+        -------
+        results : `LikelihoodRatioResults` instance
+           The samples, statistics, and ratios only contain the
+           simulations that were run.
+
+        """
         if stat is None:   stat = CStat()
         if method is None: method = NelderMead()
 
@@ -276,15 +388,37 @@ class LikelihoodRatioTest(NoNewAttributesAfterInit):
 
         LR = -(alt_stat - null_stat)
 
-        olddep = data.get_dep(filter=False)
+        if ptol is None:
+            nbatch = niter
+        elif batchsize is None:
+            ncores = numcores if numcores is not None else _ncpus
+            nbatch = max(50, 10 * int(ncores or 1))
+        else:
+            nbatch = max(int(batchsize), 1)
+
+        # Each simulation is run on a copy of the data, so the original
+        # data does not need to be restored; the simulated fits start
+        # at the best-fit values found above.
+        worker = LikelihoodRatioTestWorker(nullfit, altfit,
+                                           null_vals, alt_vals)
+
+        statistics = []
+        nsucc = 0
         try:
-            statistics = parallel_map(
-                LikelihoodRatioTestWorker(nullfit, altfit, null_vals, alt_vals),
-                samples,
-                numcores
-            )
+            for start in range(0, niter, nbatch):
+                batch = parallel_map(worker, samples[start:start + nbatch],
+                                     numcores)
+                statistics.extend(batch)
+                nsucc += sum(1 for stats in batch if stats[2] > LR)
+
+                if ptol is not None:
+                    hwidth = _binomial_halfwidth(nsucc, len(statistics))
+                    debug("p-value = %g +/- %g after %d simulations" %
+                          (nsucc / (1.0 * len(statistics)), hwidth,
+                           len(statistics)))
+                    if hwidth <= ptol:
+                        break
         finally:
-            data.set_dep(olddep)
             alt.thawedpars = list(oldaltvals)
             null.thawedpars = list(oldnullvals)
 
@@ -293,11 +427,12 @@ class LikelihoodRatioTest(NoNewAttributesAfterInit):
         debug("LR = " + repr(LR))
 
         statistics = numpy.asarray(statistics)
+        nsim = len(statistics)
 
-        pppvalue = numpy.sum( statistics[:,2] > LR ) / (1.0*niter)
+        pppvalue = numpy.sum( statistics[:,2] > LR ) / (1.0*nsim)
 
         debug('ppp value = '+str(pppvalue))
 
         return LikelihoodRatioResults(statistics[:,2], statistics[:,0:2],
-                                      samples, LR, pppvalue, null_stat,
-                                      alt_stat)
+                                      samples[:nsim], LR, pppvalue,
+                                      null_stat, alt_stat)
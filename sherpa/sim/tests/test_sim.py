@@ -173,6 +173,20 @@ class test_sim(SherpaTestCase):
     def test_uniform_sample(self):
         sim.uniform_sample(self.fit, num=self.num)
 
+    def test_sample_stat_chunks(self):
+        # the statistic does not depend on how the samples are chunked
+        samples = sim.NormalParameterSampleFromScaleMatrix().get_sample(
+            self.fit, num=self.num)
+        expected = []
+        for sample in samples:
+            self.fit.model.thawedpars = sample
+            expected.append(self.fit.calc_stat())
+        stats = sim.sample._sample_stat(self.fit, samples, numcores=1,
+                                        chunksize=3)
+        assert stats.shape == (self.num, samples.shape[1] + 1)
+        assert numpy.allclose(stats[:, 0], expected)
+        assert (stats[:, 1:] == samples).all()
+
     def test_normal_sample(self):
         sim.normal_sample(self.fit, num=self.num, correlate=False)
 
@@ -186,6 +200,21 @@ class test_sim(SherpaTestCase):
         results = sim.LikelihoodRatioTest.run(self.fit, self.fit.model.lhs,
                                               self.fit.model, niter=25)
 
+    def test_lrt_does_not_change_data(self):
+        sim.LikelihoodRatioTest.run(self.fit, self.fit.model.lhs,
+                                    self.fit.model, niter=10)
+        assert (self.fit.data.get_dep() == self._y).all()
+
+    def test_lrt_early_stop(self):
+        # the 95% interval after 10 simulations is always narrower
+        # than +/- 0.5, so only the first batch is run
+        results = sim.LikelihoodRatioTest.run(self.fit, self.fit.model.lhs,
+                                              self.fit.model, niter=100,
+                                              ptol=0.5, batchsize=10)
+        assert len(results.ratios) == 10
+        assert results.stats.shape == (10, 2)
+        assert results.samples.shape[0] == 10
+
 
     def test_mh(self):
 
@@ -22,7 +22,10 @@ See sherpa/astro/sim/tests_astro_sim_unit.py for the astro-specific
 version of this.
 """
 
+import numpy
+
 from sherpa import sim
+from sherpa.sim.sample import clip_to_limits, within_ranges
 
 
 # This is part of #397
@@ -46,3 +49,24 @@ def test_list_samplers_contents():
     samplers = sim.MCMC().list_samplers()
     for expected in ['mh', 'metropolismh']:
         assert expected in samplers
+
+
+def test_clip_to_limits():
+    """The samples are clipped in place"""
+
+    samples = numpy.asarray([[-2.0, 5.0], [0.5, 20.0], [3.0, 12.0]])
+    out = clip_to_limits(samples, [-1, 10], [2, 15])
+    assert out is samples
+    expected = [[-1.0, 10.0], [0.5, 15.0], [2.0, 12.0]]
+    assert (samples == expected).all()
+
+
+def test_within_ranges():
+    """Only rows with all parameters within the (exclusive) limits"""
+
+    samples = numpy.asarray([[100, 1.0, 5.0],
+                             [200, 0.0, 5.0],
+                             [300, 1.5, 9.0],
+                             [400, 1.9, 6.0]])
+    out = within_ranges(samples, [0, 4], [2, 8], offset=1)
+    assert (out[:, 0] == [100, 400]).all()
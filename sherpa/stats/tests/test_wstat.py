@@ -81,7 +81,7 @@
 import numpy as np
 
 from sherpa.utils.testing import SherpaTestCase, requires_data, \
-    requires_fits, requires_group
+    requires_fits
 from sherpa.astro import ui
 
 import logging
@@ -177,7 +177,6 @@ class test_wstat_single_scalar(SherpaTestCase):
         self._check_stat(375, 416.0601496345599)
 
 
-@requires_group
 @requires_data
 @requires_fits
 class test_wstat_two_scalar(SherpaTestCase):
@@ -308,7 +307,6 @@ class test_wstat_two_scalar(SherpaTestCase):
         self._check_stat2(exp1 + exp2)
 
 
-@requires_group
 @requires_data
 @requires_fits
 class test_wstat_group_counts(SherpaTestCase):
@@ -0,0 +1,147 @@
+#
+#  Copyright (C) 2019 Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+import numpy
+from numpy.testing import assert_allclose
+import pytest
+
+from sherpa.io import read_file_data, iter_file_data, format_rows, \
+    write_arrays
+
+
+def write_file(tmpdir, text):
+    fname = tmpdir.join('data.dat')
+    fname.write(text)
+    return str(fname)
+
+
+def test_read_file_data_header(tmpdir):
+    fname = write_file(tmpdir, "# x y\n1 2\n3 4\n\n5 6\n")
+    names, args = read_file_data(fname)
+    assert names == ['x', 'y']
+    assert len(args) == 2
+    assert_allclose(args[0], [1, 3, 5])
+    assert_allclose(args[1], [2, 4, 6])
+
+
+def test_read_file_data_default_names(tmpdir):
+    fname = write_file(tmpdir, "1 2 3\n4 5 6\n")
+    names, args = read_file_data(fname)
+    assert names == ['col1', 'col2', 'col3']
+    assert_allclose(args[2], [3, 6])
+
+
+def test_read_file_data_separators(tmpdir):
+    fname = write_file(tmpdir, "# a,b,c\n1,2\t3\n4;5 6\n\n")
+    names, args = read_file_data(fname, sep=',')
+    assert names == ['a', 'b', 'c']
+    assert_allclose(numpy.asarray(args), [[1, 4], [2, 5], [3, 6]])
+
+
+def test_read_file_data_ragged(tmpdir):
+    fname = write_file(tmpdir, "1 2\n3 4 5\n")
+    with pytest.raises(ValueError) as exc:
+        read_file_data(fname)
+    assert 'number of columns changes' in str(exc.value)
+
+
+def test_read_file_data_no_data(tmpdir):
+    fname = write_file(tmpdir, "# x y\n")
+    with pytest.raises(ValueError) as exc:
+        read_file_data(fname)
+    assert 'contains no data' in str(exc.value)
+
+
+def test_read_file_data_strings(tmpdir):
+    fname = write_file(tmpdir, "1 a\n2 b\n")
+    with pytest.raises(ValueError):
+        read_file_data(fname)
+
+    names, args = read_file_data(fname, require_floats=False)
+    assert_allclose(args[0], [1, 2])
+    assert list(args[1]) == ['a', 'b']
+
+
+def test_iter_file_data(tmpdir):
+    x = numpy.arange(200) * 0.5
+    lines = ["# x y"] + ["{} {}".format(a, 2 * a) for a in x]
+    fname = write_file(tmpdir, "\n".join(lines) + "\n")
+
+    chunks = list(iter_file_data(fname, chunksize=256))
+    assert len(chunks) > 1
+    assert all(names == ['x', 'y'] for names, _ in chunks)
+
+    got = numpy.concatenate([args[0] for _, args in chunks])
+    assert_allclose(got, x)
+
+    names, args = read_file_data(fname)
+    assert_allclose(args[1], numpy.concatenate([a[1] for _, a in chunks]))
+
+
+def test_format_rows():
+    rows = numpy.asarray([[1, 2.5], [3, 1e-7]])
+    assert format_rows(rows) == "1 2.5\n3 1e-07\n"
+    assert format_rows(rows, format=['%d', '%.2f'], sep=',',
+                       prefix='%') == "%1,2.50\n%3,0.00\n"
+    assert format_rows(rows, sep='%', linebreak='%\n') == \
+        "1%2.5%\n3%1e-07%\n"
+    assert format_rows(numpy.zeros((0, 2))) == ''
+
+
+def test_format_rows_invalid():
+    with pytest.raises(ValueError):
+        format_rows(numpy.arange(4))
+
+    with pytest.raises(ValueError):
+        format_rows(numpy.ones((2, 2)), format=['%g'])
+
+
+def test_write_arrays(tmpdir):
+    x = numpy.arange(5) * 0.1
+    fname = str(tmpdir.join('out.dat'))
+    write_arrays(fname, [x, x * x], fields=['x', 'y'])
+
+    with open(fname) as fh:
+        lines = fh.read().split('\n')
+
+    assert lines[0] == '#x y'
+    assert lines[2] == '0.1 0.01'
+    assert lines[-1] == ''
+    assert len(lines) == 7
+
+    names, args = read_file_data(fname)
+    assert names == ['x', 'y']
+    assert_allclose(args[1], x * x)
+
+
+def test_write_arrays_percent_sep(tmpdir):
+    x = numpy.arange(3)
+    fname = str(tmpdir.join('out.dat'))
+    write_arrays(fname, [x, x + 1], fields=['a', 'b'], sep='%')
+
+    with open(fname) as fh:
+        assert fh.read() == '#a%b\n0%1\n1%2\n2%3\n'
+
+
+def test_write_arrays_no_rows(tmpdir):
+    """The file ends in a line break even when there is no data."""
+    fname = str(tmpdir.join('out.dat'))
+    write_arrays(fname, [[], []], fields=['x', 'y'])
+
+    with open(fname) as fh:
+        assert fh.read() == '#x y\n\n'
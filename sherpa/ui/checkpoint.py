@@ -0,0 +1,185 @@
+#
+#  Copyright (C) 2019  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+"""Save and restore objects as a directory of arrays.
+
+A checkpoint is a directory containing a small pickle file, which
+describes the object, and the large arrays used by the object, each
+of which is stored as a separate ``.npy`` file. Arrays with the same
+contents - such as the response of data sets which use the same RMF -
+are only written out once. When a checkpoint is read in the arrays
+are mapped into memory, rather than read, so that only the parts of
+the arrays that are used are loaded from disk. Changes to the arrays
+are not written back to the checkpoint.
+
+This is used by `sherpa.ui.utils.Session.save` and
+`sherpa.ui.utils.Session.restore`.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+from six.moves import cPickle as pickle
+
+import numpy
+
+__all__ = ('is_checkpoint', 'save', 'load')
+
+# Change this if the format of the checkpoint changes.
+_format_version = 1
+
+_meta_name = 'checkpoint.pickle'
+_array_dir = 'arrays'
+
+# Arrays smaller than this (in bytes) are stored in the pickle file.
+_min_nbytes = 4096
+
+
+def is_checkpoint(path):
+    """Is the path a checkpoint directory?"""
+    return os.path.isfile(os.path.join(path, _meta_name))
+
+
+def _digest(arr):
+    """The SHA1 hash of the type, shape, and contents of the array."""
+    sha = hashlib.sha1()
+    sha.update(arr.dtype.str.encode('ascii'))
+    sha.update(str(arr.shape).encode('ascii'))
+    sha.update(numpy.ascontiguousarray(arr).view(numpy.uint8))
+    return sha.hexdigest()
+
+
+def save(obj, path, clobber=False):
+    """Write the object to a checkpoint directory.
+
+    Parameters
+    ----------
+    obj
+        The object to save; it must be possible to pickle it.
+    path : str
+        The name of the directory.
+    clobber : bool, optional
+        If ``True`` then an existing file or checkpoint of the same
+        name is replaced, otherwise an IOError is raised.
+    """
+    path = os.path.abspath(path)
+    if os.path.exists(path):
+        if not clobber:
+            raise IOError("file '{}' exists and clobber is not set".format(path))
+        if os.path.isdir(path) and not is_checkpoint(path):
+            raise IOError("'{}' is a directory but not a checkpoint".format(path))
+
+    parent = os.path.dirname(path)
+    tmpdir = tempfile.mkdtemp(prefix='.tmp-', dir=parent)
+    try:
+        arrdir = os.path.join(tmpdir, _array_dir)
+        os.mkdir(arrdir)
+
+        # Each array object is given an index, so that objects which
+        # share an array when saved also share it when restored. The
+        # arrays are kept alive until the pickle is written so that
+        # their id values are not re-used.
+        indexes = {}
+        seen = []
+        written = set()
+
+        def persistent_id(val):
+            if type(val) not in (numpy.ndarray, numpy.memmap) or \
+               val.dtype.hasobject or val.nbytes < _min_nbytes:
+                return None
+
+            key = id(val)
+            try:
+                return indexes[key]
+            except KeyError:
+                pass
+
+            digest = _digest(val)
+            if digest not in written:
+                numpy.save(os.path.join(arrdir, digest + '.npy'),
+                           numpy.asarray(val))
+                written.add(digest)
+
+            pid = '{}:{}'.format(len(seen), digest)
+            indexes[key] = pid
+            seen.append(val)
+            return pid
+
+        with open(os.path.join(tmpdir, _meta_name), 'wb') as fh:
+            pickle.dump({'version': _format_version}, fh, 2)
+            pickler = pickle.Pickler(fh, 2)
+            pickler.persistent_id = persistent_id
+            pickler.dump(obj)
+
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+        os.rename(tmpdir, path)
+
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def load(path):
+    """Read in an object from a checkpoint directory.
+
+    Parameters
+    ----------
+    path : str
+        The name of the directory, which was created by `save`.
+
+    Returns
+    -------
+    obj
+        The saved object. The arrays are mapped from the checkpoint
+        files, and so are read in when used.
+    """
+    if not is_checkpoint(path):
+        raise IOError("'{}' is not a checkpoint".format(path))
+
+    arrdir = os.path.join(path, _array_dir)
+    arrays = {}
+
+    def persistent_load(pid):
+        if isinstance(pid, bytes):
+            pid = pid.decode('ascii')
+
+        try:
+            return arrays[pid]
+        except KeyError:
+            pass
+
+        digest = pid.split(':', 1)[1]
+        fname = os.path.join(arrdir, digest + '.npy')
+        val = numpy.asarray(numpy.load(fname, mmap_mode='c'))
+        arrays[pid] = val
+        return val
+
+    with open(os.path.join(path, _meta_name), 'rb') as fh:
+        header = pickle.load(fh)
+        if header.get('version') != _format_version:
+            raise IOError("checkpoint '{}' has an unsupported format".format(path))
+
+        unpickler = pickle.Unpickler(fh)
+        unpickler.persistent_load = persistent_load
+        return unpickler.load()
@@ -29,6 +29,7 @@ from sherpa.ui.utils import Session
 from sherpa.astro.ui.utils import Session as AstroSession
 from numpy.testing import assert_array_equal
 from sherpa.models import parameter, Const1D
+from sherpa.utils.err import IOErr
 
 import pytest
 
@@ -270,3 +271,62 @@ def test_zero_division_calc_stat():
     # a white box approach to get the result from _get_stat_info.
     ui.calc_stat_info()
     assert ui._get_stat_info()[0].rstat is numpy.nan
+
+
+def test_save_restore_checkpoint(tmpdir):
+    outdir = tmpdir.join("sherpa.chk")
+    x = numpy.arange(2000) * 0.5
+    session = Session()
+    session.load_arrays(1, x, x * 2)
+    session.load_arrays(2, x, x * 2)
+    session.load_arrays(3, TEST, TEST2)
+    mdl = Const1D('c1')
+    mdl.c0 = 4
+    session.set_source(1, mdl)
+    session.save(str(outdir), checkpoint=True)
+
+    # The shared contents are only written out once.
+    assert len(outdir.join('arrays').listdir()) == 2
+
+    with pytest.raises(IOErr):
+        session.save(str(outdir), checkpoint=True)
+
+    session.clean()
+    session.restore(str(outdir))
+    assert {1, 2, 3} == set(session.list_data_ids())
+    assert_array_equal(x, session.get_data(2).get_indep()[0])
+    assert_array_equal(x * 2, session.get_data(1).get_dep())
+    assert_array_equal(TEST2, session.get_data(3).get_dep())
+    assert session.get_source(1).c0.val == 4
+
+    # The arrays are separate objects, and can be changed.
+    y = session.get_data(1).y
+    y[0] = 10
+    assert session.get_data(2).y[0] == 0
+
+
+def test_get_pvalue_plot_ptol():
+    """The early-stopping options reach LikelihoodRatioTest.run."""
+
+    from sherpa.models.basic import Gauss1D
+
+    x = numpy.arange(1, 21)
+    y = [3, 5, 4, 2, 6, 3, 4, 12, 15, 9, 4, 3, 5, 2, 4, 3, 5, 4, 2, 3]
+    session = Session()
+    session.load_arrays(1, x, y)
+    bgnd = Const1D('bgnd')
+    bgnd.c0 = 4
+    line = Gauss1D('line')
+    line.pos = 9
+    line.fwhm = 2
+    line.ampl = 8
+    session.set_source(1, bgnd + line)
+    session.set_stat('cash')
+
+    # The 95% interval after 10 simulations is always narrower than
+    # +/- 0.5, so only the first batch is run.
+    lrplot = session.get_pvalue_plot(bgnd, bgnd + line, num=100, bins=5,
+                                     numcores=1, recalc=True, ptol=0.5,
+                                     batchsize=10)
+    assert len(lrplot.ratios) == 10
+    assert len(session.get_pvalue_results().ratios) == 10
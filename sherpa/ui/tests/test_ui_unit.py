@@ -24,7 +24,12 @@ Note that this test is almost duplicated in
 sherpa/astro/ui/tests/test_astro_ui_unit.py
 """
 
+import numpy as np
+
+import pytest
+
 from sherpa import ui
+from sherpa.utils.err import ArgumentTypeErr
 
 
 # This is part of #397
@@ -63,3 +68,26 @@ def test_all_has_no_repeated_elements():
     n1 = len(ui.__all__)
     n2 = len(set(ui.__all__))
     assert n1 == n2
+
+
+def test_fake_batch():
+    """fake_batch evaluates the model once and leaves the data alone"""
+
+    ui.clean()
+    ui.load_arrays(1, [1, 2, 3, 4], [5, 3, 0, 2])
+    bgnd = ui.create_model_component('const1d', 'bgnd')
+    bgnd.c0 = 10
+    ui.set_source(bgnd)
+
+    np.random.seed(3982)
+    sims = ui.fake_batch(num=200)
+    assert sims.shape == (200, 4)
+    assert (ui.get_dep() == [5, 3, 0, 2]).all()
+    assert (sims >= 0).all()
+    assert np.abs(sims.mean() - 10) < 1
+
+    sims = ui.fake_batch(num=3, method=lambda x: x + 1)
+    assert (sims == 11).all()
+
+    with pytest.raises(ArgumentTypeErr):
+        ui.fake_batch(num=0)
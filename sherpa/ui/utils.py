@@ -31,6 +31,7 @@ import inspect
 import pydoc
 import numpy
 import sherpa.all
+import sherpa.ui.checkpoint
 from sherpa.utils import SherpaFloat, NoNewAttributesAfterInit, export_method
 from sherpa.utils.err import ArgumentErr, ArgumentTypeErr, \
     IdentifierErr, IOErr, ModelErr, SessionErr
@@ -89,6 +90,22 @@ def _fix_array(arg, argname, ndims=1):
     return arg
 
 
+def _fake_batch(mvals, num, method):
+    """Draw num realisations of the model values with method.
+
+    The model values are broadcast to a (num, nbins) array so that
+    vectorized methods, such as `sherpa.utils.poisson_noise`, are
+    called only once.
+    """
+    mvals = numpy.asarray(mvals, SherpaFloat)
+    sims = method(numpy.tile(mvals, (num, 1)))
+    sims = numpy.asarray(sims, SherpaFloat)
+    if sims.shape != (num, mvals.size):
+        raise TypeError("method must return an array of shape (%d, %d)" %
+                        (num, mvals.size))
+    return sims
+
+
 def _is_subclass(t1, t2):
     return inspect.isclass(t1) and issubclass(t1, t2) and (t1 is not t2)
 
@@ -416,7 +433,7 @@ class Session(NoNewAttributesAfterInit):
         self._mdlcompimage = sherpa.image.ComponentModelImage()
         self._srccompimage = sherpa.image.ComponentSourceImage()
 
-    def save(self, filename='sherpa.save', clobber=False):
+    def save(self, filename='sherpa.save', clobber=False, checkpoint=False):
         """Save the current Sherpa session to a file.
 
         Parameters
@@ -428,6 +445,11 @@ class Session(NoNewAttributesAfterInit):
            This flag controls whether an existing file can be
            overwritten (``True``) or if it raises an exception (``False``,
            the default setting).
+        checkpoint : bool, optional
+           If ``True`` then `filename` is a directory, and the large
+           arrays in the session - such as the data and responses -
+           are stored as separate files within it (see the Notes
+           section).
 
         Raises
         ------
@@ -448,6 +470,12 @@ class Session(NoNewAttributesAfterInit):
         contains all the data. This means that files created by `save`
         can be sent to collaborators to share results.
 
+        When `checkpoint` is set the session is written to a directory
+        using the `sherpa.ui.checkpoint` module. Arrays with the same
+        contents are only stored once, and `restore` maps the arrays
+        into memory rather than reading them, which makes saving and
+        restoring sessions with many data sets much faster.
+
         Examples
         --------
 
@@ -460,14 +488,22 @@ class Session(NoNewAttributesAfterInit):
 
         >>> save('bestfit.sherpa', clobber=True)
 
+        Save the session as a checkpoint directory:
+
+        >>> save('fits.chk', checkpoint=True)
+
         """
 
         _check_type(filename, string_types, 'filename', 'a string')
         clobber = sherpa.utils.bool_cast(clobber)
 
-        if os.path.isfile(filename) and not clobber:
+        if os.path.exists(filename) and not clobber:
             raise sherpa.utils.err.IOErr("filefound", filename)
 
+        if sherpa.utils.bool_cast(checkpoint):
+            sherpa.ui.checkpoint.save(self, filename, clobber=True)
+            return
+
         fout = open(filename, 'wb')
         try:
             pickle.dump(self, fout, 2)  # Use newer binary protocol
@@ -506,6 +542,12 @@ class Session(NoNewAttributesAfterInit):
           This probably means that you have restored a session saved with a previous version of Sherpa.
           Falling back to assuming that the model is continuous.
 
+        If `filename` is a directory created by ``save`` with the
+        `checkpoint` flag set then the arrays are mapped from the
+        files in the directory, and are only read in when used, so
+        the directory should not be deleted or changed while the
+        session is in use.
+
         Examples
         --------
 
@@ -520,11 +562,14 @@ class Session(NoNewAttributesAfterInit):
         """
         _check_type(filename, string_types, 'filename', 'a string')
 
-        fin = open(filename, 'rb')
-        try:
-            obj = pickle.load(fin)
-        finally:
-            fin.close()
+        if os.path.isdir(filename):
+            obj = sherpa.ui.checkpoint.load(filename)
+        else:
+            fin = open(filename, 'rb')
+            try:
+                obj = pickle.load(fin)
+            finally:
+                fin.close()
 
         if not isinstance(obj, Session):
             raise ArgumentErr('nosession', filename)
@@ -3483,6 +3528,60 @@ class Session(NoNewAttributesAfterInit):
         model = self.get_model(id)
         self.set_dep(id, method(data.eval_model(model)))
 
+    def fake_batch(self, id=None, num=1, method=sherpa.utils.poisson_noise):
+        """Simulate several realisations of a data set in one call.
+
+        The model is evaluated once for each bin of the data set and
+        ``num`` random realisations are drawn from it. Unlike `fake`,
+        the data set is not changed.
+
+        .. versionadded:: 4.12.0
+
+        Parameters
+        ----------
+        id : int or str, optional
+           The identifier for the data set to use. If not given then
+           the default identifier is used, as returned by
+           `get_default_id`.
+        num : int, optional
+           The number of realisations to create.
+        method : func
+           The function used to create a random realisation of
+           a data set. It is sent an array of shape ``(num, nbins)``
+           and must return an array of the same shape.
+
+        Returns
+        -------
+        sims : array
+           The simulated data values, as a ``(num, nbins)`` array.
+
+        See Also
+        --------
+        fake : Simulate a data set.
+        get_dep : Return the dependent axis of a data set.
+
+        Notes
+        -----
+        Each row has the same layout as the return value of
+        ``get_data(id).eval_model(get_model(id))``, so it can be
+        sent to `set_dep` or used directly in a vectorized fit loop.
+
+        Examples
+        --------
+        Create 1000 Poisson realisations of the default data set:
+
+        >>> sims = fake_batch(num=1000)
+        >>> sims.shape[0]
+        1000
+
+        """
+        if not _is_integer(num) or num < 1:
+            _argument_type_error('num', 'a positive integer')
+
+        data = self.get_data(id)
+        model = self.get_model(id)
+        return _fake_batch(data.eval_model(model), num, method)
+
     @staticmethod
     def _read_data(readfunc, filename, *args, **kwargs):
         _check_type(filename, string_types, 'filename', 'a string')
@@ -4992,7 +5091,8 @@ class Session(NoNewAttributesAfterInit):
 
             name = name.lower()
             self._model_types[name] = ModelWrapper(self, cls)
-            self._model_globals.update(self._model_types)
+
+        self._model_globals.update(self._model_types)
 
     def add_model(self, modelclass, args=(), kwargs={}):
         """Create a user-defined model class.
@@ -8215,7 +8315,8 @@ class Session(NoNewAttributesAfterInit):
     #
 
     def _run_pvalue(self, null_model, alt_model, conv_model=None,
-                    id=1, otherids=(), num=500, bins=25, numcores=None):
+                    id=1, otherids=(), num=500, bins=25, numcores=None,
+                    ptol=None, batchsize=None):
         ids, fit = self._get_fit(id, otherids)
 
         pvalue = sherpa.sim.LikelihoodRatioTest.run
@@ -8223,7 +8324,8 @@ class Session(NoNewAttributesAfterInit):
                          niter=num,
                          stat=self._current_stat,
                          method=self._current_method,
-                         numcores=numcores)
+                         numcores=numcores, ptol=ptol,
+                         batchsize=batchsize)
 
         info(results.format())
         self._pvalue_results = results
@@ -8280,6 +8382,9 @@ class Session(NoNewAttributesAfterInit):
         alt
            The fit statistic of the alternate model on the observed data.
 
+        When the ``ptol`` argument of `plot_pvalue` or `get_pvalue_plot`
+        was set, the arrays only contain the simulations that were run.
+
         Examples
         --------
 
@@ -8300,7 +8405,8 @@ class Session(NoNewAttributesAfterInit):
     # DOC-TODO: improve discussion of how the simulations are done.
     def plot_pvalue(self, null_model, alt_model, conv_model=None,
                     id=1, otherids=(), num=500, bins=25, numcores=None,
-                    replot=False, overplot=False, clearwindow=True):
+                    replot=False, overplot=False, clearwindow=True,
+                    ptol=None, batchsize=None):
         """Compute and plot a histogram of likelihood ratios by simulating data.
 
         Compare the likelihood of the null model to an alternative model
@@ -8340,6 +8446,13 @@ class Session(NoNewAttributesAfterInit):
         clearwindow : bool, optional
            When using ChIPS for plotting, should the existing frame
            be cleared before creating the plot?
+        ptol : number or None, optional
+           If set, the simulations are run in batches and stop once
+           the half-width of the 95% confidence interval on the p
+           value is less than or equal to ``ptol``, so fewer than
+           `num` simulations may be run.
+        batchsize : int or None, optional
+           The number of simulations per batch when ``ptol`` is set.
 
         Raises
         ------
@@ -8394,13 +8507,14 @@ class Session(NoNewAttributesAfterInit):
             conv_model = self.get_response(id)
         if not sherpa.utils.bool_cast(replot) or self._pvalue_results is None:
             self._run_pvalue(null_model, alt_model, conv_model,
-                             id, otherids, num, bins, numcores)
+                             id, otherids, num, bins, numcores,
+                             ptol=ptol, batchsize=batchsize)
 
         results = self._pvalue_results
         lrplot = self._lrplot
         if not sherpa.utils.bool_cast(replot):
             lrplot.prepare(results.ratios, bins,
-                           num, results.lr, results.ppp)
+                           len(results.ratios), results.lr, results.ppp)
 
         try:
             sherpa.plot.begin()
@@ -8413,7 +8527,7 @@ class Session(NoNewAttributesAfterInit):
 
     def get_pvalue_plot(self, null_model=None, alt_model=None, conv_model=None,
                         id=1, otherids=(), num=500, bins=25, numcores=None,
-                        recalc=False):
+                        recalc=False, ptol=None, batchsize=None):
         """Return the data used by plot_pvalue.
 
         Access the data arrays and preferences defining the histogram plot
@@ -8448,6 +8562,13 @@ class Session(NoNewAttributesAfterInit):
            The default value (``False``) means that the results from the
            last call to `plot_pvalue` or `get_pvalue_plot` are
            returned. If ``True``, the values are re-calculated.
+        ptol : number or None, optional
+           If set, the simulations are run in batches and stop once
+           the half-width of the 95% confidence interval on the p
+           value is less than or equal to ``ptol``, so fewer than
+           `num` simulations may be run.
+        batchsize : int or None, optional
+           The number of simulations per batch when ``ptol`` is set.
 
         Returns
         -------
@@ -8485,10 +8606,11 @@ class Session(NoNewAttributesAfterInit):
             raise TypeError("alternative model cannot be None")
 
         self._run_pvalue(null_model, alt_model, conv_model,
-                         id, otherids, num, bins, numcores)
+                         id, otherids, num, bins, numcores,
+                         ptol=ptol, batchsize=batchsize)
         results = self._pvalue_results
         lrplot.prepare(results.ratios, bins,
-                       num, results.lr, results.ppp)
+                       len(results.ratios), results.lr, results.ppp)
         self._lrplot = lrplot
         return lrplot
 
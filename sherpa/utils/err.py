@@ -60,6 +60,7 @@ class ArgumentErr(ValueError, SherpaErr):
             'nopha': 'data set %s does not contain PHA data',
             'noimg': 'data set %s does not contain IMAGE data',
             'multirsp': 'A response ID is required for each file',
+            'multiid': 'A data set ID is required for each file',
             'bad': "Invalid %s: '%s'",
             'badinterval': "interval syntax requires a tuple, 'lo:hi'",
             }
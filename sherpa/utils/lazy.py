@@ -0,0 +1,110 @@
+#
+#  Copyright (C) 2019  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+"""Delay the import of modules until they are used.
+
+Packages such as matplotlib and AstroPy take a significant fraction
+of the time needed to import `sherpa.astro.ui`, even when they are not
+used (e.g. a script which fits data but does not plot anything). The
+`lazy_import` function returns a stand-in for a module which only
+imports it when one of its attributes is accessed.
+"""
+
+import importlib
+import sys
+import types
+
+__all__ = ('LazyModule', 'lazy_import')
+
+
+class LazyModule(types.ModuleType):
+    """A module which is imported when it is first used.
+
+    Parameters
+    ----------
+    name : str
+        The full name of the module.
+    """
+
+    def __init__(self, name):
+        types.ModuleType.__init__(self, name)
+        self.__dict__['_lazy_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        return "<lazy module '{}'>".format(self.__name__)
+
+
+def _find_package(name):
+    """Can the top-level package be imported (it is not loaded)?"""
+    try:
+        from importlib.util import find_spec
+    except ImportError:
+        # Python 2.7
+        import imp
+        try:
+            imp.find_module(name)
+        except ImportError:
+            return False
+        return True
+
+    return find_spec(name) is not None
+
+
+def lazy_import(name):
+    """Return a module which is imported when it is first used.
+
+    Parameters
+    ----------
+    name : str
+        The full name of the module (e.g. 'astropy.io.fits').
+
+    Returns
+    -------
+    module : module or LazyModule
+        The module, if it has already been imported, otherwise a
+        stand-in for it.
+
+    Raises
+    ------
+    ImportError
+        If the top-level package can not be found. Errors in the
+        module itself are only reported when it is used.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    top = name.split('.')[0]
+    if not _find_package(top):
+        raise ImportError("No module named '{}'".format(top))
+
+    return LazyModule(name)